@@ -1,5 +1,7 @@
 from src.cli.args import AcquisitionArgs
 from src.pipeline.experiment.acquisition import AcquisitionExperimentFactory
+from src.pipeline.queues import QueueFactory
+from src.pipeline.tracing import LatencyTracer
 
 
 def run(args: AcquisitionArgs):
@@ -9,6 +11,20 @@ def run(args: AcquisitionArgs):
         serial_port=args.serial_port,
         plotting_channels=args.plot,
         saving_channels=args.csv,
+        saving_format=args.format,
+        queues=QueueFactory(
+            maxsize=args.queue_size,
+            overflow=args.overflow,
+            runtime=args.runtime,
+            metered=args.telemetry is not None,
+        ),
+        telemetry_interval=args.telemetry,
+        metrics_file=args.metrics,
+        tracer=LatencyTracer(directory=args.trace) if args.trace else None,
+        capture=args.capture,
+        blocks=args.blocks,
+        runtime=args.runtime,
+        fuse=args.fuse,
     )
 
     pipeline.run()
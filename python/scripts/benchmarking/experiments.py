@@ -0,0 +1,256 @@
+"""Throughput of the experiments, running for a few seconds with every stage in its
+process (or in a thread of a single process), as they do with the board."""
+import json
+import multiprocessing
+import os
+import tempfile
+from dataclasses import dataclass
+from time import perf_counter, sleep
+from typing import Callable, Dict, Optional, Tuple
+
+from modupipe.runnable import MultiProcess, Runnable
+
+from scripts.benchmarking.inputs import SAMPLES_PER_PACKET
+from scripts.benchmarking.usage import ProcessUsage, format_memory, read_process_usage
+from src.pipeline.experiment.acquisition import AcquisitionExperimentFactory
+from src.pipeline.experiment.prediction import PredictionExperimentFactory
+from src.pipeline.queues import QueueFactory
+from src.pipeline.runtime import Runtime, WithServices
+
+TELEMETRY_INTERVAL = 1.0
+# Generates packets at the rate of the board, to measure latencies without the
+# queues filling up
+BOARD_RATE_PORT = "freq:1000-50-0"
+
+
+@dataclass
+class ExperimentUsage:
+    seconds: float
+    samples_per_second: float
+    queues: Dict[str, float]
+    processes: Dict[str, ProcessUsage]
+    # Time from the reception of a window to its prediction
+    latency_mean: Optional[float] = None
+    latency_max: Optional[float] = None
+
+
+def read_latencies(metrics_file: str) -> Tuple[Optional[float], Optional[float]]:
+    """Reads the mean and maximum latency of the predictions reported by the
+    telemetry, leaving out the first report, made while the experiment starts."""
+    if not os.path.exists(metrics_file):
+        return None, None
+
+    with open(metrics_file) as metrics_input:
+        reports = [json.loads(line) for line in metrics_input][1:]
+    samples = [
+        latency
+        for report in reports
+        for latency in report["latencies"].values()
+        if latency["count"]
+    ]
+
+    if not samples:
+        return None, None
+
+    count = sum(sample["count"] for sample in samples)
+    mean = sum(sample["mean"] * sample["count"] for sample in samples) / count
+
+    return mean, max(sample["max"] for sample in samples)
+
+
+def measure_experiment(
+    create: Callable[[QueueFactory, str], Runnable],
+    duration: float,
+    runtime: Runtime,
+) -> ExperimentUsage:
+    """Runs the stages of an experiment for `duration` seconds. Its throughput
+    is the rate at which serial packets are processed."""
+    queues = QueueFactory(runtime=runtime, metered=True)
+    metrics_file = os.path.abspath("metrics.jsonl")
+    experiment = create(queues, metrics_file)
+
+    # The services of the experiment run in processes of their own
+    pipelines, workers = experiment, []
+    if isinstance(experiment, WithServices):
+        pipelines, workers = experiment.pipelines, experiment.workers
+
+    if isinstance(pipelines, MultiProcess):
+        processes = pipelines.processes + workers
+        # Processes forget their target once started
+        names = [
+            getattr(process._target.__self__, "name", process.name)  # type: ignore
+            for process in processes
+        ]
+    else:
+        # Threads all run in a single process, forked to measure its usage
+        processes = [multiprocessing.get_context("fork").Process(target=experiment.run)]
+        names = ["experiment"]
+
+    counts = {queue.name: queue.queue.nb_got.value for queue in queues.queues}
+    start = perf_counter()
+
+    try:
+        for process in processes:
+            process.start()
+
+        sleep(duration)
+
+        seconds = perf_counter() - start
+        rates = {
+            queue.name: (queue.queue.nb_got.value - counts[queue.name]) / seconds
+            for queue in queues.queues
+        }
+        usages = {
+            f"{index}: {name}": read_process_usage(process.pid)
+            for index, (name, process) in enumerate(zip(names, processes))
+        }
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            if process.pid is not None:
+                process.join()
+
+    latency_mean, latency_max = read_latencies(metrics_file)
+
+    return ExperimentUsage(
+        seconds=seconds,
+        samples_per_second=rates["serial"] * SAMPLES_PER_PACKET,
+        queues=rates,
+        processes=usages,
+        latency_mean=latency_mean,
+        latency_max=latency_max,
+    )
+
+
+def benchmark_experiments(
+    duration: float, seed: int, model: str
+) -> Dict[str, ExperimentUsage]:
+    port = f"synth:{seed}"
+    Create = Callable[[QueueFactory, str], Runnable]
+
+    def acquisition(
+        file_format: str, blocks: bool = False, fuse: bool = False
+    ) -> Create:
+        return lambda queues, metrics_file: AcquisitionExperimentFactory().create(
+            serial_port=port,
+            saving_channels=[0, 1],
+            saving_format=file_format,
+            queues=queues,
+            telemetry_interval=TELEMETRY_INTERVAL,
+            metrics_file=metrics_file,
+            blocks=blocks,
+            runtime=queues.runtime,
+            fuse=fuse,
+        )
+
+    def prediction(
+        hop: Optional[float] = None,
+        blocks: bool = False,
+        serial_port: str = port,
+        fuse: bool = False,
+        batch_size: int = 1,
+    ) -> Create:
+        return lambda queues, metrics_file: PredictionExperimentFactory().create(
+            serial_port=serial_port,
+            model_name=model,
+            predicting_channels=[0],
+            hop_in_seconds=hop,
+            queues=queues,
+            telemetry_interval=TELEMETRY_INTERVAL,
+            metrics_file=metrics_file,
+            blocks=blocks,
+            runtime=queues.runtime,
+            fuse=fuse,
+            batch_size=batch_size,
+        )
+
+    experiments: Dict[str, Tuple[Create, Runtime]] = {
+        "acquisition (csv)": (acquisition("csv"), "processes"),
+        "acquisition (bin)": (acquisition("bin"), "processes"),
+        "acquisition (csv, blocks)": (acquisition("csv", True), "processes"),
+        "acquisition (bin, blocks)": (acquisition("bin", True), "processes"),
+        "acquisition (bin, threads)": (acquisition("bin"), "threads"),
+        "acquisition (bin, blocks, threads)": (acquisition("bin", True), "threads"),
+        "acquisition (bin, blocks, fused)": (
+            acquisition("bin", True, fuse=True),
+            "processes",
+        ),
+        "prediction": (prediction(), "processes"),
+        "prediction (sliding)": (prediction(hop=1 / 100), "processes"),
+        "prediction (blocks)": (prediction(blocks=True), "processes"),
+        "prediction (sliding, blocks)": (prediction(1 / 100, True), "processes"),
+        "prediction (threads)": (prediction(), "threads"),
+        "prediction (blocks, threads)": (prediction(blocks=True), "threads"),
+        "prediction (sliding, blocks, threads)": (
+            prediction(1 / 100, True),
+            "threads",
+        ),
+        "prediction (blocks, fused)": (
+            prediction(blocks=True, fuse=True),
+            "processes",
+        ),
+        "prediction (sliding, blocks, fused)": (
+            prediction(1 / 100, True, fuse=True),
+            "processes",
+        ),
+        "prediction (sliding, blocks, fused, batched)": (
+            prediction(1 / 100, True, fuse=True, batch_size=32),
+            "processes",
+        ),
+        "prediction (board rate)": (
+            prediction(serial_port=BOARD_RATE_PORT),
+            "processes",
+        ),
+        "prediction (board rate, threads)": (
+            prediction(serial_port=BOARD_RATE_PORT),
+            "threads",
+        ),
+        "prediction (board rate, blocks)": (
+            prediction(blocks=True, serial_port=BOARD_RATE_PORT),
+            "processes",
+        ),
+        "prediction (board rate, blocks, threads)": (
+            prediction(blocks=True, serial_port=BOARD_RATE_PORT),
+            "threads",
+        ),
+        "prediction (board rate, blocks, fused)": (
+            prediction(blocks=True, serial_port=BOARD_RATE_PORT, fuse=True),
+            "processes",
+        ),
+        "prediction (board rate, sliding, blocks, fused)": (
+            prediction(1 / 100, True, BOARD_RATE_PORT, fuse=True),
+            "processes",
+        ),
+        "prediction (board rate, sliding, blocks, fused, batched)": (
+            prediction(1 / 100, True, BOARD_RATE_PORT, fuse=True, batch_size=32),
+            "processes",
+        ),
+    }
+    results = {}
+    cwd = os.getcwd()
+
+    for name, (create, runtime) in experiments.items():
+        # Acquisitions save their channels in the working directory
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                results[name] = measure_experiment(create, duration, runtime)
+            finally:
+                os.chdir(cwd)
+
+        usage = results[name]
+        cpu = sum(process.cpu_seconds for process in usage.processes.values())
+        latency = (
+            f", latency {usage.latency_mean * 1000:.1f} ms "
+            f"(max {usage.latency_max * 1000:.1f} ms)"
+            if usage.latency_mean is not None and usage.latency_max is not None
+            else ""
+        )
+        print(
+            f"{name:<40} : {usage.samples_per_second:>14,.0f} samples/s, "
+            f"{cpu:6.2f} s CPU, {format_memory(usage.processes)}{latency}"
+        )
+
+    return results
@@ -0,0 +1,61 @@
+"""Synthetic inputs of the benchmarks, generated beforehand from a seeded source."""
+from typing import Any, Iterator, List, Union
+
+from modupipe.extractor import Extractor
+from modupipe.mapper import Mapper
+
+from src.pipeline.data import ProcessedBlock, ProcessedData, SerialData
+from src.pipeline.experiment.pipelines import SAMPLING_FREQUENCY
+from src.pipeline.mappers import NotchDC, NotchFrequencyOnline, ProcessFromSerial, ToInt
+from src.pipeline.serial import SyntheticSource
+
+DATA_LENGTH = 256
+SAMPLES_PER_PACKET = DATA_LENGTH // 2
+
+Item = Union[ProcessedData[Any], ProcessedBlock]
+
+
+class ListSource(Extractor[Any]):
+    def __init__(self, items: List[Any]) -> None:
+        self.items = items
+
+    def extract(self) -> Iterator[Any]:
+        yield from self.items
+
+
+def create_packets(nb_samples: int, seed: int) -> List[SerialData[bytes]]:
+    source = SyntheticSource(
+        seed=seed,
+        data_length=DATA_LENGTH,
+        sample_rate=SAMPLING_FREQUENCY,
+        nb_packets=nb_samples // SAMPLES_PER_PACKET,
+    )
+    return list(source.extract())
+
+
+def create_samples(nb_samples: int, seed: int) -> List[ProcessedData[int]]:
+    mapper = ProcessFromSerial() + ToInt()
+    return list(mapper.map(iter(create_packets(nb_samples, seed))))
+
+
+def create_blocks(nb_samples: int, seed: int) -> List[ProcessedBlock]:
+    mapper = ProcessFromSerial(batched=True) + ToInt()
+    return list(mapper.map(iter(create_packets(nb_samples, seed))))
+
+
+def create_filters() -> Mapper[Item, Item]:
+    return NotchDC(R=0.99) + NotchFrequencyOnline(
+        frequency=60, sampling_frequency=SAMPLING_FREQUENCY
+    )
+
+
+def split_channels(samples: List[ProcessedData[int]]) -> List[List[ProcessedData]]:
+    return [
+        [sample for sample in samples if sample.channel == channel]
+        for channel in sorted({sample.channel for sample in samples})
+    ]
+
+
+def consume(items: Iterator[Any]) -> None:
+    for _ in items:
+        pass
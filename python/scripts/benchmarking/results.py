@@ -0,0 +1,31 @@
+"""Results of the benchmarks, saved as JSON to be compared between commits."""
+import json
+import subprocess
+from typing import Any, Dict, Optional
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline_file: str) -> None:
+    with open(baseline_file) as baseline_input:
+        baseline = json.load(baseline_input)
+
+    print(f"\nCompared to {baseline.get('commit')} :")
+
+    for group in ["stages", "experiments"]:
+        for name, usage in results.get(group, {}).items():
+            previous = baseline.get(group, {}).get(name)
+
+            if previous:
+                ratio = usage["samples_per_second"] / previous["samples_per_second"]
+                print(f"{name:<40} : x{ratio:.2f}")
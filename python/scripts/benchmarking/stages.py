@@ -0,0 +1,208 @@
+"""Throughput of each stage of the pipeline, running alone on samples generated
+beforehand."""
+import os
+import tempfile
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from scripts.benchmarking.inputs import (
+    SAMPLES_PER_PACKET,
+    ListSource,
+    consume,
+    create_blocks,
+    create_filters,
+    create_packets,
+    create_samples,
+    split_channels,
+)
+from scripts.benchmarking.usage import Usage, measure_stage, print_usage
+from src.ai.transform_unique import MultiChannelFeaturesTransformEMG, SlidingFeaturesEMG
+from src.ai.utilities import load_model
+from src.pipeline.binary import BinaryWriter
+from src.pipeline.capture import CaptureWriter
+from src.pipeline.csv import CSVWriter, WithoutChannel
+from src.pipeline.data import ProcessedData, RangeData
+from src.pipeline.experiment.pipelines import SAMPLING_FREQUENCY
+from src.pipeline.extractors import AlignWindows
+from src.pipeline.mappers import (
+    ExtractCharacteristics,
+    ExtractSlidingCharacteristics,
+    MergeRangeData,
+    Predict,
+    ProcessFromSerial,
+    StackChannels,
+    TimedBuffer,
+    ToInt,
+    ToNumpy,
+)
+
+# Stages are prepared by a function returning the function to measure, which
+# returns the number of samples it went through
+
+
+def processing_stage(nb_samples: int, seed: int, batched: bool) -> Callable[[], int]:
+    packets = create_packets(nb_samples, seed)
+
+    def run() -> int:
+        consume((ProcessFromSerial(batched=batched) + ToInt()).map(iter(packets)))
+        return len(packets) * SAMPLES_PER_PACKET
+
+    return run
+
+
+def filtering_stage(nb_samples: int, seed: int, batched: bool) -> Callable[[], int]:
+    if batched:
+        items: List[Any] = create_blocks(nb_samples, seed)
+    else:
+        items = create_samples(nb_samples, seed)
+    nb_items = sum(len(item) if batched else 1 for item in items)
+
+    def run() -> int:
+        consume(create_filters().map(iter(items)))
+        return nb_items
+
+    return run
+
+
+def extraction_stage(nb_samples: int, seed: int) -> Callable[[], int]:
+    channels = split_channels(create_samples(nb_samples, seed))
+
+    def run() -> int:
+        source: AlignWindows[Any] = AlignWindows(
+            [
+                ListSource(channel) + TimedBuffer(time_in_seconds=1 / 10)
+                for channel in channels
+            ],
+            skew_tolerance=1 / 20,
+        )
+        mapper = (
+            MergeRangeData()
+            + StackChannels()
+            + ExtractCharacteristics(extractor=MultiChannelFeaturesTransformEMG())
+            + ToNumpy(flatten=True)
+        )
+        consume(mapper.map(source.extract()))
+        return sum(map(len, channels))
+
+    return run
+
+
+def sliding_extraction_stage(nb_samples: int, seed: int) -> Callable[[], int]:
+    channels = split_channels(create_samples(nb_samples, seed))
+
+    def run() -> int:
+        source: AlignWindows[Any] = AlignWindows(
+            [
+                ListSource(channel)
+                + ExtractSlidingCharacteristics(
+                    extractor=SlidingFeaturesEMG(window_size=SAMPLING_FREQUENCY // 10),
+                    hop_size=SAMPLING_FREQUENCY // 100,
+                )
+                for channel in channels
+            ],
+            skew_tolerance=1 / 200,
+        )
+        consume((MergeRangeData() + ToNumpy(flatten=True)).map(source.extract()))
+        return sum(map(len, channels))
+
+    return run
+
+
+def prediction_stage(
+    nb_samples: int, seed: int, model_name: str, batch_size: int
+) -> Callable[[], int]:
+    model = load_model(model_name=model_name)
+    # A window of characteristics every hop of the sliding extraction
+    hop_size = SAMPLING_FREQUENCY // 100
+    characteristics = np.random.default_rng(seed).normal(
+        size=(nb_samples // hop_size, 1, model.n_features_in_)
+    )
+    windows = [RangeData(start=0.0, end=0.0, value=value) for value in characteristics]
+
+    def run() -> int:
+        consume(Predict(model=model, batch_size=batch_size).map(iter(windows)))
+        return len(windows) * hop_size
+
+    return run
+
+
+def saving_stage(
+    nb_samples: int, seed: int, file_format: str, batched: bool = False
+) -> Callable[[], int]:
+    if batched:
+        items: List[Any] = create_blocks(nb_samples, seed)
+    else:
+        items = create_samples(nb_samples, seed)
+    samples = list(create_filters().map(iter(items)))
+    nb_items = sum(len(item) if batched else 1 for item in samples)
+    directory = tempfile.mkdtemp()
+
+    def run() -> int:
+        writer: Any
+        if file_format == "csv":
+            writer = CSVWriter[ProcessedData[float]](
+                file=os.path.join(directory, "emg-0.csv"),
+                batch_size=100,
+                strategy=WithoutChannel(),
+                flush_interval=1.0,
+            )
+        else:
+            writer = BinaryWriter(
+                file=os.path.join(directory, "emg-0.bin"),
+                batch_size=1000,
+                channel=0,
+                sample_rate=SAMPLING_FREQUENCY,
+                flush_interval=1.0,
+            )
+
+        for sample in samples:
+            writer.load(sample)
+        writer.close()
+
+        return nb_items
+
+    return run
+
+
+def capture_stage(nb_samples: int, seed: int) -> Callable[[], int]:
+    packets = create_packets(nb_samples, seed)
+    directory = tempfile.mkdtemp()
+
+    def run() -> int:
+        writer = CaptureWriter(directory)
+
+        for packet in packets:
+            writer.load(packet)
+        writer.close()
+
+        return len(packets) * SAMPLES_PER_PACKET
+
+    return run
+
+
+def benchmark_stages(nb_samples: int, seed: int, model: str) -> Dict[str, Usage]:
+    stages = {
+        "processing": lambda: processing_stage(nb_samples, seed, batched=False),
+        "processing (batched)": lambda: processing_stage(nb_samples, seed, True),
+        "filtering": lambda: filtering_stage(nb_samples, seed, batched=False),
+        "filtering (blocks)": lambda: filtering_stage(nb_samples, seed, batched=True),
+        "extraction": lambda: extraction_stage(nb_samples, seed),
+        "sliding extraction": lambda: sliding_extraction_stage(nb_samples, seed),
+        "sliding prediction": lambda: prediction_stage(nb_samples, seed, model, 1),
+        "sliding prediction (batched)": lambda: prediction_stage(
+            nb_samples, seed, model, batch_size=32
+        ),
+        "csv saving": lambda: saving_stage(nb_samples, seed, file_format="csv"),
+        "csv saving (blocks)": lambda: saving_stage(nb_samples, seed, "csv", True),
+        "bin saving": lambda: saving_stage(nb_samples, seed, file_format="bin"),
+        "bin saving (blocks)": lambda: saving_stage(nb_samples, seed, "bin", True),
+        "raw capture": lambda: capture_stage(nb_samples, seed),
+    }
+    results = {}
+
+    for name, prepare in stages.items():
+        results[name] = measure_stage(prepare)
+        print_usage(name, results[name])
+
+    return results
@@ -0,0 +1,115 @@
+"""CPU time and memory used by the benchmarked processes.
+
+Reading the usage of other processes needs `/proc`, so this only runs on Linux.
+"""
+import multiprocessing
+import os
+import resource
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Callable, Dict, Optional
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+@dataclass
+class Usage:
+    samples: int
+    seconds: float
+    samples_per_second: float
+    cpu_seconds: float
+    peak_rss_kb: int
+
+
+@dataclass
+class ProcessUsage:
+    cpu_seconds: float
+    # Peak of the resident set of the process, including the pages it shares
+    peak_rss_kb: int
+    # Resident set when measured, with the shared pages split between the
+    # processes sharing them, so that it adds up across processes
+    pss_kb: Optional[int]
+
+
+def measure_stage(prepare: Callable[[], Callable[[], int]]) -> Usage:
+    """Prepares and runs a stage in a forked process, so that its memory usage is
+    not mixed with the one of the other stages."""
+
+    def child(results: multiprocessing.Queue) -> None:
+        run = prepare()
+
+        start_cpu = resource.getrusage(resource.RUSAGE_SELF)
+        start = perf_counter()
+        nb_samples = run()
+        seconds = perf_counter() - start
+        end_cpu = resource.getrusage(resource.RUSAGE_SELF)
+
+        results.put(
+            Usage(
+                samples=nb_samples,
+                seconds=seconds,
+                samples_per_second=nb_samples / seconds,
+                cpu_seconds=(end_cpu.ru_utime - start_cpu.ru_utime)
+                + (end_cpu.ru_stime - start_cpu.ru_stime),
+                peak_rss_kb=end_cpu.ru_maxrss,
+            )
+        )
+
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    process = context.Process(target=child, args=(results,))
+    process.start()
+    usage = results.get()
+    process.join()
+
+    return usage
+
+
+def read_process_usage(pid: int) -> ProcessUsage:
+    with open(f"/proc/{pid}/stat") as stat_file:
+        # The name of the process, in parentheses, may contain spaces
+        fields = stat_file.read().rsplit(")", 1)[1].split()
+
+    return ProcessUsage(
+        cpu_seconds=(int(fields[11]) + int(fields[12])) / CLOCK_TICKS,
+        peak_rss_kb=read_memory(f"/proc/{pid}/status")["VmHWM"],
+        pss_kb=read_memory(f"/proc/{pid}/smaps_rollup").get("Pss"),
+    )
+
+
+def read_memory(file: str) -> Dict[str, int]:
+    """Reads the sizes (in kB) listed in a `/proc/<pid>` file, if it exists
+    (`smaps_rollup` needs Linux 4.14)."""
+    if not os.path.exists(file):
+        return {}
+
+    with open(file) as memory_file:
+        fields = [line.split(":", 1) for line in memory_file if ":" in line]
+
+    return {
+        name: int(value.split()[0])
+        for name, value in fields
+        if value.strip().endswith("kB")
+    }
+
+
+def format_memory(processes: Dict[str, ProcessUsage]) -> str:
+    """Gives the largest peak RSS of the processes, as the pages they share are
+    counted in each of them, and the sum of their PSS."""
+    peak = max(process.peak_rss_kb for process in processes.values())
+    text = f"{peak / 1024:7.1f} MiB peak RSS (largest process)"
+
+    pss = [
+        process.pss_kb for process in processes.values() if process.pss_kb is not None
+    ]
+    if len(pss) == len(processes):
+        text += f", {sum(pss) / 1024:7.1f} MiB PSS"
+
+    return text
+
+
+def print_usage(name: str, usage: Usage) -> None:
+    print(
+        f"{name:<40} : {usage.samples_per_second:>14,.0f} samples/s, "
+        f"{usage.cpu_seconds:6.2f} s CPU, {usage.peak_rss_kb / 1024:7.1f} MiB peak RSS"
+    )
@@ -0,0 +1,64 @@
+"""Compares the filtering throughput of single samples against sample blocks.
+
+Run with `python -m scripts.filters_benchmark`.
+"""
+
+from time import perf_counter
+from typing import Iterator, List
+
+import numpy as np
+
+from scripts.benchmarking.inputs import Item, create_filters
+from src.pipeline.data import ProcessedBlock, ProcessedData
+from src.pipeline.experiment.pipelines import SAMPLING_FREQUENCY
+
+NB_SAMPLES = 250_000
+BLOCK_SIZES = [16, 64, 256]
+
+
+def create_samples(times: np.ndarray, values: np.ndarray) -> List[Item]:
+    return [
+        ProcessedData(time=time, channel=0, original=value, filtered=value)
+        for time, value in zip(times.tolist(), values.tolist())
+    ]
+
+
+def create_blocks(times: np.ndarray, values: np.ndarray, size: int) -> List[Item]:
+    return [
+        ProcessedBlock(
+            time=times[index : index + size],
+            channel=0,
+            original=values[index : index + size],
+            filtered=values[index : index + size],
+        )
+        for index in range(0, len(values), size)
+    ]
+
+
+def measure_rate(items: List[Item]) -> float:
+    output: Iterator[Item] = create_filters().map(iter(items))
+
+    start = perf_counter()
+    for _ in output:
+        pass
+
+    return NB_SAMPLES / (perf_counter() - start)
+
+
+def main():
+    values = np.random.default_rng(0).integers(-4000, 4000, NB_SAMPLES)
+    times = np.arange(NB_SAMPLES) / SAMPLING_FREQUENCY
+
+    sample_rate = measure_rate(create_samples(times, values))
+    print(f"samples        : {sample_rate:>14,.0f} samples/s")
+
+    for size in BLOCK_SIZES:
+        block_rate = measure_rate(create_blocks(times, values, size))
+        print(
+            f"blocks of {size:<4} : {block_rate:>14,.0f} samples/s"
+            f" (x{block_rate / sample_rate:.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
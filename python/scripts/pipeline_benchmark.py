@@ -0,0 +1,65 @@
+"""Measures the maximum throughput of each stage of the pipeline, and of the
+experiments, from an unthrottled and seeded synthetic source.
+
+Each stage runs alone, in a forked process, on samples generated beforehand (see
+`scripts.benchmarking.stages`). Each experiment runs for a few seconds with every
+stage in its process (or in a thread of a single process), as it does with the
+board (see `scripts.benchmarking.experiments`). Throughputs (in samples/s), CPU
+times, memory and, for predictions, latencies are saved as JSON, to be compared
+with the results of another commit.
+
+Reading the CPU times and memory of the experiment processes needs `/proc`, so
+this only runs on Linux.
+
+Run with `python -m scripts.pipeline_benchmark [--baseline <previous results>]`.
+"""
+import json
+import os
+import platform
+from dataclasses import asdict
+from time import time
+from typing import Any, Dict
+
+from scripts.benchmarking.experiments import benchmark_experiments
+from scripts.benchmarking.results import compare, current_commit
+from scripts.benchmarking.stages import benchmark_stages
+from src.cli.args import PipelineBenchmarkArgs
+
+
+def main() -> None:
+    args = PipelineBenchmarkArgs().parse_args()
+    commit = current_commit()
+
+    results: Dict[str, Any] = {
+        "commit": commit,
+        "time": time(),
+        "python": platform.python_version(),
+        "samples": args.samples,
+        "duration": args.duration,
+        "seed": args.seed,
+    }
+
+    if not args.skip_stages:
+        stages = benchmark_stages(args.samples, args.seed, args.model)
+        results["stages"] = {name: asdict(usage) for name, usage in stages.items()}
+
+    if not args.skip_experiments:
+        experiments = benchmark_experiments(args.duration, args.seed, args.model)
+        results["experiments"] = {
+            name: asdict(usage) for name, usage in experiments.items()
+        }
+
+    output = args.output or os.path.join("benchmarks", f"pipeline-{commit}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    with open(output, "w") as results_output:
+        json.dump(results, results_output, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 from src.cli.args import PredictionArgs
 from src.pipeline.experiment.prediction import PredictionExperimentFactory
+from src.pipeline.queues import QueueFactory
+from src.pipeline.tracing import LatencyTracer
 
 
 def run(args: PredictionArgs):
@@ -10,6 +12,22 @@ def run(args: PredictionArgs):
         model_name=args.model,
         plotting_channels=args.plot,
         predicting_channels=args.predict,
+        hop_in_seconds=args.hop,
+        queues=QueueFactory(
+            maxsize=args.queue_size,
+            overflow=args.overflow,
+            runtime=args.runtime,
+            metered=args.telemetry is not None,
+        ),
+        telemetry_interval=args.telemetry,
+        metrics_file=args.metrics,
+        tracer=LatencyTracer(directory=args.trace) if args.trace else None,
+        capture=args.capture,
+        blocks=args.blocks,
+        runtime=args.runtime,
+        fuse=args.fuse,
+        batch_size=args.batch,
+        batch_latency=args.batch_latency,
     )
 
     pipeline.run()
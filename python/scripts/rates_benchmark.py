@@ -0,0 +1,68 @@
+"""Measures the overhead per item of `LogRate`, compared to a loader doing nothing
+and to reading the clock with `datetime.now()` on every item.
+
+Run with `python -m scripts.rates_benchmark`.
+"""
+from datetime import datetime
+from time import perf_counter_ns
+from typing import Any
+
+from modupipe.loader import IdentityLoader
+
+from src.pipeline.loaders import LogRate, LogTime
+from src.utils.loggers import Logger
+
+NB_ITEMS = 2_000_000
+
+
+class NoLog(Logger):
+    def debug(self, text: str) -> None:
+        pass
+
+    def info(self, text: str) -> None:
+        pass
+
+    def warning(self, text: str) -> None:
+        pass
+
+    def error(self, text: str) -> None:
+        pass
+
+
+class Identity(IdentityLoader[Any]):
+    def load(self, item: Any) -> Any:
+        return item
+
+
+class DatetimeNow(IdentityLoader[Any]):
+    def load(self, item: Any) -> Any:
+        datetime.now()
+        return item
+
+
+def measure_ns_per_item(loader: IdentityLoader[Any]) -> float:
+    load = loader.load
+    start = perf_counter_ns()
+
+    for item in range(NB_ITEMS):
+        load(item)
+
+    return (perf_counter_ns() - start) / NB_ITEMS
+
+
+def main():
+    baseline = min(measure_ns_per_item(Identity()) for _ in range(3))
+    print(f"identity loader : {baseline:6.1f} ns/item")
+
+    for name, loader in [
+        ("LogRate", LogRate(NoLog(), timeout=0.1)),
+        ("LogTime", LogTime(NoLog(), timeout=0.1)),
+        ("datetime.now()", DatetimeNow()),
+    ]:
+        # The first runs let the meters adapt how often they read the clock
+        cost = min(measure_ns_per_item(loader) for _ in range(5))
+        print(f"{name:<15} : {cost:6.1f} ns/item ({cost - baseline:+6.1f} ns overhead)")
+
+
+if __name__ == "__main__":
+    main()
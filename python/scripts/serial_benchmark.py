@@ -0,0 +1,101 @@
+"""Compares the packets per second read by `BaseSerialSource`, which reads each
+part of a packet separately, and by `FramedSerialSource`, which splits bulk
+reads into packets, either read by the extractor itself or by a reader thread.
+
+Packets are written as fast as possible to a pseudo-terminal, so the rates are
+only limited by the readers. They are also given as the baud rate (10 bits per
+byte) that the readers could sustain.
+
+Run with `python -m scripts.serial_benchmark`.
+"""
+import os
+import threading
+from itertools import islice
+from time import perf_counter
+from typing import Callable
+
+from modupipe.extractor import Extractor
+
+from src.pipeline.data import SerialData
+from src.pipeline.serial import BaseSerialSource, FramedSerialSource, SyntheticSource
+from src.utils.loggers import ConsoleLogger
+
+NB_PACKETS = 20_000
+# The length of the data is sent in a single byte
+DATA_LENGTH = 128
+
+
+def create_frames() -> bytes:
+    source = SyntheticSource(seed=0, data_length=DATA_LENGTH, nb_packets=NB_PACKETS)
+
+    return b"".join(
+        b"\n"
+        + bytes([packet.nb_channels, packet.message_length, packet.length])
+        + packet.value
+        + b"\xff"
+        for packet in source.extract()
+    )
+
+
+def write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def measure_rate(create_source: Callable[[str], Extractor[SerialData[bytes]]]):
+    master, slave = os.openpty()
+    source = create_source(os.ttyname(slave))
+    frames = create_frames()
+
+    writer = threading.Thread(target=write_all, args=(master, frames), daemon=True)
+    start = perf_counter()
+    writer.start()
+
+    if isinstance(source, BaseSerialSource):
+        # It reads a single packet per extraction
+        for _ in range(NB_PACKETS):
+            for _ in source.extract():
+                pass
+    else:
+        for _ in islice(source.extract(), NB_PACKETS):
+            pass
+
+    elapsed = perf_counter() - start
+    writer.join()
+    os.close(master)
+    os.close(slave)
+
+    return NB_PACKETS / elapsed, len(frames) * 10 / elapsed
+
+
+def main():
+    logger = ConsoleLogger(name="serial")
+    sources = {
+        "BaseSerialSource": lambda port: BaseSerialSource(
+            port, 115200, sync_byte=b"\n", check_byte=b"\xff", logger=logger
+        ),
+        "FramedSerialSource": lambda port: FramedSerialSource(
+            port,
+            115200,
+            sync_byte=b"\n",
+            check_byte=b"\xff",
+            logger=logger,
+            ring_size=None,
+        ),
+        "FramedSerialSource (ring)": lambda port: FramedSerialSource(
+            port, 115200, sync_byte=b"\n", check_byte=b"\xff", logger=logger
+        ),
+    }
+
+    for name, create_source in sources.items():
+        packets_rate, baud_rate = measure_rate(create_source)
+        print(
+            f"{name:<25} : {packets_rate:>10,.0f} packets/s"
+            f" ({baud_rate / 1e6:6.1f} Mbaud)"
+        )
+
+
+if __name__ == "__main__":
+    main()
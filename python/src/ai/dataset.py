@@ -0,0 +1,113 @@
+import math
+import os
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.ai.transform_unique import FeaturesTransformAngle, FeaturesTransformEMG
+from src.ai.utilities import DATA_FOLDER
+from src.pipeline.recording import RecordingReader, open_recording
+
+
+def time_range(recording: RecordingReader) -> Tuple[float, float]:
+    start, end = math.inf, -math.inf
+
+    for timestamps, _ in recording.chunks():
+        if len(timestamps):
+            start = min(start, timestamps.min())
+            end = max(end, timestamps.max())
+
+    return start, end
+
+
+def windowed_features(
+    recording: RecordingReader,
+    windows_number: int,
+    transform: Callable[[np.ndarray], np.ndarray],
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+) -> np.ndarray:
+    """Splits the rows of the recording strictly between `start` and `end` into
+    `windows_number` windows of equal size, dropping the last rows like
+    `WindowsTransformer`, and applies `transform` to the windows as soon as they
+    are complete. Only a chunk and a window are held in memory at once."""
+
+    def crop(timestamps: np.ndarray, values: np.ndarray) -> np.ndarray:
+        mask = np.ones(len(timestamps), dtype=bool)
+
+        if start is not None:
+            mask &= timestamps > start
+        if end is not None:
+            mask &= timestamps < end
+
+        return values[mask]
+
+    nb_rows = sum(len(crop(*chunk)) for chunk in recording.chunks())
+    window_size = nb_rows // windows_number
+
+    if window_size == 0:
+        raise ValueError(f"Cannot split {nb_rows} rows into {windows_number} windows")
+
+    remaining = window_size * windows_number
+    pending: Optional[np.ndarray] = None
+    features: List[np.ndarray] = []
+
+    for chunk in recording.chunks():
+        values = crop(*chunk)[:remaining]
+        remaining -= len(values)
+
+        if pending is not None:
+            values = np.concatenate((pending, values))
+
+        nb_complete = len(values) // window_size * window_size
+
+        if nb_complete:
+            windows = values[:nb_complete].reshape(-1, window_size, *values.shape[1:])
+            features.append(transform(windows))
+
+        pending = values[nb_complete:].copy()
+
+        if remaining == 0:
+            break
+
+    return np.concatenate(features)
+
+
+def load_session(
+    session: str,
+    emg_file: str = "emg-0.csv",
+    angles_file: str = "angles.csv",
+    windows_per_second: int = 1,
+    chunk_size: int = 100000,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the EMG features and the mean angles of each window of a session
+    folder, with the EMG cropped to the duration of the angles."""
+    emg = open_recording(
+        os.path.join(DATA_FOLDER, session, emg_file), chunk_size=chunk_size
+    )
+    angles = open_recording(
+        os.path.join(DATA_FOLDER, session, angles_file),
+        delimiter=",",
+        chunk_size=chunk_size,
+    )
+
+    start, end = time_range(angles)
+    windows_number = math.floor(end - start) * windows_per_second
+
+    trainset = windowed_features(
+        emg, windows_number, FeaturesTransformEMG().transform, start=start, end=end
+    )
+    target = windowed_features(
+        angles, windows_number, FeaturesTransformAngle().transform
+    )
+
+    return trainset, target
+
+
+def load_sessions(sessions: List[str], **kwargs) -> Tuple[np.ndarray, np.ndarray]:
+    sets = [load_session(session, **kwargs) for session in sessions]
+
+    return (
+        np.concatenate([trainset for trainset, _ in sets]),
+        np.concatenate([target for _, target in sets]),
+    )
@@ -1,17 +1,10 @@
-import math
-import os
-
 from sklearn.linear_model import ElasticNet, LinearRegression
 from sklearn.metrics import r2_score
 from sklearn.model_selection import RepeatedKFold, train_test_split
 from sklearn.preprocessing import scale
 
-from src.ai.transform_unique import (
-    FeaturesTransformAngle,
-    FeaturesTransformEMG,
-    WindowsTransformer,
-)
-from src.ai.utilities import load_csv_data, save_model
+from src.ai.dataset import load_sessions
+from src.ai.utilities import save_model
 
 
 def train_k_fold(model, X, y, factor=0.7):
@@ -37,33 +30,7 @@ def train_k_fold(model, X, y, factor=0.7):
 
 
 def main():
-    file_path_angles = os.path.join("acq-3", "angles.csv")
-    file_path_emg = os.path.join("acq-3", "emg-0.csv")
-    data_emg = load_csv_data(file_name=file_path_emg)
-    data_hand_angle = load_csv_data(file_name=file_path_angles, delimiter=",")
-
-    # time for training data slice
-    start = data_hand_angle.timestamp.min()
-    end = data_hand_angle.timestamp.max()
-    emg_crop = data_emg.loc[(data_emg.timestamp > start) & (data_emg.timestamp < end)]
-
-    emg_data = emg_crop.reset_index(drop=True).drop(columns=["timestamp"]).values
-    angles_data = (
-        data_hand_angle.reset_index(drop=True).drop(columns=["timestamp"]).values
-    )
-
-    WINDOWS_NUMBER_PER_SECOND = 1
-    windows_number = math.floor(end - start) * WINDOWS_NUMBER_PER_SECOND
-    windows_transformer = WindowsTransformer(windows_number)
-
-    windowed_angles = windows_transformer.transform(angles_data)
-    windowed_emg = windows_transformer.transform(emg_data)
-
-    feature_angle_tr = FeaturesTransformAngle()
-    feature_emg_tr = FeaturesTransformEMG()
-
-    target = feature_angle_tr.transform(windowed_angles)
-    trainset = feature_emg_tr.transform(windowed_emg)
+    trainset, target = load_sessions(["acq-3"], emg_file="emg-0.csv")
 
     # trainset = scale(trainset)
     X_train, X_test, y_train, y_test = train_test_split(
@@ -1,7 +1,11 @@
 import numpy as np
 
-from src.ai.utilities import getMAV, getRMS, getSD, getSSC, getVar, getZC
-from src.pipeline.base import CharacteristicsExtractor
+from src.ai.utilities import getFeatures
+from src.pipeline.base import (
+    CharacteristicsExtractor,
+    StreamingCharacteristicsExtractor,
+)
+from src.utils.lists import RingBuffer
 
 
 class WindowsTransformer:
@@ -21,20 +25,118 @@ class WindowsTransformer:
 
 
 class FeaturesTransformEMG(CharacteristicsExtractor):
-    def __init__(self) -> None:
-        self.__extractors = [getMAV, getVar, getSD, getSSC, getZC, getRMS]
+    """Computes MAV, Var, SD, SSC, ZC and RMS for each window (row) of X."""
 
     def extract(self, X: np.ndarray) -> np.ndarray:
         return self.transform(X)
 
     def transform(self, X: np.ndarray):
-        dataset = []
+        X = np.asarray(X)
 
-        for example in X:
-            characteristics = [extractor(example) for extractor in self.__extractors]
-            dataset.append(characteristics)
+        return getFeatures(X.reshape(len(X), -1))
 
-        return np.array(dataset)
+
+class MultiChannelFeaturesTransformEMG(CharacteristicsExtractor):
+    """Computes the features of every channel (row) of X in a single call and
+    concatenates them, channel after channel, into a single row."""
+
+    def extract(self, X: np.ndarray) -> np.ndarray:
+        return getFeatures(X).reshape(1, -1)
+
+
+class SlidingFeaturesEMG(StreamingCharacteristicsExtractor):
+    """Computes the same features as `FeaturesTransformEMG` on the last
+    `window_size` samples, updating running sums and edge counts as samples
+    enter and leave the window instead of recomputing them.
+
+    Each sample stores its contributions to the sums : its value, absolute
+    value and square, whether it ends a zero crossing and whether it ends a
+    slope sign change. Edges that partly left the window are the ones stored on
+    its oldest samples. Sums are recomputed from the window every `window_size`
+    samples to avoid drifting.
+    """
+
+    def __init__(self, window_size: int, threshold: float = 0) -> None:
+        self.__window_size = window_size
+        self.__threshold = threshold
+
+        self.__contributions = RingBuffer(size=window_size, shape=(5,))
+        self.__sums = np.zeros(5)
+        self.__previous = np.empty(0)
+        self.__count = 0
+        self.__since_refresh = 0
+
+    @property
+    def window_size(self) -> int:
+        return self.__window_size
+
+    def is_full(self) -> bool:
+        return self.__count == self.__window_size
+
+    def update(self, X: np.ndarray) -> None:
+        X = np.asarray(X, dtype=float)
+
+        for start in range(0, len(X), self.__window_size):
+            self.__update(X[start : start + self.__window_size])
+
+    def extract(self) -> np.ndarray:
+        N = self.__window_size
+        total, total_abs, total_squares, crossings, slope_changes = self.__sums
+        oldest = self.__contributions.oldest(2)
+
+        MAV = total_abs / N
+        Var = total_squares / (N - 1)
+        SD = np.sqrt(max(total_squares - total**2 / N, 0) / (N - 1))
+        SSC = slope_changes - oldest[4, 0] - oldest[4, 1]
+        ZC = crossings - oldest[3, 0]
+        RMS = np.sqrt(total_squares / N)
+
+        return np.array([[MAV, Var, SD, SSC, ZC, RMS]])
+
+    def __update(self, X: np.ndarray) -> None:
+        leaving = self.__count + len(X) - self.__window_size
+
+        if leaving > 0:
+            self.__sums -= np.sum(self.__contributions.oldest(leaving), axis=1)
+
+        contributions = np.empty((5, len(X)))
+        contributions[0] = X
+        np.abs(X, out=contributions[1])
+        np.square(X, out=contributions[2])
+        self.__find_edges(X, crossings=contributions[3], slope_changes=contributions[4])
+
+        self.__sums += np.sum(contributions, axis=1)
+        self.__contributions.add_all(contributions)
+
+        self.__count = min(self.__count + len(X), self.__window_size)
+        self.__since_refresh += len(X)
+
+        if self.__since_refresh >= self.__window_size:
+            self.__sums = np.sum(self.__contributions.to_array(), axis=1)
+            self.__since_refresh = 0
+
+    def __find_edges(
+        self, X: np.ndarray, crossings: np.ndarray, slope_changes: np.ndarray
+    ) -> None:
+        x = np.concatenate((self.__previous, X))
+        self.__previous = x[-2:]
+
+        steps = np.diff(x)
+        is_large = np.abs(steps) >= self.__threshold
+        slopes = np.sign(steps)
+
+        new_crossings = (x[:-1] * x[1:] < 0) & is_large
+        new_slope_changes = (slopes[:-1] * slopes[1:] < 0) & (
+            is_large[1:] | is_large[:-1]
+        )
+
+        for output, edges in [
+            (crossings, new_crossings),
+            (slope_changes, new_slope_changes),
+        ]:
+            count = min(len(X), len(edges))
+            output[: len(X) - count] = 0
+            output[len(X) - count :] = edges[len(edges) - count :]
 
 
 class FeaturesTransformAngle:
@@ -53,75 +53,97 @@ def save_model(model, model_name: str):
 def getMAV(x):
     """
     Computes the Mean Absolute Value (MAV)
-    :param x: EMG signal vector as [1-D numpy array]
-    :return: Mean Absolute Value as [float]
+    :param x: EMG signal vector as [1-D numpy array], or windows as [N-D numpy array]
+    :return: Mean Absolute Value as [float], or one per window
     """
-    MAV = np.mean(np.abs(x))
+    MAV = np.mean(np.abs(x), axis=-1)
     return MAV
 
 
 def getRMS(x):
     """
     Computes the Root Mean Square value (RMS)
-    :param x: EMG signal vector as [1-D numpy array]
-    :return: Root Mean Square value as [float]
+    :param x: EMG signal vector as [1-D numpy array], or windows as [N-D numpy array]
+    :return: Root Mean Square value as [float], or one per window
     """
-    RMS = np.sqrt(np.mean(x**2))
+    RMS = np.sqrt(np.mean(x**2, axis=-1))
     return RMS
 
 
 def getVar(x):
     """
     Computes the Variance of EMG (Var)
-    :param x: EMG signal vector as [1-D numpy array]
-    :return: Variance of EMG as [float]
+    :param x: EMG signal vector as [1-D numpy array], or windows as [N-D numpy array]
+    :return: Variance of EMG as [float], or one per window
     """
-    N = np.size(x)
-    Var = (1 / (N - 1)) * np.sum(x**2)
+    N = np.shape(x)[-1]
+    Var = (1 / (N - 1)) * np.sum(x**2, axis=-1)
     return Var
 
 
 def getSD(x):
     """
     Computes the Standard Deviation (SD)
-    :param x: EMG signal vector as [1-D numpy array]
-    :return: Standard Deviation as [float]
+    :param x: EMG signal vector as [1-D numpy array], or windows as [N-D numpy array]
+    :return: Standard Deviation as [float], or one per window
     """
-    N = np.size(x)
-    xx = np.mean(x)
-    SD = np.sqrt(1 / (N - 1) * np.sum((x - xx) ** 2))
+    N = np.shape(x)[-1]
+    xx = np.mean(x, axis=-1, keepdims=True)
+    SD = np.sqrt(1 / (N - 1) * np.sum((x - xx) ** 2, axis=-1))
     return SD
 
 
 def getZC(x, threshold=0):
     """
     Computes the Zero Crossing value (ZC)
-    :param x: EMG signal vector as [1-D numpy array]
-    :return: Zero Crossing value as [float]
+    :param x: EMG signal vector as [1-D numpy array], or windows as [N-D numpy array]
+    :return: Zero Crossing value as [int], or one per window
     """
-    N = np.size(x)
-    ZC = 0
-    for i in range(N - 1):
-        if (x[i] * x[i + 1] < 0) and (np.abs(x[i] - x[i + 1]) >= threshold):
-            ZC += 1
-    return ZC
+    x = np.asarray(x)
+    return _countZC(x, np.abs(np.diff(x, axis=-1)), threshold)
 
 
 def getSSC(x, threshold=0):
     """
     Computes the Slope Sign Change value (SSC)
-    :param x: EMG signal vector as [1-D numpy array]
-    :return: Slope Sign Change value as [float]
+    :param x: EMG signal vector as [1-D numpy array], or windows as [N-D numpy array]
+    :return: Slope Sign Change value as [int], or one per window
     """
-    N = np.size(x)
-    SSC = 0
-    for i in range(1, N - 1):
-        if (
-            ((x[i] > x[i - 1]) and (x[i] > x[i + 1]))
-            or ((x[i] < x[i - 1]) and (x[i] < x[i + 1]))
-        ) and (
-            (np.abs(x[i] - x[i + 1]) >= threshold)
-            or (np.abs(x[i] - x[i - 1]) >= threshold)
-        ):
-            SSC += 1
-    return SSC
+    x = np.asarray(x)
+    return _countSSC(x, np.abs(np.diff(x, axis=-1)), threshold)
+
+
+def getFeatures(X, threshold=0):
+    """
+    Computes MAV, Var, SD, SSC, ZC and RMS of every window at once, sharing the
+    intermediate arrays between features
+    :param X: EMG windows as [2-D numpy array] (windows x samples)
+    :return: features as [2-D numpy array] (windows x 6)
+    """
+    X = np.asarray(X)
+    N = X.shape[-1]
+
+    squares = X**2
+    steps = np.abs(np.diff(X, axis=-1))
+
+    MAV = np.mean(np.abs(X), axis=-1)
+    Var = (1 / (N - 1)) * np.sum(squares, axis=-1)
+    SD = getSD(X)
+    SSC = _countSSC(X, steps, threshold)
+    ZC = _countZC(X, steps, threshold)
+    RMS = np.sqrt(np.mean(squares, axis=-1))
+
+    return np.stack([MAV, Var, SD, SSC, ZC, RMS], axis=-1).astype(float)
+
+
+def _countZC(x, steps, threshold):
+    crossings = (x[..., :-1] * x[..., 1:] < 0) & (steps >= threshold)
+    return np.count_nonzero(crossings, axis=-1)
+
+
+def _countSSC(x, steps, threshold):
+    previous, current, following = x[..., :-2], x[..., 1:-1], x[..., 2:]
+    is_peak = (current > previous) & (current > following)
+    is_valley = (current < previous) & (current < following)
+    is_large = (steps[..., 1:] >= threshold) | (steps[..., :-1] >= threshold)
+    return np.count_nonzero((is_peak | is_valley) & is_large, axis=-1)
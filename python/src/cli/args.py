@@ -1,12 +1,34 @@
-from typing import List
+from typing import List, Literal, Optional
 
 from tap import Tap
 
 
 class AcquisitionArgs(Tap):
-    serial_port: str  # use 'rand' for random generation, or 'freq:<amp1-freq1-offset1>_<amp2-freq2-offset2>_<...>' for specific frequencies generation
-    csv: List[int] = []  # channels to use for CSV
+    serial_port: str  # use 'rand' for random generation, 'freq:<amp1-freq1-offset1>_<amp2-freq2-offset2>_<...>' for specific frequencies generation, 'synth[:<seed>]' for seeded generation as fast as possible, or 'replay:<path>' ('replay-fast:<path>' to replay as fast as possible) to replay a recorded session (raw captures or saved channels)
+    csv: List[int] = []  # channels to save
     plot: List[int] = []  # channels to use for plotting
+    format: Literal[
+        "csv", "bin"
+    ] = "csv"  # format of saved channels : 'csv', or 'bin' for binary records with a JSON sidecar
+    queue_size: Optional[
+        int
+    ] = None  # maximum number of items waiting between two stages. If not set, plots and predictions keep a few items, and other stages up to 10000.
+    overflow: Optional[
+        Literal["block", "drop-oldest", "drop-newest", "coalesce"]
+    ] = None  # what to do when a queue is full. If not set, plots drop their oldest samples, predictions keep the latest window and other stages block.
+    telemetry: Optional[
+        float
+    ] = None  # time (in seconds) between reports of the queues usage, stages throughput and latency. If not set, nothing is reported.
+    metrics: Optional[str] = None  # file to append telemetry reports to, as JSON lines
+    trace: Optional[
+        str
+    ] = None  # directory where the latency histograms of each stage are dumped at the end of the run. If not set, latencies are not traced.
+    capture: bool = False  # save the raw serial packets, to replay them later, in rotating captures next to the saved channels
+    blocks: bool = False  # pass the samples of each serial packet between stages as one block per channel, instead of one item per sample
+    runtime: Literal[
+        "processes", "threads"
+    ] = "processes"  # run each stage in its own process, or in a thread of a single process
+    fuse: bool = False  # run stages that do not run in parallel in the same process (or thread), printing the resulting partitions
 
     def configure(self) -> None:
         self.add_argument("--plot", metavar="CHANNEL")
@@ -14,13 +36,39 @@ class AcquisitionArgs(Tap):
 
 
 class PredictionArgs(Tap):
-    serial_port: str  # use 'rand' for random generation, or 'freq:<amp1-freq1-offset1>_<amp2-freq2-offset2>_<...>' for specific frequencies generation
+    serial_port: str  # use 'rand' for random generation, 'freq:<amp1-freq1-offset1>_<amp2-freq2-offset2>_<...>' for specific frequencies generation, 'synth[:<seed>]' for seeded generation as fast as possible, or 'replay:<path>' ('replay-fast:<path>' to replay as fast as possible) to replay a recorded session (raw captures or saved channels)
     predict: List[int] = []  # channels to use for prediction
     model: str  # saved model name to use for regression
     plot: List[int] = []  # channels to use for plotting
     animate: bool = (
         False  # show animation of predicted angles. If False, will print to console.
     )
+    hop: Optional[
+        float
+    ] = None  # time (in seconds) between predictions, using overlapping 100 ms windows. If not set, windows do not overlap.
+    queue_size: Optional[
+        int
+    ] = None  # maximum number of items waiting between two stages. If not set, plots and predictions keep a few items, and other stages up to 10000.
+    overflow: Optional[
+        Literal["block", "drop-oldest", "drop-newest", "coalesce"]
+    ] = None  # what to do when a queue is full. If not set, plots drop their oldest samples, predictions keep the latest window and other stages block.
+    telemetry: Optional[
+        float
+    ] = None  # time (in seconds) between reports of the queues usage, stages throughput and latency. If not set, nothing is reported.
+    metrics: Optional[str] = None  # file to append telemetry reports to, as JSON lines
+    trace: Optional[
+        str
+    ] = None  # directory where the latency histograms of each stage are dumped at the end of the run. If not set, latencies are not traced.
+    capture: bool = False  # save the raw serial packets, to replay them later, in rotating captures in 'data/pred-<timestamp>'
+    blocks: bool = False  # pass the samples of each serial packet between stages as one block per channel, instead of one item per sample
+    runtime: Literal[
+        "processes", "threads"
+    ] = "processes"  # run each stage in its own process, or in a thread of a single process
+    fuse: bool = False  # run stages that do not run in parallel in the same process (or thread), printing the resulting partitions
+    batch: int = 1  # maximum number of windows predicted in a single call to the model. If 1, each window is predicted on its own.
+    batch_latency: float = (
+        0.05  # maximum time (in seconds) a window waits for the others of its batch
+    )
 
     def configure(self) -> None:
         self.add_argument("--predict", metavar="CHANNEL", required=True)
@@ -28,9 +76,28 @@ class PredictionArgs(Tap):
 
 
 class SpeedTestArgs(Tap):
-    serial_port: str  # use 'rand' for random generation, or 'freq:<amp1-freq1-offset1>_<amp2-freq2-offset2>_<...>' for specific frequencies generation
+    serial_port: str  # use 'rand' for random generation, 'freq:<amp1-freq1-offset1>_<amp2-freq2-offset2>_<...>' for specific frequencies generation, 'synth[:<seed>]' for seeded generation as fast as possible, or 'replay:<path>' ('replay-fast:<path>' to replay as fast as possible) to replay a recorded session (raw captures or saved channels)
 
 
 class DetectionArgs(Tap):
     timeout: int = None  # tiemout (in seconds) before automatically closing the app
     camera: int = 0  # camera device number to use
+
+
+class PipelineBenchmarkArgs(Tap):
+    output: Optional[
+        str
+    ] = None  # JSON file to save the results to. If not set, results are saved to 'benchmarks/pipeline-<commit>.json'.
+    baseline: Optional[
+        str
+    ] = None  # JSON file of previous results, to compare the throughputs with
+    samples: int = 250000  # number of synthetic samples given to each stage
+    duration: float = 10  # time (in seconds) each experiment runs for
+    seed: int = 0  # seed of the synthetic source
+    model: str = (
+        "LinearRegression"  # saved model name used by the prediction experiments
+    )
+    skip_stages: bool = False  # do not benchmark each stage on its own
+    skip_experiments: bool = (
+        False  # do not benchmark the experiments, where each stage runs in its process
+    )
@@ -9,6 +9,28 @@ class CharacteristicsExtractor(ABC):
         raise NotImplementedError()
 
 
+class StreamingCharacteristicsExtractor(ABC):
+    """Extracts characteristics from a sliding window of samples, which gets
+    updated as new samples come in."""
+
+    @property
+    @abstractmethod
+    def window_size(self) -> int:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def update(self, X: np.ndarray) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def is_full(self) -> bool:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def extract(self) -> np.ndarray:
+        raise NotImplementedError()
+
+
 class PredictionModel(ABC):
     @abstractmethod
     def predict(self, X: np.ndarray) -> np.ndarray:
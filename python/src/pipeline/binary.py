@@ -0,0 +1,132 @@
+import json
+from dataclasses import dataclass
+from os import makedirs, path
+from typing import IO, Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from modupipe.loader import Sink
+
+from src.pipeline.data import ProcessedBlock, ProcessedData
+from src.utils.files import WriteBehindFile, WriteStats
+from src.utils.loggers import Logger
+
+FORMAT_VERSION = 1
+
+
+def metadata_file(file: str) -> str:
+    return f"{path.splitext(file)[0]}.json"
+
+
+class BinaryWriter(Sink[Union[ProcessedData[float], ProcessedBlock]]):
+    """Saves the filtered samples of a channel as fixed-width binary records
+    (float64 timestamp, `value_dtype` value), described by a JSON sidecar file
+    with the same name. Values saved as integers are rounded, and clipped to the
+    range of `value_dtype`."""
+
+    def __init__(
+        self,
+        file: str,
+        batch_size: int,
+        channel: int,
+        sample_rate: float,
+        value_dtype: Union[str, type] = np.float32,
+        flush_interval: Optional[float] = None,
+        max_pending_batches: int = 64,
+        logger: Optional[Logger] = None,
+    ) -> None:
+        super().__init__()
+        self.__dtype = np.dtype(
+            [("timestamp", "<f8"), ("value", np.dtype(value_dtype).newbyteorder("<"))]
+        )
+
+        if not path.exists(path.dirname(file)):
+            makedirs(path.dirname(file))
+
+        metadata = {
+            "version": FORMAT_VERSION,
+            "channel": channel,
+            "sample_rate": sample_rate,
+            "fields": [
+                [name, self.__dtype[name].str] for name in ["timestamp", "value"]
+            ],
+        }
+
+        with open(metadata_file(file), "w") as metadata_output:
+            json.dump(metadata, metadata_output, indent=2)
+
+        open(file, "wb").close()
+
+        self.__output = WriteBehindFile(
+            file,
+            self.__write_rows,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            max_pending_batches=max_pending_batches,
+            mode="ab",
+            logger=logger,
+        )
+
+    @property
+    def stats(self) -> WriteStats:
+        return self.__output.stats
+
+    def load(self, item: Union[ProcessedData[float], ProcessedBlock]) -> None:
+        if isinstance(item, ProcessedBlock):
+            rows = self.__records(item.time, item.filtered)
+            self.__output.append_batch(rows, len(rows))
+            return
+
+        self.__output.append((item.time, item.filtered))
+
+    def close(self) -> None:
+        self.__output.close()
+
+    def __write_rows(self, output: IO, rows: Union[List[Tuple], np.ndarray]):
+        if isinstance(rows, list):
+            columns = np.array(rows, dtype=np.float64).reshape(-1, 2)
+            rows = self.__records(columns[:, 0], columns[:, 1])
+
+        output.write(rows.tobytes())
+
+    def __records(self, timestamps: np.ndarray, values: np.ndarray) -> np.ndarray:
+        records = np.empty(len(timestamps), dtype=self.__dtype)
+        records["timestamp"] = timestamps
+        value_dtype = self.__dtype["value"]
+
+        if np.issubdtype(value_dtype, np.integer):
+            limits = np.iinfo(value_dtype)
+            values = np.clip(np.rint(values), limits.min, limits.max)
+
+        records["value"] = values
+        return records
+
+
+@dataclass
+class BinaryRecording:
+    timestamp: np.ndarray
+    value: np.ndarray
+    metadata: Dict[str, Any]
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+
+def read_binary(file: str) -> BinaryRecording:
+    """Memory-maps a file saved by `BinaryWriter`. The returned arrays are views
+    on the file, so nothing is read until they are accessed."""
+    with open(metadata_file(file)) as metadata_input:
+        metadata = json.load(metadata_input)
+
+    dtype = np.dtype([(name, format) for name, format in metadata["fields"]])
+
+    # An interrupted write can leave an incomplete record at the end
+    nb_records = path.getsize(file) // dtype.itemsize
+
+    if nb_records == 0:
+        records = np.empty(0, dtype=dtype)
+    else:
+        records = np.memmap(file, dtype=dtype, mode="r", shape=(nb_records,))
+
+    return BinaryRecording(
+        timestamp=records["timestamp"], value=records["value"], metadata=metadata
+    )
@@ -0,0 +1,111 @@
+import os
+import struct
+from datetime import datetime
+from glob import glob
+from typing import IO, Iterator, List, Optional
+
+from modupipe.loader import Sink
+
+from src.pipeline.data import SerialData
+from src.utils.files import WriteBehindFile, WriteStats
+from src.utils.loggers import Logger
+
+CAPTURE_EXTENSION = ".cap"
+MAGIC = b"UARTCAP1"
+
+# Each packet is stored as this header, followed by its data :
+# data length, start and end (POSIX timestamps), number of channels, message length
+HEADER = struct.Struct("<IddBB")
+
+
+def encode_packet(packet: SerialData[bytes]) -> bytes:
+    return (
+        HEADER.pack(
+            len(packet.value),
+            packet.start.timestamp(),
+            packet.end.timestamp(),
+            packet.nb_channels,
+            packet.message_length,
+        )
+        + packet.value
+    )
+
+
+class CaptureWriter(Sink[SerialData[bytes]]):
+    """Appends the raw serial packets to captures in `directory`, starting a new
+    capture once one reaches `max_file_size` bytes. Packets are only queued by
+    `load` : they are encoded and written by a background thread."""
+
+    def __init__(
+        self,
+        directory: str,
+        max_file_size: int = 64 * 2**20,
+        batch_size: int = 64,
+        flush_interval: Optional[float] = 1.0,
+        max_pending_batches: int = 64,
+        logger: Optional[Logger] = None,
+    ) -> None:
+        super().__init__()
+        os.makedirs(directory, exist_ok=True)
+
+        self.__output = WriteBehindFile(
+            os.path.join(directory, f"serial-{{index:05d}}{CAPTURE_EXTENSION}"),
+            self.__write_packets,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            max_pending_batches=max_pending_batches,
+            mode="ab",
+            logger=logger,
+            max_file_size=max_file_size,
+            start_file=_write_magic,
+        )
+
+    @property
+    def stats(self) -> WriteStats:
+        return self.__output.stats
+
+    def load(self, item: SerialData[bytes]) -> None:
+        self.__output.append(item)
+
+    def close(self) -> None:
+        self.__output.close()
+
+    def __write_packets(self, output: IO, packets: List[SerialData[bytes]]) -> None:
+        output.write(b"".join(map(encode_packet, packets)))
+
+
+def _write_magic(output: IO) -> None:
+    output.write(MAGIC)
+
+
+def read_capture(file: str) -> Iterator[SerialData[bytes]]:
+    """Reads the packets of a raw capture, in the order they were received. An
+    interrupted write can leave an incomplete packet at the end, which is
+    ignored."""
+    with open(file, "rb") as capture:
+        if capture.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{file}' is not a raw capture")
+
+        while True:
+            header = capture.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+
+            length, start, end, nb_channels, message_length = HEADER.unpack(header)
+            value = capture.read(length)
+            if len(value) < length:
+                return
+
+            yield SerialData(
+                value=value,
+                start=datetime.fromtimestamp(start),
+                end=datetime.fromtimestamp(end),
+                nb_channels=nb_channels,
+                length=length,
+                message_length=message_length,
+            )
+
+
+def capture_files(directory: str) -> List[str]:
+    """Lists the raw captures of a directory, oldest first."""
+    return sorted(glob(os.path.join(directory, f"*{CAPTURE_EXTENSION}")))
@@ -1,15 +1,15 @@
-from typing import TypeVar
+from typing import TypeVar, Union
 
 from modupipe.base import Condition
 
-from src.pipeline.data import ProcessedData
+from src.pipeline.data import ProcessedBlock, ProcessedData
 
 T = TypeVar("T")
 
 
-class ChannelSelection(Condition[ProcessedData[T]]):
+class ChannelSelection(Condition[Union[ProcessedData[T], ProcessedBlock]]):
     def __init__(self, channel: int) -> None:
         self.channel = channel
 
-    def check(self, item: ProcessedData[T]) -> bool:
+    def check(self, item: Union[ProcessedData[T], ProcessedBlock]) -> bool:
         return item.channel == self.channel
@@ -1,15 +1,15 @@
 import csv
 from abc import ABC, abstractmethod
 from os import makedirs, path
-from typing import List, Optional
+from typing import IO, Iterable, List, Optional, Union
 
 from modupipe.loader import Sink
 
-from src.pipeline.data import ProcessedData
+from src.pipeline.data import ProcessedBlock, ProcessedData
+from src.utils.files import WriteBehindFile, WriteStats
+from src.utils.loggers import Logger
 from src.utils.types import InputType
 
-# TODO add tests
-
 
 class CSVSavingStrategy(ABC):
     @abstractmethod
@@ -20,6 +20,10 @@ class CSVSavingStrategy(ABC):
     def create_row(self, data: ProcessedData[InputType]) -> List[str]:
         raise NotImplementedError()
 
+    @abstractmethod
+    def create_rows(self, block: ProcessedBlock) -> Iterable[List[str]]:
+        raise NotImplementedError()
+
 
 class Complete(CSVSavingStrategy):
     def create_header(self) -> Optional[List[str]]:
@@ -28,6 +32,13 @@ class Complete(CSVSavingStrategy):
     def create_row(self, data: ProcessedData[InputType]) -> List[str]:
         return [str(data.channel), str(data.time), str(data.filtered)]
 
+    def create_rows(self, block: ProcessedBlock) -> Iterable[List[str]]:
+        channel = str(block.channel)
+        return (
+            [channel, str(time), str(value)]
+            for time, value in zip(block.time.tolist(), block.filtered.tolist())
+        )
+
 
 class ValueOnly(CSVSavingStrategy):
     def create_header(self) -> Optional[List[str]]:
@@ -36,6 +47,9 @@ class ValueOnly(CSVSavingStrategy):
     def create_row(self, data: ProcessedData[InputType]) -> List[str]:
         return [str(data.filtered)]
 
+    def create_rows(self, block: ProcessedBlock) -> Iterable[List[str]]:
+        return ([str(value)] for value in block.filtered.tolist())
+
 
 class WithoutChannel(CSVSavingStrategy):
     def create_header(self) -> Optional[List[str]]:
@@ -44,34 +58,76 @@ class WithoutChannel(CSVSavingStrategy):
     def create_row(self, data: ProcessedData[InputType]) -> List[str]:
         return [str(data.time), str(data.filtered)]
 
-
-class CSVWriter(Sink[ProcessedData[InputType]]):
-    def __init__(self, file: str, batch_size: int, strategy: CSVSavingStrategy) -> None:
+    def create_rows(self, block: ProcessedBlock) -> Iterable[List[str]]:
+        return (
+            [str(time), str(value)]
+            for time, value in zip(block.time.tolist(), block.filtered.tolist())
+        )
+
+
+class CSVWriter(Sink[Union[ProcessedData[InputType], ProcessedBlock]]):
+    """Appends the items to a CSV file. Rows are formatted and written by a
+    background thread, in batches of `batch_size` rows or every `flush_interval`
+    seconds, whichever comes first. Blocks are written as a batch of their own."""
+
+    def __init__(
+        self,
+        file: str,
+        batch_size: int,
+        strategy: CSVSavingStrategy,
+        flush_interval: Optional[float] = None,
+        max_pending_batches: int = 64,
+        logger: Optional[Logger] = None,
+    ) -> None:
         super().__init__()
-        self.__file = file
-        self.__batch_size = batch_size
         self.__strategy = strategy
 
-        self.__rows_buffer: List[List[str]] = []
-
         if not path.exists(path.dirname(file)):
             makedirs(path.dirname(file))
 
         header = strategy.create_header()
 
         if header:
-            self.__write_rows([header])
-
-    def load(self, item: ProcessedData[InputType]) -> None:
-        self.__rows_buffer.append(self.__strategy.create_row(item))
-
-        if len(self.__rows_buffer) == self.__batch_size:
-            self.__write_rows(self.__rows_buffer)
-            self.__rows_buffer = []
-
-    def __write_rows(self, rows):
-        with open(self.__file, "a+", newline="\n") as csvfile:
-            writer = csv.writer(
-                csvfile, delimiter=";", quotechar="\\", quoting=csv.QUOTE_MINIMAL
-            )
-            writer.writerows(rows)
+            with open(file, "a+", newline="\n") as csvfile:
+                self.__create_writer(csvfile).writerow(header)
+
+        self.__output = WriteBehindFile(
+            file,
+            self.__write_rows,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            max_pending_batches=max_pending_batches,
+            newline="\n",
+            logger=logger,
+        )
+
+    @property
+    def stats(self) -> WriteStats:
+        return self.__output.stats
+
+    def load(self, item: Union[ProcessedData[InputType], ProcessedBlock]) -> None:
+        if isinstance(item, ProcessedBlock):
+            self.__output.append_batch(item, len(item))
+            return
+
+        self.__output.append(item)
+
+    def close(self) -> None:
+        self.__output.close()
+
+    def __write_rows(
+        self,
+        csvfile: IO,
+        items: Union[List[ProcessedData[InputType]], ProcessedBlock],
+    ):
+        if isinstance(items, ProcessedBlock):
+            rows = self.__strategy.create_rows(items)
+        else:
+            rows = (self.__strategy.create_row(item) for item in items)
+
+        self.__create_writer(csvfile).writerows(rows)
+
+    def __create_writer(self, csvfile: IO):
+        return csv.writer(
+            csvfile, delimiter=";", quotechar="\\", quoting=csv.QUOTE_MINIMAL
+        )
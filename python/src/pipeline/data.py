@@ -2,8 +2,13 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Generic, TypeVar
 
+import numpy as np
+
 DataType = TypeVar("DataType")
 
+# Items carry the `ingress` time of the serial packet their (newest) data was read
+# from, as given by `time.monotonic`, to measure latencies across processes.
+
 
 @dataclass
 class SerialData(Generic[DataType]):
@@ -13,6 +18,7 @@ class SerialData(Generic[DataType]):
     nb_channels: int
     length: int
     message_length: int
+    ingress: float = 0.0
 
 
 @dataclass
@@ -21,6 +27,22 @@ class ProcessedData(Generic[DataType]):
     channel: int
     original: DataType
     filtered: DataType
+    ingress: float = 0.0
+
+
+@dataclass
+class ProcessedBlock:
+    """Consecutive samples of a single channel, stored as arrays instead of one
+    `ProcessedData` per sample."""
+
+    time: np.ndarray
+    channel: int
+    original: np.ndarray
+    filtered: np.ndarray
+    ingress: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.time)
 
 
 @dataclass
@@ -28,3 +50,4 @@ class RangeData(Generic[DataType]):
     start: float
     end: float
     value: DataType
+    ingress: float = 0.0
@@ -1,22 +1,25 @@
-import multiprocessing
 import os
 import pathlib
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
-from modupipe.loader import LoaderList, OnCondition, PutToQueue, Sink
-from modupipe.queue import PutNonBlocking, Queue
-from modupipe.runnable import MultiProcess, Runnable
+from modupipe.runnable import Runnable
 
 from src.pipeline.conditions import ChannelSelection
-from src.pipeline.data import ProcessedData, SerialData
 from src.pipeline.experiment.pipelines import (
-    FilteringPipelineFactory,
-    PlottingPipelineFactory,
-    ProcessingPipelineFactory,
-    SavingPipelineFactory,
-    SourcePipelineFactory,
+    FilteringStageFactory,
+    PlottingStageFactory,
+    ProcessingStageFactory,
+    SavingStageFactory,
+    SourceStageFactory,
+    gives_filtered_samples,
 )
+from src.pipeline.graph import Stage, StageGraph, compile_graph
+from src.pipeline.queues import QueueFactory
+from src.pipeline.runtime import Runtime, Service, create_runtime
+from src.pipeline.telemetry import Telemetry
+from src.pipeline.tracing import LatencyTracer
+from src.utils.loggers import ConsoleLogger
 
 
 class AcquisitionExperimentFactory:
@@ -25,10 +28,18 @@ class AcquisitionExperimentFactory:
     Pipeline architecture :
     ```
     serial ─⏵ processing ┬─⏵ filtering ch.1 ┬─⏵ [csv]
-                         │                  └─⏵ [plot]
-                         └─⏵ filtering ch.2 ┬─⏵ [csv]
-                                            └─⏵ [plot]
+                         │                  └───┐
+                         └─⏵ filtering ch.2 ┬───┴─⏵ [plot]
+                                            └─⏵ [csv]
     ```
+
+    With `blocks`, the processing stage splits each serial packet into a block of
+    samples per channel, which goes through the next stages as a single item.
+
+    Each stage runs in its own process, or in a thread of the calling process
+    with the `threads` runtime. The plot is then drawn from the calling thread.
+    With `fuse`, stages that do not run in parallel share their process or
+    thread instead (see `compile_graph`).
     """
 
     def create(
@@ -36,64 +47,87 @@ class AcquisitionExperimentFactory:
         serial_port: str,
         plotting_channels: List[int] = [],
         saving_channels: List[int] = [],
+        saving_format: str = "csv",
+        queues: Optional[QueueFactory] = None,
+        telemetry_interval: Optional[float] = None,
+        metrics_file: Optional[str] = None,
+        tracer: Optional[LatencyTracer] = None,
+        capture: bool = False,
+        blocks: bool = False,
+        runtime: Runtime = "processes",
+        fuse: bool = False,
     ) -> Runnable:
         experiment_path = os.path.join(
             pathlib.Path.cwd(), "data", f"acq-{datetime.now().timestamp()}"
         )
-        pipelines: List[Runnable] = []
+        queues = queues or QueueFactory(
+            runtime=runtime, metered=telemetry_interval is not None
+        )
+        if queues.runtime != runtime:
+            raise ValueError(f"The queues must be created for the '{runtime}' runtime")
+        if telemetry_interval is not None and not queues.metered:
+            raise ValueError("The queues must be metered to report their usage")
 
-        source_out_queue = Queue[SerialData[bytes]](
-            multiprocessing.Queue()
-        )  # TODO maxsize?
+        graph = StageGraph()
 
-        source_pipeline = SourcePipelineFactory().create(
-            serial_port=serial_port, out_queue=source_out_queue
+        source = graph.add(
+            SourceStageFactory().create(
+                serial_port=serial_port,
+                capture_path=experiment_path if capture else None,
+            )
         )
-        pipelines.append(source_pipeline)
 
-        processing_sinks: List[Sink[ProcessedData[int]]] = []
+        processing = graph.add(
+            ProcessingStageFactory().create(tracer=tracer, blocks=blocks)
+        )
+        graph.connect(source, processing, name="serial")
+
+        plotting: Optional[Stage] = None
+        if len(plotting_channels) != 0:
+            plotting = graph.add(
+                PlottingStageFactory().create(channels=plotting_channels)
+            )
+
         used_channels = set(plotting_channels + saving_channels)
 
         for channel in used_channels:
-            channel_filtering_sinks: List[Sink[ProcessedData[int]]] = []
-
-            if channel in plotting_channels:
-                queue = Queue(multiprocessing.Queue())
-                channel_filtering_sinks.append(
-                    PutToQueue(queue, strategy=PutNonBlocking())
+            filtering = graph.add(
+                FilteringStageFactory().create(
+                    channel=channel,
+                    tracer=tracer,
+                    blocks=blocks,
+                    filtered=gives_filtered_samples(source),
                 )
-                pipeline = PlottingPipelineFactory().create(
-                    channel=channel, source_queue=queue
-                )
-                pipelines.append(pipeline)
+            )
+            graph.connect(processing, filtering, condition=ChannelSelection(channel))
+
+            if plotting is not None and channel in plotting_channels:
+                graph.connect(filtering, plotting)
 
             if channel in saving_channels:
-                queue = Queue(multiprocessing.Queue())
-                channel_filtering_sinks.append(
-                    PutToQueue(queue, strategy=PutNonBlocking())
+                saving = graph.add(
+                    SavingStageFactory().create(
+                        channel=channel,
+                        experiment_path=experiment_path,
+                        file_format=saving_format,
+                        blocks=blocks,
+                    )
                 )
-
-                pipeline = SavingPipelineFactory().create(
-                    channel=channel, source_queue=queue, experiment_path=experiment_path
+                graph.connect(filtering, saving)
+
+        compiled = compile_graph(graph, queues, fuse=fuse)
+        ConsoleLogger(name="acquisition").info(compiled.describe())
+        services: List[Service] = []
+
+        if telemetry_interval is not None:
+            services.append(
+                Telemetry(
+                    queues=queues.queues,
+                    interval=telemetry_interval,
+                    metrics_file=metrics_file,
                 )
-                pipelines.append(pipeline)
-
-            channel_processing_out_queue = Queue(multiprocessing.Queue())
-            channel_processing_sink = OnCondition(
-                ChannelSelection(channel),
-                PutToQueue(channel_processing_out_queue, strategy=PutNonBlocking()),
-            )
-            processing_sinks.append(channel_processing_sink)
-
-            channel_filtering_pipeline = FilteringPipelineFactory().create(
-                in_queue=channel_processing_out_queue,
-                loader=LoaderList(channel_filtering_sinks),
             )
-            pipelines.append(channel_filtering_pipeline)
 
-        processing_pipeline = ProcessingPipelineFactory().create(
-            in_queue=source_out_queue, sink=LoaderList(processing_sinks)
+        return create_runtime(
+            runtime, compiled.runnables, main=compiled.main, services=services
         )
-        pipelines.append(processing_pipeline)
-
-        return MultiProcess(pipelines)
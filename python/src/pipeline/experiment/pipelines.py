@@ -1,159 +1,271 @@
 import os
-from datetime import datetime
-from typing import Any, List
+from functools import partial
+from typing import Any, Callable, List, Optional
 
-import numpy as np
-from modupipe.extractor import ExtractorList, GetFromQueue
-from modupipe.loader import LoaderList, PutToQueue, Sink
-from modupipe.mapper import PushTo
-from modupipe.queue import GetBlocking, PutNonBlocking, Queue
-from modupipe.runnable import FullPipeline, NamedRunnable, Retry, Runnable
+from modupipe.loader import LoaderList, Sink
+from modupipe.mapper import Mapper, PushTo
+from modupipe.runnable import Retry, Runnable
 
-from src.pipeline.base import CharacteristicsExtractor, PredictionModel
+from src.pipeline.base import (
+    CharacteristicsExtractor,
+    PredictionModel,
+    StreamingCharacteristicsExtractor,
+)
+from src.pipeline.binary import BinaryWriter
+from src.pipeline.capture import CaptureWriter
 from src.pipeline.csv import CSVWriter, WithoutChannel
-from src.pipeline.data import ProcessedData, RangeData, SerialData
-from src.pipeline.loaders import LogRate, LogTime, Plot
+from src.pipeline.data import ProcessedData
+from src.pipeline.graph import QueueSpec, Stage
+from src.pipeline.loaders import LogRate, LogTime, PlotChannels
 from src.pipeline.mappers import (
+    ConcatenateRows,
     ExtractCharacteristics,
+    ExtractSlidingCharacteristics,
     MergeRangeData,
     NotchDC,
     NotchFrequencyOnline,
     Predict,
     ProcessFromSerial,
+    StackChannels,
     TimedBuffer,
     ToInt,
     ToNumpy,
 )
+from src.pipeline.replay import ReplaySource
+from src.pipeline.runtime import RetryOnError
 from src.pipeline.serial import SerialSourceFactory
+from src.pipeline.telemetry import LatencyGauge, MeasureLatency
+from src.pipeline.tracing import LatencyTracer, TraceLatency
 from src.utils.loggers import ConsoleLogger
-from src.utils.plot import RefreshingPlot, TimedPlotUpdate
+from src.utils.plot import BlittingPlot, ChannelsPlotUpdate
 
+SAMPLING_FREQUENCY = 2500
 
-class FilteringPipelineFactory:
-    def create(
-        self, in_queue: Queue[ProcessedData[int]], loader: Sink[ProcessedData[int]]
-    ) -> Runnable:
-        source = GetFromQueue(in_queue, strategy=GetBlocking())
-        mapper = NotchDC(R=0.99) + NotchFrequencyOnline(
-            frequency=60, sampling_frequency=2500
-        )
 
-        return NamedRunnable(
-            "Filtering pipeline", FullPipeline(source + mapper + PushTo(loader))
+class SourceStageFactory:
+    def create(self, serial_port: str, capture_path: Optional[str] = None) -> Stage:
+        source = SerialSourceFactory().create(port=serial_port)
+        capture: Optional[CaptureWriter] = None
+        wrap: Optional[Callable[[Runnable], Runnable]] = None
+
+        if capture_path is not None:
+            capture = CaptureWriter(capture_path, logger=ConsoleLogger(name="capture"))
+
+        # A replay ends the experiment once it is over, instead of being retried
+        if not isinstance(source, ReplaySource):
+            wrap = partial(Retry, nb_times=10)
+
+        # Reading the port must not wait for the packets to be handled
+        return Stage(
+            name="serial", source=source, sink=capture, wrap=wrap, isolated=True
         )
 
 
-class SourcePipelineFactory:
-    def create(self, serial_port: str, out_queue: Queue[SerialData[bytes]]) -> Runnable:
-        source = SerialSourceFactory().create(port=serial_port)
-        loader = PutToQueue(out_queue, strategy=PutNonBlocking())
+def gives_filtered_samples(source: Stage) -> bool:
+    """Whether the samples of a source stage were already filtered, as when it
+    replays saved channels."""
+    return isinstance(source.source, ReplaySource) and source.source.filtered
 
-        pipeline = FullPipeline(source + PushTo(loader))
-        return NamedRunnable("Serial source pipeline", Retry(pipeline, nb_times=10))
 
+class ProcessingStageFactory:
+    def create(
+        self, tracer: Optional[LatencyTracer] = None, blocks: bool = False
+    ) -> Stage:
+        logger = ConsoleLogger(name="processing")
+        mapper = ProcessFromSerial(batched=blocks) + ToInt()
+
+        if tracer is not None:
+            mapper = mapper + TraceLatency(tracer, "processing")
+        mapper = mapper + PushTo(
+            LoaderList([LogRate(logger=logger), LogTime(logger=logger)])
+        )
 
-class ProcessingPipelineFactory:
+        return Stage(
+            name="processing",
+            mapper=mapper,
+            queue=QueueSpec(kind="serial"),
+            wrap=partial(RetryOnError, nb_times=1),
+        )
+
+
+class FilteringStageFactory:
     def create(
         self,
-        in_queue: Queue[SerialData[bytes]],
-        sink: Sink[ProcessedData[int]],
-    ) -> Runnable:
-        logger = ConsoleLogger(name="processing")
+        channel: int,
+        tracer: Optional[LatencyTracer] = None,
+        blocks: bool = False,
+        filtered: bool = False,
+    ) -> Stage:
+        """Samples which were already `filtered` go through as they are."""
+        stage = f"filtering ch.{channel}"
+        mapper: Optional[Mapper[Any, Any]] = None
+
+        if not filtered:
+            mapper = NotchDC(R=0.99) + NotchFrequencyOnline(
+                frequency=60, sampling_frequency=SAMPLING_FREQUENCY
+            )
 
-        source = GetFromQueue(in_queue, strategy=GetBlocking())
-        mapper = ProcessFromSerial() + ToInt()
-        loader = LoaderList([sink, LogRate(logger=logger), LogTime(logger=logger)])
+        if tracer is not None:
+            tracing = TraceLatency(tracer, stage)
+            mapper = tracing if mapper is None else mapper + tracing
 
-        pipeline = FullPipeline(source + mapper + PushTo(loader))
-        return NamedRunnable("Processing pipeline", Retry(pipeline, nb_times=1))
+        return Stage(
+            name=stage,
+            mapper=mapper,
+            queue=QueueSpec(
+                kind="processing", samples=True, filtered=False, blocks=blocks
+            ),
+        )
 
 
-class SavingPipelineFactory:
+class SavingStageFactory:
     def create(
         self,
         channel: int,
-        source_queue: Queue[ProcessedData[int]],
         experiment_path: str,
-    ) -> Runnable:
-        source = GetFromQueue(source_queue, strategy=GetBlocking())
+        file_format: str = "csv",
+        blocks: bool = False,
+    ) -> Stage:
+        logger = ConsoleLogger(name=f"saving channel {channel}")
 
-        filename = os.path.join(experiment_path, f"emg-{channel}.csv")
-        loader = CSVWriter[ProcessedData[int]](
-            file=filename, batch_size=100, strategy=WithoutChannel()
-        )
+        loader: Sink[ProcessedData[int]]
 
-        return NamedRunnable(
-            "CSV saving pipeline", FullPipeline(source + PushTo(loader))
-        )
+        if file_format == "csv":
+            filename = os.path.join(experiment_path, f"emg-{channel}.csv")
+            loader = CSVWriter[ProcessedData[int]](
+                file=filename,
+                batch_size=100,
+                strategy=WithoutChannel(),
+                flush_interval=1.0,
+                logger=logger,
+            )
+        elif file_format == "bin":
+            filename = os.path.join(experiment_path, f"emg-{channel}.bin")
+            loader = BinaryWriter(
+                file=filename,
+                batch_size=1000,
+                channel=channel,
+                sample_rate=SAMPLING_FREQUENCY,
+                flush_interval=1.0,
+                logger=logger,
+            )
+        else:
+            raise ValueError(f"Unknown saving format '{file_format}'")
 
+        return Stage(
+            name=f"saving ch.{channel}",
+            sink=loader,
+            queue=QueueSpec(kind="saving", samples=True, blocks=blocks),
+        )
 
-class PlottingPipelineFactory:
-    def create(self, channel: int, source_queue: Queue[ProcessedData[int]]) -> Runnable:
-        source = GetFromQueue(source_queue, strategy=GetBlocking())
 
-        plot = RefreshingPlot(
+class PlottingStageFactory:
+    def create(self, channels: List[int]) -> Stage:
+        plot = BlittingPlot(
+            channels=channels,
             series=["original", "filtered"],
-            title=f"Data from channel {channel}",
+            title="Data from channels",
             x_label="time",
             y_label="value",
         )
-        plot_strategy = TimedPlotUpdate(
+        plot_strategy = ChannelsPlotUpdate(
             plot=plot,
+            channels=channels,
             n_ys=2,
             window_size=2000,
-            update_time=0.5,
+            fps=20,
             plot_time=False,
         )
-        loader = Plot(plot_strategy)
 
-        return NamedRunnable("Plotting pipeline", FullPipeline(source + PushTo(loader)))
+        # Fed by every filtering stage, so it cannot be a shared memory queue
+        return Stage(
+            name="plotting",
+            sink=PlotChannels(plot_strategy),
+            queue=QueueSpec(kind="plotting"),
+            merge="interleave",
+            main=True,
+        )
 
 
-class ExtractionPipelineFactory:
+class ExtractionStageFactory:
     def create(
         self,
-        in_queue: Queue[ProcessedData[int]],
-        out_queue: Queue[RangeData[np.ndarray]],
         extractor: CharacteristicsExtractor,
-    ):
-        source = GetFromQueue(in_queue, strategy=GetBlocking())
+        tracer: Optional[LatencyTracer] = None,
+        blocks: bool = False,
+        window_in_seconds: float = 1 / 10,
+        per_channel: bool = False,
+    ) -> Stage:
+        """Without `per_channel`, the characteristics of every channel are
+        concatenated into a single row, otherwise `extractor` gives a row per
+        channel."""
         mapper = (
-            TimedBuffer(time_in_seconds=1 / 10)
-            + ToNumpy(to2D=True)
+            MergeRangeData()
+            + StackChannels()
             + ExtractCharacteristics(extractor=extractor)
-            + ToNumpy(flatten=True)
+            + ToNumpy(flatten=not per_channel)
         )
-        loader = PutToQueue(out_queue, strategy=PutNonBlocking())
 
-        return NamedRunnable(
-            "Extraction pipeline", FullPipeline(source + mapper + PushTo(loader))
+        if tracer is not None:
+            mapper = mapper + TraceLatency(tracer, "extraction")
+
+        return Stage(
+            name="extraction",
+            mapper=mapper,
+            queue=QueueSpec(kind="extraction", samples=True, blocks=blocks),
+            merge="align",
+            input_mapper=lambda: TimedBuffer(time_in_seconds=window_in_seconds),
+            skew_tolerance=window_in_seconds / 2,
         )
 
 
-class PredictionPipelineFactory:
+class SlidingExtractionStageFactory:
     def create(
-        self, in_queues: List[Queue[RangeData[np.ndarray]]], model: PredictionModel
-    ):
-        # logger = ConsoleLogger(name="prediction")
-        source = ExtractorList(
-            [GetFromQueue(queue, strategy=GetBlocking()) for queue in in_queues]
+        self,
+        create_extractor: Callable[[], StreamingCharacteristicsExtractor],
+        hop_size: int,
+        tracer: Optional[LatencyTracer] = None,
+        blocks: bool = False,
+        per_channel: bool = False,
+    ) -> Stage:
+        """Without `per_channel`, the characteristics of every channel are
+        concatenated into a single row, otherwise each channel gives a row."""
+        mapper = MergeRangeData() + (
+            ConcatenateRows() if per_channel else ToNumpy(flatten=True)
+        )
+
+        if tracer is not None:
+            mapper = mapper + TraceLatency(tracer, "extraction")
+
+        return Stage(
+            name="sliding extraction",
+            mapper=mapper,
+            queue=QueueSpec(kind="extraction", samples=True, blocks=blocks),
+            merge="align",
+            input_mapper=lambda: ExtractSlidingCharacteristics(
+                extractor=create_extractor(), hop_size=hop_size
+            ),
+            skew_tolerance=hop_size / SAMPLING_FREQUENCY / 2,
         )
-        mapper = MergeRangeData() + ToNumpy() + Predict(model=model)
 
-        return NamedRunnable("Prediction pipeline", FullPipeline(source + mapper))
 
+class PredictionStageFactory:
+    def create(
+        self,
+        model: PredictionModel,
+        latency: Optional[LatencyGauge] = None,
+        tracer: Optional[LatencyTracer] = None,
+        batch_size: int = 1,
+        batch_latency: float = 0.05,
+    ) -> Stage:
+        mapper = ToNumpy(to2D=True) + Predict(
+            model=model, batch_size=batch_size, max_latency=batch_latency
+        )
+
+        if latency is not None:
+            mapper = mapper + MeasureLatency(latency)
 
-class QueuesAnalyzer(Runnable):
-    def __init__(self, queues: List[Queue[Any]], timeout: int = 1) -> None:
-        self.queues = queues
-        self.timeout = timeout
-        self.start = datetime.now()
-        self.logger = ConsoleLogger(name="queue usage")
+        if tracer is not None:
+            mapper = mapper + TraceLatency(tracer, "prediction")
 
-    def run(self):
-        while True:
-            now = datetime.now()
-            if (now - self.start).seconds >= self.timeout:
-                self.start = now
-                for queue in self.queues:
-                    self.logger.debug(f"{queue.name}: {len(queue)}")
+        return Stage(name="prediction", mapper=mapper, queue=QueueSpec("prediction"))
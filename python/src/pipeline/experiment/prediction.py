@@ -1,23 +1,39 @@
-import multiprocessing
-from typing import List
+import os
+import pathlib
+from datetime import datetime
+from typing import List, Optional
 
-import numpy as np
-from modupipe.loader import LoaderList, OnCondition, PutToQueue, Sink
-from modupipe.queue import PutNonBlocking, Queue
-from modupipe.runnable import MultiProcess, Runnable
+from modupipe.runnable import Runnable
 
-from src.ai.transform_unique import FeaturesTransformEMG
+from src.ai.transform_unique import (
+    FeaturesTransformEMG,
+    MultiChannelFeaturesTransformEMG,
+    SlidingFeaturesEMG,
+)
 from src.ai.utilities import load_model
+from src.pipeline.base import PredictionModel
 from src.pipeline.conditions import ChannelSelection
-from src.pipeline.data import ProcessedData, RangeData, SerialData
 from src.pipeline.experiment.pipelines import (
-    ExtractionPipelineFactory,
-    FilteringPipelineFactory,
-    PlottingPipelineFactory,
-    PredictionPipelineFactory,
-    ProcessingPipelineFactory,
-    SourcePipelineFactory,
+    SAMPLING_FREQUENCY,
+    ExtractionStageFactory,
+    FilteringStageFactory,
+    PlottingStageFactory,
+    PredictionStageFactory,
+    ProcessingStageFactory,
+    SlidingExtractionStageFactory,
+    SourceStageFactory,
+    gives_filtered_samples,
 )
+from src.pipeline.graph import Stage, StageGraph, compile_graph
+from src.pipeline.queues import QueueFactory
+from src.pipeline.runtime import Runtime, Service, create_runtime
+from src.pipeline.telemetry import LatencyGauge, Telemetry
+from src.pipeline.tracing import LatencyTracer
+from src.utils.loggers import ConsoleLogger
+
+WINDOW_IN_SECONDS = 1 / 10
+# MAV, Var, SD, SSC, ZC and RMS
+FEATURES_PER_CHANNEL = 6
 
 
 class PredictionExperimentFactory:
@@ -25,12 +41,29 @@ class PredictionExperimentFactory:
 
     Pipeline architecture :
     ```
-                                              ┌─⏵ [plot]
-                          ┌─⏵ filtering ch.1 ─┴─⏵ extraction ┐
-    serial ─⏵ processing ─┤                                  ├─⏵ prediction ─⏵ [animation]
-                          └─⏵ filtering ch.2 ─┬─⏵ extraction ┘
-                                              └─⏵ [plot]
+                          ┌─⏵ filtering ch.1 ─┬───────┬─⏵ extraction ─⏵ prediction ─⏵ [animation]
+    serial ─⏵ processing ─┤                   │ ┌─────┘
+                          └─⏵ filtering ch.2 ─┼─┴─────┐
+                                              └───────┴─⏵ [plot]
     ```
+
+    The extraction stage pairs the windows of the predicting channels by their
+    timestamps, so that a channel losing windows does not shift the others. The
+    features of every channel are given to the model as a single row, unless it
+    was trained on the features of a single channel : each channel is then
+    predicted separately, as a row of the same window.
+
+    With `blocks`, the processing stage splits each serial packet into a block of
+    samples per channel, which goes through the next stages as a single item.
+
+    Each stage runs in its own process, or in a thread of the calling process
+    with the `threads` runtime. The plot is then drawn from the calling thread.
+    With `fuse`, stages that do not run in parallel share their process or
+    thread instead (see `compile_graph`).
+
+    With a `batch_size` above 1, the prediction stage predicts the pending windows
+    together, keeping each of them pending for at most `batch_latency` seconds
+    (see `Predict`).
     """
 
     def create(
@@ -39,75 +72,145 @@ class PredictionExperimentFactory:
         model_name: str,
         plotting_channels: List[int] = [],
         predicting_channels: List[int] = [],
+        hop_in_seconds: Optional[float] = None,
+        queues: Optional[QueueFactory] = None,
+        telemetry_interval: Optional[float] = None,
+        metrics_file: Optional[str] = None,
+        tracer: Optional[LatencyTracer] = None,
+        capture: bool = False,
+        blocks: bool = False,
+        runtime: Runtime = "processes",
+        fuse: bool = False,
+        batch_size: int = 1,
+        batch_latency: float = 0.05,
     ) -> Runnable:
-        pipelines: List[Runnable] = []
+        capture_path = os.path.join(
+            pathlib.Path.cwd(), "data", f"pred-{datetime.now().timestamp()}"
+        )
+        queues = queues or QueueFactory(
+            runtime=runtime, metered=telemetry_interval is not None
+        )
+        if queues.runtime != runtime:
+            raise ValueError(f"The queues must be created for the '{runtime}' runtime")
+        if telemetry_interval is not None and not queues.metered:
+            raise ValueError("The queues must be metered to report their usage")
 
-        source_out_queue = Queue[SerialData[bytes]](
-            multiprocessing.Queue()
-        )  # TODO maxsize?
+        gauges: List[LatencyGauge] = []
+        graph = StageGraph()
 
-        source_pipeline = SourcePipelineFactory().create(
-            serial_port=serial_port, out_queue=source_out_queue
+        source = graph.add(
+            SourceStageFactory().create(
+                serial_port=serial_port, capture_path=capture_path if capture else None
+            )
         )
-        pipelines.append(source_pipeline)
 
-        processing_sinks: List[Sink[ProcessedData[int]]] = []
-        used_channels = set(plotting_channels + predicting_channels)
+        processing = graph.add(
+            ProcessingStageFactory().create(tracer=tracer, blocks=blocks)
+        )
+        graph.connect(source, processing, name="serial")
 
-        extraction_out_queues: List[Queue[RangeData[np.ndarray]]] = []
+        plotting: Optional[Stage] = None
+        if len(plotting_channels) != 0:
+            plotting = graph.add(
+                PlottingStageFactory().create(channels=plotting_channels)
+            )
 
-        for channel in used_channels:
-            filtering_sinks: List[Sink[ProcessedData[int]]] = []
+        model: Optional[PredictionModel] = None
+        extraction: Optional[Stage] = None
+        if len(predicting_channels) != 0:
+            model = load_model(model_name=model_name)
+            per_channel = self.__predicts_per_channel(
+                model, model_name, len(predicting_channels)
+            )
 
-            if channel in plotting_channels:
-                plotting_in_queue = Queue(multiprocessing.Queue())
-                filtering_sinks.append(
-                    PutToQueue(plotting_in_queue, strategy=PutNonBlocking())
+            if hop_in_seconds is None:
+                extraction = ExtractionStageFactory().create(
+                    extractor=FeaturesTransformEMG()
+                    if per_channel
+                    else MultiChannelFeaturesTransformEMG(),
+                    tracer=tracer,
+                    blocks=blocks,
+                    per_channel=per_channel,
                 )
-                pipeline = PlottingPipelineFactory().create(
-                    channel=channel, source_queue=plotting_in_queue
+            else:
+                extraction = SlidingExtractionStageFactory().create(
+                    create_extractor=lambda: SlidingFeaturesEMG(
+                        window_size=int(WINDOW_IN_SECONDS * SAMPLING_FREQUENCY)
+                    ),
+                    hop_size=int(hop_in_seconds * SAMPLING_FREQUENCY),
+                    tracer=tracer,
+                    blocks=blocks,
+                    per_channel=per_channel,
                 )
-                pipelines.append(pipeline)
 
-            if channel in predicting_channels:
-                extraction_in_queue = Queue(multiprocessing.Queue())
-                filtering_sinks.append(
-                    PutToQueue(extraction_in_queue, strategy=PutNonBlocking())
+        used_channels = set(plotting_channels + predicting_channels)
+
+        for channel in used_channels:
+            filtering = graph.add(
+                FilteringStageFactory().create(
+                    channel=channel,
+                    tracer=tracer,
+                    blocks=blocks,
+                    filtered=gives_filtered_samples(source),
                 )
+            )
+            graph.connect(processing, filtering, condition=ChannelSelection(channel))
 
-                extraction_out_queue = Queue(multiprocessing.Queue())
-                extraction_out_queues.append(extraction_out_queue)
+            if plotting is not None and channel in plotting_channels:
+                graph.connect(filtering, plotting)
 
-                pipeline = ExtractionPipelineFactory().create(
-                    in_queue=extraction_in_queue,
-                    out_queue=extraction_out_queue,
-                    extractor=FeaturesTransformEMG(),
-                )
-                pipelines.append(pipeline)
+            if extraction is not None and channel in predicting_channels:
+                graph.connect(filtering, extraction, name=f"extraction ch.{channel}")
 
-            processing_out_queue = Queue(multiprocessing.Queue())
-            processing_sink = OnCondition(
-                ChannelSelection(channel),
-                PutToQueue(processing_out_queue, strategy=PutNonBlocking()),
-            )
-            processing_sinks.append(processing_sink)
+        if extraction is not None and model is not None:
+            graph.add(extraction)
 
-            filtering_pipeline = FilteringPipelineFactory().create(
-                in_queue=processing_out_queue,
-                loader=LoaderList(filtering_sinks),
-            )
-            pipelines.append(filtering_pipeline)
+            latency = LatencyGauge("serial to prediction latency")
+            gauges.append(latency)
 
-            if len(extraction_out_queues) != 0:
-                prediction_pipeline = PredictionPipelineFactory().create(
-                    in_queues=extraction_out_queues,
-                    model=load_model(model_name=model_name),
+            prediction = graph.add(
+                PredictionStageFactory().create(
+                    model=model,
+                    latency=latency,
+                    tracer=tracer,
+                    batch_size=batch_size,
+                    batch_latency=batch_latency,
+                )
+            )
+            graph.connect(extraction, prediction)
+
+        compiled = compile_graph(graph, queues, fuse=fuse)
+        ConsoleLogger(name="prediction").info(compiled.describe())
+        services: List[Service] = []
+
+        if telemetry_interval is not None:
+            services.append(
+                Telemetry(
+                    queues=queues.queues,
+                    gauges=gauges,
+                    interval=telemetry_interval,
+                    metrics_file=metrics_file,
                 )
-                pipelines.append(prediction_pipeline)
+            )
 
-        processing_pipeline = ProcessingPipelineFactory().create(
-            in_queue=source_out_queue, sink=LoaderList(processing_sinks)
+        return create_runtime(
+            runtime, compiled.runnables, main=compiled.main, services=services
         )
-        pipelines.append(processing_pipeline)
 
-        return MultiProcess(pipelines)
+    def __predicts_per_channel(
+        self, model: PredictionModel, model_name: str, nb_channels: int
+    ) -> bool:
+        """Whether the model takes the features of each channel separately, checked
+        here rather than when the first window reaches the prediction stage."""
+        nb_features = getattr(model, "n_features_in_", None)
+
+        if nb_features is None or nb_features == FEATURES_PER_CHANNEL * nb_channels:
+            return False
+        if nb_features == FEATURES_PER_CHANNEL:
+            return True
+
+        raise ValueError(
+            f"Model '{model_name}' expects {nb_features} features, but predicting "
+            f"{nb_channels} channels gives {FEATURES_PER_CHANNEL} features per "
+            f"channel ({FEATURES_PER_CHANNEL * nb_channels} features)"
+        )
@@ -0,0 +1,81 @@
+from queue import Empty
+from typing import Iterator, List, Optional, Tuple, TypeVar
+
+from modupipe.extractor import Extractor
+
+from src.pipeline.data import RangeData
+from src.pipeline.queues import ExperimentQueue
+from src.utils.loggers import Logger
+from src.utils.types import InputType
+
+T = TypeVar("T")
+
+
+class GetUntilEnded(Extractor[T]):
+    """Gets the items of a queue until it has ended (see `ExperimentQueue.end`),
+    checking it whenever no item came for `poll_interval` seconds."""
+
+    def __init__(self, queue: ExperimentQueue[T], poll_interval: float = 0.1) -> None:
+        self.queue = queue
+        self.poll_interval = poll_interval
+
+    def extract(self) -> Iterator[T]:
+        while True:
+            try:
+                yield self.queue.queue.get(timeout=self.poll_interval)
+            except Empty:
+                if self.queue.ended:
+                    return
+
+
+class AlignWindows(Extractor[Tuple[RangeData[InputType], ...]]):
+    """Gives a window of each extractor at a time, like `ExtractorList`, but only
+    windows ending within `skew_tolerance` seconds of each other.
+
+    Windows that end too long before the newest one of the others are dropped,
+    so that the channels resynchronize when one of them loses windows (a full
+    queue, a skipped packet) instead of being paired with older windows forever.
+    """
+
+    def __init__(
+        self,
+        extractors: List[Extractor[RangeData[InputType]]],
+        skew_tolerance: float,
+        logger: Optional[Logger] = None,
+    ) -> None:
+        self.extractors = extractors
+        self.skew_tolerance = skew_tolerance
+        self.logger = logger
+        self.nb_dropped = 0
+
+    def extract(self) -> Iterator[Tuple[RangeData[InputType], ...]]:
+        windows = [extractor.extract() for extractor in self.extractors]
+
+        try:
+            heads = [next(window) for window in windows]
+
+            while True:
+                newest = max(head.end for head in heads)
+
+                for index, head in enumerate(heads):
+                    while newest - head.end > self.skew_tolerance:
+                        self.__drop(head)
+                        head = heads[index] = next(windows[index])
+
+                # A window that replaced a dropped one may end after the others
+                if max(head.end for head in heads) != newest:
+                    continue
+
+                yield tuple(heads)
+                heads = [next(window) for window in windows]
+        except StopIteration:
+            return
+
+    def __drop(self, window: RangeData[InputType]) -> None:
+        self.nb_dropped += 1
+
+        if self.logger:
+            self.logger.warning(
+                f"Dropped a window ending at {window.end:.3f} s, too far behind "
+                f"the other channels ({self.nb_dropped} dropped)"
+            )
@@ -0,0 +1,382 @@
+from dataclasses import dataclass, field
+from time import sleep
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Tuple
+
+from modupipe.base import Condition
+from modupipe.extractor import Extractor, ExtractorList
+from modupipe.loader import Loader, LoaderList, OnCondition, PutToQueue, Sink
+from modupipe.mapper import Filter, Mapper, PushTo
+from modupipe.runnable import FullPipeline, NamedRunnable, Runnable
+
+from src.pipeline.extractors import AlignWindows, GetUntilEnded
+from src.pipeline.queues import ExperimentQueue, QueueFactory
+from src.utils.loggers import ConsoleLogger
+
+# How the items of several inputs are given to a stage : zipped into tuples of one
+# item per input, aligned into tuples of windows ending at the same time (see
+# `AlignWindows`), or interleaved as they arrive
+Merge = Literal["zip", "align", "interleave"]
+
+
+@dataclass
+class QueueSpec:
+    """How the queues feeding a stage are created (see `QueueFactory`)."""
+
+    kind: str
+    samples: bool = False
+    filtered: bool = True
+    blocks: bool = False
+
+
+@dataclass(eq=False)
+class Stage:
+    """A step of an experiment. Its items come from `source`, or from the stages
+    connected to it, go through `mapper`, and are loaded into `sink` if it is set.
+
+    A stage with several inputs must `merge` them. When they are zipped or
+    aligned, items of each input first go through their own `input_mapper`, and
+    aligned windows may end up to `skew_tolerance` seconds apart. Stages with a
+    single input can set `merge` as well, to get tuples of a single item.
+
+    The pipeline of the partition starting with the stage is wrapped by `wrap`.
+    When it ends (at the end of its source, or of its inputs), the stages it feeds
+    end once they got all its items.
+    An `isolated` stage always runs in a partition of its own, and a `main` stage
+    also runs in the main thread if the partitions run as threads.
+    """
+
+    name: str
+    source: Optional[Extractor[Any]] = None
+    mapper: Optional[Mapper[Any, Any]] = None
+    sink: Optional[Sink[Any]] = None
+    queue: QueueSpec = field(default_factory=lambda: QueueSpec(kind="default"))
+    merge: Optional[Merge] = None
+    input_mapper: Optional[Callable[[], Mapper[Any, Any]]] = None
+    skew_tolerance: float = 0.0
+    wrap: Optional[Callable[[Runnable], Runnable]] = None
+    isolated: bool = False
+    main: bool = False
+
+
+@dataclass(eq=False)
+class Edge:
+    """Items of `parent` given to `child`, if they match the `condition`. If they
+    go through a queue, it is named `name` (or after the child)."""
+
+    parent: Stage
+    child: Stage
+    condition: Optional[Condition[Any]] = None
+    name: Optional[str] = None
+
+    @property
+    def queue_name(self) -> str:
+        return self.name or self.child.name
+
+
+class StageGraph:
+    def __init__(self) -> None:
+        self.stages: List[Stage] = []
+        self.edges: List[Edge] = []
+
+    def add(self, stage: Stage) -> Stage:
+        self.stages.append(stage)
+        return stage
+
+    def connect(
+        self,
+        parent: Stage,
+        child: Stage,
+        condition: Optional[Condition[Any]] = None,
+        name: Optional[str] = None,
+    ) -> None:
+        self.edges.append(Edge(parent, child, condition=condition, name=name))
+
+    def inputs(self, stage: Stage) -> List[Edge]:
+        return [edge for edge in self.edges if edge.child is stage]
+
+    def outputs(self, stage: Stage) -> List[Edge]:
+        return [edge for edge in self.edges if edge.parent is stage]
+
+
+@dataclass
+class Partition:
+    """Stages running in a single pipeline, and so in a single process (or
+    thread) : a chain of stages, and the sinks loaded along the way."""
+
+    stages: List[Stage]
+    sinks: List[Stage]
+    runnable: Runnable
+    outputs: List[ExperimentQueue] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return " + ".join(stage.name for stage in self.stages + self.sinks)
+
+
+@dataclass
+class CompiledGraph:
+    partitions: List[Partition]
+    queues: List[Tuple[ExperimentQueue, List[Edge]]]
+
+    @property
+    def runnables(self) -> List[Runnable]:
+        return [partition.runnable for partition in self.partitions]
+
+    @property
+    def main(self) -> Optional[Runnable]:
+        for partition in self.partitions:
+            if any(stage.main for stage in partition.stages + partition.sinks):
+                return partition.runnable
+
+        return None
+
+    def describe(self) -> str:
+        lines = [f"{len(self.partitions)} partitions :"]
+
+        for index, partition in enumerate(self.partitions, 1):
+            chain = " ─⏵ ".join(stage.name for stage in partition.stages)
+            sinks = "".join(f" ─⏵ [{sink.name}]" for sink in partition.sinks)
+            lines.append(f"  {index}. {chain}{sinks}")
+
+        lines.append(f"{len(self.queues)} queues :")
+
+        for queue, edges in self.queues:
+            parents = ", ".join(edge.parent.name for edge in edges)
+            lines.append(f"  {queue.name} : {parents} ─⏵ {edges[0].child.name}")
+
+        return "\n".join(lines)
+
+
+class _EndOutputs(Runnable):
+    """Runs a pipeline, then ends the queues it puts items in, and waits for them
+    to be emptied if items still being sent would be lost when exiting."""
+
+    def __init__(
+        self,
+        runnable: Runnable,
+        outputs: List[ExperimentQueue],
+        poll_interval: float = 0.1,
+    ) -> None:
+        self.runnable = runnable
+        self.outputs = outputs
+        self.poll_interval = poll_interval
+
+    def run(self) -> None:
+        self.runnable.run()
+
+        for queue in self.outputs:
+            queue.end()
+
+        for queue in self.outputs:
+            while queue.loses_items_on_exit and len(queue.queue) != 0:
+                sleep(self.poll_interval)
+
+
+class _Singleton(Mapper[Any, Tuple[Any]]):
+    """Gives the items of a single input as they would be zipped."""
+
+    def map(self, items: Iterator[Any]) -> Iterator[Tuple[Any]]:
+        for item in items:
+            yield (item,)
+
+
+def compile_graph(
+    graph: StageGraph, queues: QueueFactory, fuse: bool = True
+) -> CompiledGraph:
+    """Splits the stages of `graph` into partitions, linked by queues.
+
+    Without `fuse`, each stage gets its own partition. Otherwise, a stage runs in
+    the partition of its input when it is the only stage fed by that input, and
+    sinks are loaded by the partition of their input. Queues, and so process
+    boundaries, are only kept where stages run in parallel : between the
+    branches of a fan-out, before a fan-in, and around isolated stages.
+    """
+    compiler = _GraphCompiler(graph, queues, fuse)
+    return compiler.compile()
+
+
+class _GraphCompiler:
+    def __init__(self, graph: StageGraph, queues: QueueFactory, fuse: bool) -> None:
+        self.graph = graph
+        self.queues = queues
+        self.fuse = fuse
+        self.edge_queues: Dict[int, ExperimentQueue] = {}
+
+    def compile(self) -> CompiledGraph:
+        queues = self.__create_queues()
+        partitions = [
+            self.__create_partition(stage)
+            for stage in self.graph.stages
+            if not self.__is_fused(stage)
+        ]
+
+        for queue, _ in queues:
+            queue.producers = sum(
+                queue in partition.outputs for partition in partitions
+            )
+
+        return CompiledGraph(partitions=partitions, queues=queues)
+
+    def __is_fused(self, stage: Stage) -> bool:
+        """Whether the stage runs in the partition of its single input."""
+        inputs = self.graph.inputs(stage)
+
+        if not self.fuse or stage.isolated or stage.main or len(inputs) != 1:
+            return False
+
+        if inputs[0].parent.isolated or inputs[0].parent.main:
+            return False
+
+        if self.__is_sink(stage):
+            return True
+
+        # Sinks loaded by the input do not run in parallel, so they are not a fan-out
+        children = [
+            edge.child
+            for edge in self.graph.outputs(inputs[0].parent)
+            if not self.__is_fused_sink(edge.child)
+        ]
+        return len(children) == 1 and children[0] is stage
+
+    def __is_sink(self, stage: Stage) -> bool:
+        return (
+            stage.sink is not None
+            and stage.mapper is None
+            and not self.graph.outputs(stage)
+        )
+
+    def __is_fused_sink(self, stage: Stage) -> bool:
+        return self.__is_sink(stage) and self.__is_fused(stage)
+
+    def __create_queues(self) -> List[Tuple[ExperimentQueue, List[Edge]]]:
+        created: List[Tuple[ExperimentQueue, List[Edge]]] = []
+
+        for stage in self.graph.stages:
+            if self.__is_fused(stage):
+                continue
+
+            inputs = self.graph.inputs(stage)
+            groups = [inputs] if stage.merge == "interleave" else [[e] for e in inputs]
+
+            for edges in groups:
+                if not edges:
+                    continue
+
+                name = stage.name if len(edges) > 1 else edges[0].queue_name
+                queue = self.__create_queue(name, stage.queue)
+                created.append((queue, edges))
+
+                for edge in edges:
+                    self.edge_queues[id(edge)] = queue
+
+        return created
+
+    def __create_queue(self, name: str, spec: QueueSpec) -> ExperimentQueue:
+        if spec.samples:
+            return self.queues.create_samples(
+                name, kind=spec.kind, filtered=spec.filtered, blocks=spec.blocks
+            )
+
+        return self.queues.create(name, kind=spec.kind)
+
+    def __create_partition(self, root: Stage) -> Partition:
+        stages: List[Stage] = []
+        sinks: List[Stage] = []
+        outputs: List[ExperimentQueue] = []
+        source = self.__create_source(root)
+        stage: Optional[Stage] = root
+
+        while stage is not None:
+            stages.append(stage)
+
+            if stage.mapper is not None:
+                source = source + stage.mapper
+
+            loaders: List[Loader[Any, Any]] = []
+            if stage.sink is not None:
+                loaders.append(stage.sink)
+
+            next_edge: Optional[Edge] = None
+            next_stage: Optional[Stage] = None
+
+            for edge in self.graph.outputs(stage):
+                child = edge.child
+
+                if self.__is_fused_sink(child):
+                    assert child.sink is not None
+                    sinks.append(child)
+                    loaders.append(self.__on_condition(edge, child.sink))
+                elif self.__is_fused(child):
+                    next_edge, next_stage = edge, child
+                else:
+                    queue = self.edge_queues[id(edge)]
+                    put = PutToQueue(queue.queue, strategy=queue.strategy)
+                    loaders.append(self.__on_condition(edge, put))
+
+                    if queue not in outputs:
+                        outputs.append(queue)
+
+            if loaders:
+                source = source + PushTo(
+                    loaders[0] if len(loaders) == 1 else LoaderList(loaders)
+                )
+
+            if next_edge is not None and next_stage is not None:
+                if next_edge.condition is not None:
+                    source = source + Filter(next_edge.condition)
+                if next_stage.merge in ("zip", "align"):
+                    if next_stage.input_mapper is not None:
+                        source = source + next_stage.input_mapper()
+                    source = source + _Singleton()
+
+            stage = next_stage
+
+        runnable: Runnable = FullPipeline(source)
+        if root.wrap is not None:
+            runnable = root.wrap(runnable)
+        runnable = _EndOutputs(runnable, outputs)
+
+        partition = Partition(
+            stages=stages, sinks=sinks, runnable=runnable, outputs=outputs
+        )
+        partition.runnable = NamedRunnable(f"{partition.name} pipeline", runnable)
+
+        return partition
+
+    def __create_source(self, stage: Stage) -> Extractor[Any]:
+        if stage.source is not None:
+            return stage.source
+
+        inputs = self.graph.inputs(stage)
+        if not inputs:
+            raise ValueError(f"Stage '{stage.name}' has no source and no inputs")
+
+        if stage.merge == "interleave":
+            return GetUntilEnded(self.edge_queues[id(inputs[0])])
+
+        extractors: List[Extractor[Any]] = []
+        for edge in inputs:
+            extractor: Extractor[Any] = GetUntilEnded(self.edge_queues[id(edge)])
+            if stage.input_mapper is not None:
+                extractor = extractor + stage.input_mapper()
+            extractors.append(extractor)
+
+        if stage.merge == "zip":
+            return ExtractorList(extractors)
+        if stage.merge == "align":
+            return AlignWindows(
+                extractors,
+                skew_tolerance=stage.skew_tolerance,
+                logger=ConsoleLogger(name=stage.name),
+            )
+
+        if len(extractors) != 1:
+            raise ValueError(f"Stage '{stage.name}' must merge its inputs")
+
+        return extractors[0]
+
+    def __on_condition(self, edge: Edge, loader: Loader[Any, Any]) -> Loader:
+        if edge.condition is None:
+            return loader
+
+        return OnCondition(edge.condition, loader)
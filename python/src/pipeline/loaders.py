@@ -1,54 +1,93 @@
-from datetime import datetime
-from typing import Any, TypeVar
+from time import time
+from typing import Any, TypeVar, Union
 
 import numpy as np
 from modupipe.loader import IdentityLoader, Loader, Sink
 
 from src.animation.base import AnglesAnimator
-from src.pipeline.data import ProcessedData, RangeData
+from src.pipeline.data import ProcessedBlock, ProcessedData, RangeData
 from src.utils.loggers import Logger
-from src.utils.plot import PlottingStrategy
+from src.utils.plot import ChannelsPlotUpdate, PlottingStrategy
+from src.utils.rates import RateMeter
 
 T = TypeVar("T")
 
 
-class Plot(Loader[ProcessedData[Any], None]):
+class Plot(Loader[Union[ProcessedData[Any], ProcessedBlock], None]):
     def __init__(self, strategy: PlottingStrategy):
         self.__strategy = strategy
 
-    def load(self, item: ProcessedData[Any]) -> None:
+    def load(self, item: Union[ProcessedData[Any], ProcessedBlock]) -> None:
+        if isinstance(item, ProcessedBlock):
+            self.__strategy.update_plot_block(item.time, [item.original, item.filtered])
+            return
+
         self.__strategy.update_plot(item.time, [item.original, item.filtered])
 
 
+class PlotChannels(Loader[Union[ProcessedData[Any], ProcessedBlock], None]):
+    def __init__(self, strategy: ChannelsPlotUpdate):
+        self.__strategy = strategy
+
+    def load(self, item: Union[ProcessedData[Any], ProcessedBlock]) -> None:
+        if isinstance(item, ProcessedBlock):
+            self.__strategy.update_plot_block(
+                item.channel, item.time, [item.original, item.filtered]
+            )
+            return
+
+        self.__strategy.update_plot(
+            item.channel, item.time, [item.original, item.filtered]
+        )
+
+
 class LogRate(IdentityLoader[T]):
-    def __init__(self, logger: Logger, timeout: int = 1) -> None:
-        self.__start = datetime.now()
-        self.__count = 0
+    """Logs the rate of items every `timeout` seconds. The clock is only read every
+    few items (see `RateMeter`), which keeps the cost per item to a decrement.
+    Blocks count as many items as they have samples."""
+
+    def __init__(self, logger: Logger, timeout: float = 1, smoothing: float = 0.3):
+        self.__meter = RateMeter(interval=timeout, smoothing=smoothing)
+        self.__countdown = self.__meter.check_every
         self.__logger = logger
-        self.__timeout = timeout
+
+    @property
+    def meter(self) -> RateMeter:
+        return self.__meter
 
     def load(self, item: T) -> T:
-        now = datetime.now()
-        self.__count += 1
+        self.__countdown -= len(item) if isinstance(item, ProcessedBlock) else 1
+
+        if self.__countdown > 0:
+            return item
+
+        if self.__meter.update(self.__meter.check_every - self.__countdown):
+            self.__logger.debug(
+                f"Rate : {self.__meter.rate:.2f} / s "
+                f"(smoothed : {self.__meter.smoothed_rate:.2f} / s)"
+            )
 
-        if (now - self.__start).seconds >= self.__timeout:
-            self.__logger.debug(f"Rate : {round(self.__count/self.__timeout, 2)} / s")
-            self.__count = 0
-            self.__start = now
+        self.__countdown = self.__meter.check_every
 
         return item
 
 
 class LogTime(IdentityLoader[T]):
-    def __init__(self, logger: Logger):
+    def __init__(self, logger: Logger, timeout: float = 1):
         self.logger = logger
-        self.__start = datetime.now()
+        self.__meter = RateMeter(interval=timeout)
+        self.__countdown = self.__meter.check_every
 
     def load(self, item: T) -> T:
-        end = datetime.now()
-        if (end - self.__start).seconds >= 1:
-            self.__start = end
-            self.logger.debug(f"Time : {end.timestamp()}")
+        self.__countdown -= 1
+
+        if self.__countdown:
+            return item
+
+        if self.__meter.update(self.__meter.check_every):
+            self.logger.debug(f"Time : {time()}")
+
+        self.__countdown = self.__meter.check_every
 
         return item
 
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
-from typing import Iterator, List
+import queue
+import threading
+from time import monotonic
+from typing import Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 from modupipe.mapper import Mapper
 from scipy import signal
 
-from src.pipeline.base import CharacteristicsExtractor, PredictionModel
-from src.pipeline.data import ProcessedData, RangeData, SerialData
-from src.utils.lists import iter_groups
+from src.pipeline.base import (
+    CharacteristicsExtractor,
+    PredictionModel,
+    StreamingCharacteristicsExtractor,
+)
+from src.pipeline.data import ProcessedBlock, ProcessedData, RangeData, SerialData
+from src.utils.lists import RingBuffer, iter_groups
 from src.utils.loggers import Logger
 from src.utils.types import InputType
 
@@ -25,103 +32,275 @@ class Log(Mapper[InputType, InputType]):
             yield item
 
 
-class ProcessFromSerial(Mapper[SerialData[bytes], ProcessedData[bytes]]):
-    def map(self, items: Iterator[SerialData[bytes]]) -> Iterator[ProcessedData[bytes]]:
+class ProcessFromSerial(
+    Mapper[SerialData[bytes], Union[ProcessedData[bytes], ProcessedBlock]]
+):
+    """Splits serial packets into samples.
+
+    When `batched` is set, the whole packet is decoded at once and one
+    `ProcessedBlock` is emitted per channel instead of one `ProcessedData` per
+    sample. Messages are then decoded as big-endian signed integers of up to 8
+    bytes.
+    """
+
+    def __init__(self, batched: bool = False) -> None:
+        self.batched = batched
+
+    def map(
+        self, items: Iterator[SerialData[bytes]]
+    ) -> Iterator[Union[ProcessedData[bytes], ProcessedBlock]]:
         for item in items:
-            channel = 0
             timestamps = np.linspace(
                 item.start.timestamp(),
                 item.end.timestamp(),
                 item.length // item.message_length,
             )
-            data_groups = iter_groups(list(item.value), item.message_length)
 
-            for timestamp, message in zip(timestamps, data_groups):
-                yield ProcessedData(
-                    time=timestamp,
-                    channel=channel,
-                    original=bytes(message),
-                    filtered=bytes(message),
-                )
-                channel = (channel + 1) % item.nb_channels
+            if self.batched:
+                yield from self.__split_channels(item, timestamps)
+            else:
+                yield from self.__split_messages(item, timestamps)
+
+    def __split_messages(
+        self, item: SerialData[bytes], timestamps: np.ndarray
+    ) -> Iterator[ProcessedData[bytes]]:
+        channel = 0
+        data_groups = iter_groups(list(item.value), item.message_length)
+
+        for timestamp, message in zip(timestamps, data_groups):
+            yield ProcessedData(
+                time=timestamp,
+                channel=channel,
+                original=bytes(message),
+                filtered=bytes(message),
+                ingress=item.ingress,
+            )
+            channel = (channel + 1) % item.nb_channels
+
+    def __split_channels(
+        self, item: SerialData[bytes], timestamps: np.ndarray
+    ) -> Iterator[ProcessedBlock]:
+        nb_messages = min(len(timestamps), len(item.value) // item.message_length)
+        messages = self.__decode(item.value, item.message_length, nb_messages)
+
+        for channel in range(min(item.nb_channels, nb_messages)):
+            values = messages[channel :: item.nb_channels]
+            yield ProcessedBlock(
+                time=timestamps[channel : nb_messages : item.nb_channels],
+                channel=channel,
+                original=values,
+                filtered=values,
+                ingress=item.ingress,
+            )
+
+    def __decode(self, value: bytes, message_length: int, count: int) -> np.ndarray:
+        if message_length in (1, 2, 4, 8):
+            return np.frombuffer(value, dtype=f">i{message_length}", count=count)
+
+        if message_length > 8:
+            raise ValueError(
+                f"Messages of {message_length} bytes do not fit in 64 bits integers"
+            )
 
+        # Other widths have no numpy type, so their bytes are combined by hand
+        data = np.frombuffer(value, dtype=np.uint8, count=count * message_length)
+        messages = np.zeros(count, dtype=np.int64)
+        for byte in data.reshape(count, message_length).T:
+            messages = (messages << 8) | byte
 
-class ToInt(Mapper[ProcessedData[bytes], ProcessedData[int]]):
+        sign = 1 << (8 * message_length - 1)
+        return (messages ^ sign) - sign
+
+
+class ToInt(
+    Mapper[
+        Union[ProcessedData[bytes], ProcessedBlock],
+        Union[ProcessedData[int], ProcessedBlock],
+    ]
+):
     def map(
-        self, items: Iterator[ProcessedData[bytes]]
-    ) -> Iterator[ProcessedData[int]]:
+        self, items: Iterator[Union[ProcessedData[bytes], ProcessedBlock]]
+    ) -> Iterator[Union[ProcessedData[int], ProcessedBlock]]:
         for item in items:
+            if isinstance(item, ProcessedBlock):
+                values = item.original.astype(np.int64)
+                yield ProcessedBlock(
+                    time=item.time,
+                    channel=item.channel,
+                    original=values,
+                    filtered=values,
+                    ingress=item.ingress,
+                )
+                continue
+
             new_value = int.from_bytes(bytearray(item.original), "big", signed=True)
             yield ProcessedData(
                 time=item.time,
                 channel=item.channel,
                 original=new_value,
                 filtered=new_value,
+                ingress=item.ingress,
             )
 
 
-class NotchFrequencyOnline(Mapper[ProcessedData[int], ProcessedData[int]]):
+class NotchFrequencyOnline(
+    Mapper[
+        Union[ProcessedData[float], ProcessedBlock],
+        Union[ProcessedData[float], ProcessedBlock],
+    ]
+):
+    """Notch filter keeping its state, giving the same floats for blocks or samples."""
+
     def __init__(self, frequency: float, sampling_frequency: float):
-        self.b, self.a = signal.iirnotch(Q=30, w0=frequency, fs=sampling_frequency)
-        self.z = signal.lfilter_zi(self.b, self.a)
+        b, a = signal.iirnotch(Q=30, w0=frequency, fs=sampling_frequency)
+        self.sos = signal.tf2sos(b, a)
+        self.z = signal.sosfilt_zi(self.sos)
+        self.__sections = self.sos.tolist()
 
-    def map(self, items: Iterator[ProcessedData[int]]) -> Iterator[ProcessedData[int]]:
+    def map(
+        self, items: Iterator[Union[ProcessedData[float], ProcessedBlock]]
+    ) -> Iterator[Union[ProcessedData[float], ProcessedBlock]]:
         for item in items:
-            filtered, self.z = signal.lfilter(
-                self.b, self.a, [item.filtered], zi=self.z
-            )
+            if isinstance(item, ProcessedBlock):
+                filtered, self.z = signal.sosfilt(self.sos, item.filtered, zi=self.z)
+                yield ProcessedBlock(
+                    time=item.time,
+                    channel=item.channel,
+                    original=item.original,
+                    filtered=filtered,
+                    ingress=item.ingress,
+                )
+                continue
+
             yield ProcessedData(
                 time=item.time,
                 channel=item.channel,
                 original=item.original,
-                filtered=filtered,
+                filtered=self.__filter(item.filtered),
+                ingress=item.ingress,
             )
 
+    def __filter(self, x: float) -> float:
+        for (b0, b1, b2, _, a1, a2), z in zip(self.__sections, self.z):
+            y = b0 * x + z[0]
+            z[0] = b1 * x - a1 * y + z[1]
+            z[1] = b2 * x - a2 * y
+            x = y
+
+        return x
+
+
+class NotchDC(
+    Mapper[
+        Union[ProcessedData[float], ProcessedBlock],
+        Union[ProcessedData[float], ProcessedBlock],
+    ]
+):
+    """DC blocker `y[n] = x[n] - x[n-1] + R * y[n-1]` keeping its state, in floats."""
 
-class NotchDC(Mapper[ProcessedData[int], ProcessedData[int]]):
     def __init__(self, R: float):
         self.R = R
-        self.x1 = 0
-        self.y1 = 0
+        self.b = [1.0, -1.0]
+        self.a = [1.0, -R]
+        self.z = np.zeros(1)
 
-    def map(self, items: Iterator[ProcessedData[int]]) -> Iterator[ProcessedData[int]]:
+    def map(
+        self, items: Iterator[Union[ProcessedData[float], ProcessedBlock]]
+    ) -> Iterator[Union[ProcessedData[float], ProcessedBlock]]:
         for item in items:
-            filtered = int(item.filtered - self.x1 + self.R * self.y1)
-
-            self.x1 = item.filtered
-            self.y1 = filtered
+            if isinstance(item, ProcessedBlock):
+                filtered, self.z = signal.lfilter(
+                    self.b, self.a, item.filtered, zi=self.z
+                )
+                yield ProcessedBlock(
+                    time=item.time,
+                    channel=item.channel,
+                    original=item.original,
+                    filtered=filtered,
+                    ingress=item.ingress,
+                )
+                continue
 
             yield ProcessedData(
                 time=item.time,
                 channel=item.channel,
                 original=item.original,
-                filtered=filtered,
+                filtered=self.__filter(item.filtered),
+                ingress=item.ingress,
             )
 
+    def __filter(self, x: float) -> float:
+        y = self.z[0] + self.b[0] * x
+        self.z[0] = x * self.b[1] - y * self.a[1]
+
+        return y
 
-class TimedBuffer(Mapper[ProcessedData[InputType], RangeData[List[InputType]]]):
+
+class TimedBuffer(
+    Mapper[
+        Union[ProcessedData[InputType], ProcessedBlock],
+        Union[RangeData[List[InputType]], RangeData[np.ndarray]],
+    ]
+):
     def __init__(self, time_in_seconds: float):
         super().__init__()
         self.time_in_seconds = time_in_seconds
         self.buffer: List[InputType] = []
+        self.blocks: List[np.ndarray] = []
         self.start: float = 0
 
     def map(
-        self, items: Iterator[ProcessedData[InputType]]
-    ) -> Iterator[RangeData[List[InputType]]]:
+        self, items: Iterator[Union[ProcessedData[InputType], ProcessedBlock]]
+    ) -> Iterator[Union[RangeData[List[InputType]], RangeData[np.ndarray]]]:
         for item in items:
+            if isinstance(item, ProcessedBlock):
+                yield from self.__map_block(item)
+                continue
+
             if len(self.buffer) == 0:
                 self.start = item.time
 
             self.buffer.append(item.filtered)
 
             if item.time >= self.start + self.time_in_seconds:
-                output = RangeData(start=self.start, end=item.time, value=self.buffer)
+                output = RangeData(
+                    start=self.start,
+                    end=item.time,
+                    value=self.buffer,
+                    ingress=item.ingress,
+                )
                 yield output
                 self.buffer = []
 
+    def __map_block(self, block: ProcessedBlock) -> Iterator[RangeData[np.ndarray]]:
+        times, values = block.time, block.filtered
+
+        while len(times) != 0:
+            if len(self.blocks) == 0:
+                self.start = times[0]
+
+            index = int(np.searchsorted(times, self.start + self.time_in_seconds))
+
+            if index == len(times):
+                self.blocks.append(values)
+                return
+
+            self.blocks.append(values[: index + 1])
+            yield RangeData(
+                start=self.start,
+                end=times[index],
+                value=np.concatenate(self.blocks),
+                ingress=block.ingress,
+            )
+            self.blocks = []
+
+            times, values = times[index + 1 :], values[index + 1 :]
+
 
 class ToNumpy(Mapper[RangeData[InputType], RangeData[np.ndarray]]):
+    """Turns values into arrays, flattened, or with at least 2 dimensions (a
+    single row for flat values) if `to2D` is set."""
+
     def __init__(self, flatten: bool = False, to2D: bool = False):
         self.flatten = flatten
         self.to2D = False if self.flatten else to2D
@@ -136,9 +315,44 @@ class ToNumpy(Mapper[RangeData[InputType], RangeData[np.ndarray]]):
                 output = output.flatten()
 
             if self.to2D:
-                output = np.array([output])
+                output = np.atleast_2d(output)
+
+            yield RangeData(
+                start=item.start, end=item.end, value=output, ingress=item.ingress
+            )
 
-            yield RangeData(start=item.start, end=item.end, value=output)
+
+class ConcatenateRows(Mapper[RangeData[List[np.ndarray]], RangeData[np.ndarray]]):
+    """Concatenates the rows of characteristics of each channel into a single
+    (channels x characteristics) array."""
+
+    def map(
+        self, items: Iterator[RangeData[List[np.ndarray]]]
+    ) -> Iterator[RangeData[np.ndarray]]:
+        for item in items:
+            yield RangeData(
+                start=item.start,
+                end=item.end,
+                value=np.concatenate([np.atleast_2d(value) for value in item.value]),
+                ingress=item.ingress,
+            )
+
+
+class StackChannels(Mapper[RangeData[List[InputType]], RangeData[np.ndarray]]):
+    """Stacks per-channel windows into a (channels x samples) array, cropping
+    them to the shortest window."""
+
+    def map(
+        self, items: Iterator[RangeData[List[InputType]]]
+    ) -> Iterator[RangeData[np.ndarray]]:
+        for item in items:
+            values = [np.asarray(value) for value in item.value]
+            length = min(len(value) for value in values)
+            output = np.stack([value[:length] for value in values])
+
+            yield RangeData(
+                start=item.start, end=item.end, value=output, ingress=item.ingress
+            )
 
 
 class ExtractCharacteristics(Mapper[RangeData[np.ndarray], RangeData[np.ndarray]]):
@@ -151,15 +365,179 @@ class ExtractCharacteristics(Mapper[RangeData[np.ndarray], RangeData[np.ndarray]
         for item in items:
             characteristics = self.extractor.extract(item.value)
 
-            yield RangeData(start=item.start, end=item.end, value=characteristics)
+            yield RangeData(
+                start=item.start,
+                end=item.end,
+                value=characteristics,
+                ingress=item.ingress,
+            )
+
+
+class ExtractSlidingCharacteristics(
+    Mapper[Union[ProcessedData[float], ProcessedBlock], RangeData[np.ndarray]]
+):
+    """Feeds samples to a sliding window extractor and emits its characteristics
+    every `hop_size` samples, once its window is full.
+
+    Samples are handed over to the extractor `hop_size` at a time, so that its
+    updates stay vectorized even when items come one sample at a time.
+    """
+
+    def __init__(self, extractor: StreamingCharacteristicsExtractor, hop_size: int):
+        self.extractor = extractor
+        self.hop_size = hop_size
+        self.window_times = RingBuffer(size=extractor.window_size)
+        self.pending_times: List[float] = []
+        self.pending_values: List[float] = []
+        self.ingress = 0.0
+
+    def map(
+        self, items: Iterator[Union[ProcessedData[float], ProcessedBlock]]
+    ) -> Iterator[RangeData[np.ndarray]]:
+        for item in items:
+            self.ingress = item.ingress
+
+            if isinstance(item, ProcessedBlock):
+                yield from self.__map_block(item)
+                continue
+
+            self.pending_times.append(item.time)
+            self.pending_values.append(item.filtered)
+
+            if len(self.pending_values) == self.hop_size:
+                yield from self.__hop(
+                    np.array(self.pending_times), np.array(self.pending_values)
+                )
+                self.pending_times, self.pending_values = [], []
+
+    def __map_block(self, block: ProcessedBlock) -> Iterator[RangeData[np.ndarray]]:
+        times = np.concatenate((self.pending_times, block.time))
+        values = np.concatenate((self.pending_values, block.filtered))
+        end = len(values) - len(values) % self.hop_size
+
+        for start in range(0, end, self.hop_size):
+            yield from self.__hop(
+                times[start : start + self.hop_size],
+                values[start : start + self.hop_size],
+            )
+
+        self.pending_times = times[end:].tolist()
+        self.pending_values = values[end:].tolist()
+
+    def __hop(
+        self, times: np.ndarray, values: np.ndarray
+    ) -> Iterator[RangeData[np.ndarray]]:
+        self.extractor.update(values)
+        self.window_times.add_all(times)
+
+        if self.extractor.is_full():
+            yield RangeData(
+                start=self.window_times.oldest()[0],
+                end=self.window_times.newest()[0],
+                value=self.extractor.extract(),
+                ingress=self.ingress,
+            )
+
+
+_END_OF_WINDOWS = object()
 
 
 class Predict(Mapper[RangeData[np.ndarray], RangeData[np.ndarray]]):
-    def __init__(self, model: PredictionModel):
+    """Predicts the rows of each window with `model`.
+
+    With a `batch_size` above 1, pending windows are predicted in a single call to
+    the model, and the rows of the predictions split back into windows. They are
+    predicted once `batch_size` of them are pending, as soon as waiting for the
+    next window would keep the oldest one pending for more than `max_latency`
+    seconds, or at the latest when it has been pending for `max_latency` seconds.
+    Windows are read by a thread, so that this deadline holds when the next window
+    is late. The predictions of a batch still take the time of the model on top.
+
+    The next window is expected after the longest recent time between windows,
+    which decays by `decay` at each window. Windows of a backlog fill whole
+    batches, while windows coming in bursts (the windows of each serial packet)
+    are not kept pending across the gaps between the bursts.
+    """
+
+    def __init__(
+        self,
+        model: PredictionModel,
+        batch_size: int = 1,
+        max_latency: float = 0.05,
+        decay: float = 0.1,
+    ):
         self.model = model
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.decay = decay
+
+        self.pending: List[RangeData[np.ndarray]] = []
+        self.oldest = 0.0
+        self.last: Optional[float] = None
+        self.interval: Optional[float] = None
 
     def map(
         self, items: Iterator[RangeData[np.ndarray]]
+    ) -> Iterator[RangeData[np.ndarray]]:
+        if self.batch_size == 1:
+            yield from self.__map_single(items)
+            return
+
+        windows: queue.Queue[Tuple[float, object]] = queue.Queue(self.batch_size)
+        threading.Thread(
+            target=self.__read, args=(items, windows), name="windows", daemon=True
+        ).start()
+
+        while True:
+            timeout = None
+            if self.pending:
+                timeout = max(0.0, self.oldest + self.max_latency - monotonic())
+
+            try:
+                received, item = windows.get(timeout=timeout)
+            except queue.Empty:
+                yield from self.__predict_pending()
+                continue
+
+            if item is _END_OF_WINDOWS:
+                break
+            if isinstance(item, BaseException):
+                raise item
+
+            assert isinstance(item, RangeData)
+            self.__update_interval(received)
+
+            if len(self.pending) == 0:
+                self.oldest = received
+            self.pending.append(item)
+
+            # Until the time between windows is known, the next one could be late
+            if (
+                len(self.pending) >= self.batch_size
+                or self.interval is None
+                or monotonic() + self.interval - self.oldest > self.max_latency
+            ):
+                yield from self.__predict_pending()
+
+        yield from self.__predict_pending()
+
+    def __read(
+        self,
+        items: Iterator[RangeData[np.ndarray]],
+        windows: queue.Queue[Tuple[float, object]],
+    ) -> None:
+        """Gives the windows with the time they were received, then the error
+        raised by `items`, if any, and the end of the windows."""
+        try:
+            for item in items:
+                windows.put((monotonic(), item))
+        except BaseException as error:
+            windows.put((monotonic(), error))
+        finally:
+            windows.put((monotonic(), _END_OF_WINDOWS))
+
+    def __map_single(
+        self, items: Iterator[RangeData[np.ndarray]]
     ) -> Iterator[RangeData[np.ndarray]]:
         for item in items:
             prediction = self.model.predict(item.value)
@@ -168,7 +546,40 @@ class Predict(Mapper[RangeData[np.ndarray], RangeData[np.ndarray]]):
                 start=item.start,
                 end=item.end,
                 value=prediction,
+                ingress=item.ingress,
+            )
+
+    def __update_interval(self, now: float) -> None:
+        if self.last is not None:
+            interval = now - self.last
+
+            if self.interval is None:
+                self.interval = interval
+            else:
+                self.interval = max(interval, self.interval * (1 - self.decay))
+
+        self.last = now
+
+    def __predict_pending(self) -> Iterator[RangeData[np.ndarray]]:
+        if len(self.pending) == 0:
+            return
+
+        windows, self.pending = self.pending, []
+        predictions = self.model.predict(
+            np.concatenate([window.value for window in windows])
+        )
+        offset = 0
+
+        for window in windows:
+            nb_rows = len(window.value)
+
+            yield RangeData(
+                start=window.start,
+                end=window.end,
+                value=predictions[offset : offset + nb_rows],
+                ingress=window.ingress,
             )
+            offset += nb_rows
 
 
 class MergeRangeData(Mapper[List[RangeData[np.ndarray]], RangeData[List[np.ndarray]]]):
@@ -179,5 +590,7 @@ class MergeRangeData(Mapper[List[RangeData[np.ndarray]], RangeData[List[np.ndarr
             values = [item.value for item in items_list]
             start = min(map(lambda item: item.start, items_list))
             end = min(map(lambda item: item.end, items_list))
+            # The merged window is complete once its last part arrived
+            ingress = max(map(lambda item: item.ingress, items_list))
 
-            yield RangeData(start=start, end=end, value=values)
+            yield RangeData(start=start, end=end, value=values, ingress=ingress)
@@ -0,0 +1,203 @@
+import multiprocessing
+import multiprocessing.queues
+import queue
+from dataclasses import dataclass, field
+from multiprocessing.util import register_after_fork
+from typing import Any, Dict, Generic, List, Literal, Optional, Tuple, TypeVar, Union
+
+import numpy as np
+from modupipe.queue import PutBlocking, Queue, QueuePutStrategy
+
+from src.pipeline.data import ProcessedBlock, ProcessedData
+from src.pipeline.runtime import Runtime
+from src.utils.queues import (
+    DroppingPut,
+    MeteredQueue,
+    PutCoalesce,
+    PutDropNewest,
+    PutDropOldest,
+    RecordCodec,
+    SharedMemoryQueue,
+)
+
+T = TypeVar("T")
+
+OverflowPolicy = Literal["block", "drop-oldest", "drop-newest", "coalesce"]
+
+# Plots only show the latest samples and predictions only matter for the latest
+# window, so they should not slow down the stages feeding them
+DEFAULT_OVERFLOWS: Dict[str, OverflowPolicy] = {
+    "plotting": "drop-oldest",
+    "prediction": "coalesce",
+}
+
+# Items wait in these queues for as long as it takes their consumer to get the
+# items before them, so queues of the latest values only keep a few of them
+DEFAULT_MAXSIZE = 10000
+DEFAULT_MAXSIZES: Dict[str, int] = {
+    "plotting": 8,
+    "prediction": 2,
+}
+
+
+class ProcessedDataCodec(RecordCodec[ProcessedData]):
+    """Stores a `ProcessedData` as (time, channel, original, filtered, ingress).
+    Values are decoded to Python ints or floats, depending on their dtypes."""
+
+    def __init__(self, original_dtype: str = "i8", filtered_dtype: str = "f8"):
+        self.__dtype = np.dtype(
+            [
+                ("time", "f8"),
+                ("channel", "i4"),
+                ("original", original_dtype),
+                ("filtered", filtered_dtype),
+                ("ingress", "f8"),
+            ]
+        )
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.__dtype
+
+    def encode(self, item: ProcessedData) -> Tuple:
+        return (item.time, item.channel, item.original, item.filtered, item.ingress)
+
+    def decode(self, record: Tuple) -> ProcessedData:
+        return ProcessedData(*record)
+
+
+@dataclass
+class ExperimentQueue(Generic[T]):
+    """A queue between two stages, with the strategy used to put items in it.
+
+    Each of its `producers` calls `end` once it has put its last item, so that the
+    consumer stops once the queue is `ended` (see `GetUntilEnded`). Producers must
+    wait for the queue to be emptied before exiting when it `loses_items_on_exit`.
+    """
+
+    name: str
+    queue: Queue[T]
+    strategy: QueuePutStrategy[T]
+    maxsize: int
+    producers: int = 1
+    loses_items_on_exit: bool = False
+    ends: Any = field(default_factory=lambda: multiprocessing.Value("i", 0))
+
+    @property
+    def dropped(self) -> int:
+        if isinstance(self.strategy, DroppingPut):
+            return self.strategy.dropped
+
+        return 0
+
+    def end(self) -> None:
+        with self.ends.get_lock():
+            self.ends.value += 1
+
+    @property
+    def ended(self) -> bool:
+        """Whether all the producers ended, and all their items were got."""
+        return self.ends.value >= self.producers and len(self.queue) == 0
+
+
+def create_put_strategy(overflow: OverflowPolicy) -> QueuePutStrategy:
+    if overflow == "block":
+        return PutBlocking()
+    if overflow == "drop-oldest":
+        return PutDropOldest()
+    if overflow == "drop-newest":
+        return PutDropNewest()
+    if overflow == "coalesce":
+        return PutCoalesce()
+
+    raise ValueError(f"Unknown overflow policy '{overflow}'")
+
+
+class QueueFactory:
+    """Creates the queues linking the stages of an experiment, each bounded to
+    `maxsize` items or, if it is not set, to the default size of the kind of
+    queue. When a queue is full, items are put according to `overflow` or, if it
+    is not set, to the default policy of the kind of queue. Created queues are
+    kept to report their usage.
+
+    Stages running as threads (see `runtime`) share their items through standard
+    thread queues instead, without copying them.
+
+    Queues are only `metered`, counting the items going through them, when their
+    usage is reported (see `Telemetry`).
+    """
+
+    def __init__(
+        self,
+        maxsize: Optional[int] = None,
+        overflow: Optional[OverflowPolicy] = None,
+        runtime: Runtime = "processes",
+        metered: bool = False,
+    ) -> None:
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.runtime = runtime
+        self.metered = metered
+        self.queues: List[ExperimentQueue] = []
+
+    def create(self, name: str, kind: str) -> ExperimentQueue:
+        if self.runtime == "threads":
+            return self.__register(name, kind, queue.Queue(self.__maxsize(kind)))
+
+        process_queue: multiprocessing.queues.Queue = multiprocessing.Queue(
+            self.__maxsize(kind)
+        )
+        # Items left when the experiment is stopped are lost anyway, so a stage must
+        # not wait to send them to a stage that already stopped. Stages must not
+        # exit before then, or their last items would be lost too. Forked processes
+        # reset the queue, so this has to be done again after forking.
+        process_queue.cancel_join_thread()
+        register_after_fork(
+            process_queue, multiprocessing.queues.Queue.cancel_join_thread
+        )
+
+        experiment_queue = self.__register(name, kind, process_queue)
+        experiment_queue.loses_items_on_exit = True
+
+        return experiment_queue
+
+    def create_samples(
+        self, name: str, kind: str, filtered: bool = True, blocks: bool = False
+    ) -> ExperimentQueue[Union[ProcessedData, ProcessedBlock]]:
+        """Creates a shared memory queue of samples read from the serial port (as
+        ints), or of samples once `filtered` (as floats). It must have a single
+        producer.
+
+        Blocks of samples do not have a fixed size, so a queue of `blocks` is a
+        standard queue, holding up to `maxsize` blocks, as are the queues between
+        threads.
+        """
+        if blocks or self.runtime == "threads":
+            return self.create(name, kind)
+
+        codec = ProcessedDataCodec(
+            original_dtype="i8", filtered_dtype="f8" if filtered else "i8"
+        )
+
+        return self.__register(
+            name, kind, SharedMemoryQueue(codec, capacity=self.__maxsize(kind))
+        )
+
+    def __maxsize(self, kind: str) -> int:
+        return self.maxsize or DEFAULT_MAXSIZES.get(kind, DEFAULT_MAXSIZE)
+
+    def __register(self, name: str, kind: str, queue: Any) -> ExperimentQueue:
+        # modupipe only declares the standard queues, but only uses their interface
+        overflow = self.overflow or DEFAULT_OVERFLOWS.get(kind, "block")
+
+        experiment_queue = ExperimentQueue[Any](
+            name=name,
+            queue=MeteredQueue(queue, name=name)
+            if self.metered
+            else Queue(queue, name=name),
+            strategy=create_put_strategy(overflow),
+            maxsize=self.__maxsize(kind),
+        )
+        self.queues.append(experiment_queue)
+
+        return experiment_queue
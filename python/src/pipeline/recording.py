@@ -0,0 +1,61 @@
+from abc import ABC, abstractmethod
+from typing import Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.pipeline.binary import read_binary
+
+Chunk = Tuple[np.ndarray, np.ndarray]
+
+
+class RecordingReader(ABC):
+    """Reads a recording as consecutive chunks of (timestamps, values) rows, so
+    that it never has to be loaded entirely in memory. Values are 2-D (rows,
+    columns) and can be iterated over any number of times."""
+
+    @abstractmethod
+    def chunks(self) -> Iterator[Chunk]:
+        raise NotImplementedError()
+
+
+class CSVRecordingReader(RecordingReader):
+    def __init__(self, file: str, delimiter: str = ";", chunk_size: int = 100000):
+        self.file = file
+        self.delimiter = delimiter
+        self.chunk_size = chunk_size
+
+    def chunks(self) -> Iterator[Chunk]:
+        with pd.read_csv(
+            self.file, delimiter=self.delimiter, chunksize=self.chunk_size
+        ) as reader:
+            for chunk in reader:
+                yield (
+                    chunk["timestamp"].to_numpy(),
+                    chunk.drop(columns=["timestamp"]).to_numpy(),
+                )
+
+
+class BinaryRecordingReader(RecordingReader):
+    def __init__(self, file: str, chunk_size: int = 100000):
+        self.file = file
+        self.chunk_size = chunk_size
+
+    def chunks(self) -> Iterator[Chunk]:
+        recording = read_binary(self.file)
+
+        for start in range(0, len(recording), self.chunk_size):
+            end = start + self.chunk_size
+            yield (
+                np.asarray(recording.timestamp[start:end]),
+                np.asarray(recording.value[start:end]).reshape(-1, 1),
+            )
+
+
+def open_recording(
+    file: str, delimiter: str = ";", chunk_size: int = 100000
+) -> RecordingReader:
+    if file.endswith(".bin"):
+        return BinaryRecordingReader(file, chunk_size=chunk_size)
+
+    return CSVRecordingReader(file, delimiter=delimiter, chunk_size=chunk_size)
@@ -0,0 +1,185 @@
+import os
+import re
+from dataclasses import replace
+from datetime import datetime
+from itertools import chain
+from time import monotonic, sleep
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from modupipe.extractor import Extractor
+
+from src.pipeline.capture import CAPTURE_EXTENSION, capture_files, read_capture
+from src.pipeline.data import SerialData
+from src.pipeline.recording import RecordingReader, open_recording
+from src.utils.loggers import ConsoleLogger, Logger
+
+CHANNEL_FILE = re.compile(r"emg-(\d+)\.(csv|bin)$")
+
+Rows = Tuple[np.ndarray, np.ndarray]
+
+
+class ReplaySource(Extractor[SerialData[bytes]]):
+    """Emits recorded packets again, as if they were read from the board.
+
+    Packets are emitted at the pace they were recorded, `speed` times faster, or as
+    fast as they are consumed if `speed` is None. They keep their recorded start
+    and end times, and get a new ingress time when emitted. The recording is only
+    read once : when it ends, extracting again does not emit anything.
+
+    Packets rebuilt from saved channels hold values which were already `filtered`
+    (see `read_channels`).
+    """
+
+    def __init__(
+        self,
+        packets: Iterable[SerialData[bytes]],
+        speed: Optional[float] = 1.0,
+        filtered: bool = False,
+        logger: Optional[Logger] = None,
+    ):
+        self.filtered = filtered
+        self.__packets = iter(packets)
+        self.__speed = speed
+        self.__logger = logger or ConsoleLogger(name="replay")
+        self.__origin: Optional[Tuple[float, float]] = None
+        self.__count = 0
+
+    def extract(self) -> Iterator[SerialData[bytes]]:
+        for packet in self.__packets:
+            if self.__speed is not None:
+                self.__wait(packet, self.__speed)
+
+            self.__count += 1
+            yield replace(packet, ingress=monotonic())
+
+        if self.__count:
+            self.__logger.info(f"Replayed {self.__count} packets")
+            self.__count = 0
+
+    def __wait(self, packet: SerialData[bytes], speed: float) -> None:
+        # A packet can only be read once its last sample was received
+        received = packet.end.timestamp()
+
+        if self.__origin is None:
+            self.__origin = (received, monotonic())
+
+        recorded_start, replay_start = self.__origin
+        delay = replay_start + (received - recorded_start) / speed - monotonic()
+
+        if delay > 0:
+            sleep(delay)
+
+
+def read_channels(
+    files: Dict[int, str], samples_per_packet: int = 64, chunk_size: int = 100000
+) -> Iterator[SerialData[bytes]]:
+    """Rebuilds packets of 2 bytes messages from channels saved separately, as
+    CSV or binary recordings. Channels missing from `files`, below the highest one,
+    are filled with zeros.
+
+    Saved channels hold filtered values, which are rounded to 16 bits integers :
+    the replayed packets must not be filtered again.
+    """
+    nb_channels = max(files) + 1
+    channels = sorted(files)
+    readers = [
+        _fixed_rows(
+            open_recording(files[channel], chunk_size=chunk_size), samples_per_packet
+        )
+        for channel in channels
+    ]
+
+    for rows in zip(*readers):
+        nb_samples = min(len(timestamps) for timestamps, _ in rows)
+        if nb_samples == 0:
+            return
+
+        messages = np.zeros((nb_samples, nb_channels))
+        for channel, (_, values) in zip(channels, rows):
+            messages[:, channel] = values[:nb_samples, 0]
+
+        value = np.clip(np.rint(messages), -(2**15), 2**15 - 1).astype(">i2")
+        timestamps = rows[0][0]
+
+        yield SerialData(
+            value=value.tobytes(),
+            start=datetime.fromtimestamp(timestamps[0]),
+            end=datetime.fromtimestamp(timestamps[nb_samples - 1]),
+            nb_channels=nb_channels,
+            length=value.nbytes,
+            message_length=2,
+        )
+
+
+def _fixed_rows(recording: RecordingReader, size: int) -> Iterator[Rows]:
+    """Regroups the chunks of a recording into groups of `size` rows (the last one
+    can be smaller)."""
+    timestamps: List[np.ndarray] = []
+    values: List[np.ndarray] = []
+    pending = 0
+
+    for chunk_timestamps, chunk_values in recording.chunks():
+        timestamps.append(chunk_timestamps)
+        values.append(chunk_values)
+        pending += len(chunk_timestamps)
+
+        if pending < size:
+            continue
+
+        all_timestamps = np.concatenate(timestamps)
+        all_values = np.concatenate(values)
+        nb_complete = pending // size * size
+
+        for start in range(0, nb_complete, size):
+            yield (
+                all_timestamps[start : start + size],
+                all_values[start : start + size],
+            )
+
+        timestamps = [all_timestamps[nb_complete:]]
+        values = [all_values[nb_complete:]]
+        pending -= nb_complete
+
+    if pending:
+        yield np.concatenate(timestamps), np.concatenate(values)
+
+
+def holds_saved_channels(path: str) -> bool:
+    """Whether a recorded session (see `open_session`) is made of saved channels,
+    rather than of raw captures."""
+    if os.path.isdir(path):
+        return not capture_files(path)
+
+    return not path.endswith(CAPTURE_EXTENSION)
+
+
+def open_session(path: str) -> Iterator[SerialData[bytes]]:
+    """Reads the packets of a recorded session, from either :
+
+    - a raw capture, or a directory of raw captures
+    - a saved channel, or a directory of saved channels (`emg-<channel>.csv` or
+      `emg-<channel>.bin`, binary recordings being preferred)
+    """
+    if os.path.isdir(path):
+        captures = capture_files(path)
+
+        if captures:
+            return chain.from_iterable(read_capture(file) for file in captures)
+
+        files: Dict[int, str] = {}
+        for name in sorted(os.listdir(path), key=lambda name: name.endswith(".bin")):
+            match = CHANNEL_FILE.match(name)
+            if match:
+                files[int(match.group(1))] = os.path.join(path, name)
+
+        if not files:
+            raise ValueError(f"No raw captures or saved channels found in '{path}'")
+
+        return read_channels(files)
+
+    if path.endswith(CAPTURE_EXTENSION):
+        return read_capture(path)
+
+    match = CHANNEL_FILE.search(path)
+    return read_channels({int(match.group(1)) if match else 0: path})
@@ -0,0 +1,127 @@
+import traceback
+from abc import abstractmethod
+from multiprocessing import Process
+from threading import Thread
+from typing import List, Literal, Optional, Union
+
+from modupipe.runnable import MultiProcess, MultiThread, Runnable
+
+# How the stages of an experiment run : each one in its own process, or each one
+# in a thread of a single process
+Runtime = Literal["processes", "threads"]
+
+
+class RetryOnError(Runnable):
+    """Runs a pipeline again when it raises an error, up to `nb_times` times, like
+    `Retry`, but stops once the pipeline ends (at the end of its inputs)."""
+
+    def __init__(self, runnable: Runnable, nb_times: int) -> None:
+        self.runnable = runnable
+        self.nb_times = nb_times
+
+    def run(self) -> None:
+        retries = 0
+
+        while True:
+            try:
+                self.runnable.run()
+                return
+            except Exception:
+                if retries >= self.nb_times:
+                    raise
+
+                print("An exception occured while running pipeline :")
+                print(traceback.format_exc())
+                retries += 1
+
+
+class Service(Runnable):
+    """Runs next to the pipelines of an experiment, until it is stopped."""
+
+    @abstractmethod
+    def stop(self) -> None:
+        raise NotImplementedError()
+
+
+class WithServices(Runnable):
+    """Runs the pipelines of an experiment, and `services` in processes (or daemon
+    threads) of their own, stopped once the pipelines ended."""
+
+    def __init__(
+        self, pipelines: Runnable, services: List[Service], runtime: Runtime
+    ) -> None:
+        self.pipelines = pipelines
+        self.services = services
+        self.workers: List[Union[Process, Thread]] = [
+            Process(name=type(service).__name__, target=service.run)
+            if runtime == "processes"
+            else Thread(name=type(service).__name__, target=service.run, daemon=True)
+            for service in services
+        ]
+
+    def run(self) -> None:
+        for worker in self.workers:
+            worker.start()
+
+        try:
+            self.pipelines.run()
+        finally:
+            for service in self.services:
+                service.stop()
+            for worker in self.workers:
+                worker.join()
+
+
+class SingleProcess(MultiThread):
+    """Runs each pipeline in a daemon thread of the calling process, so that the
+    experiment stops as soon as the calling thread does.
+
+    Most plotting backends only work from the main thread, so the `main` pipeline
+    (if any) runs in the calling thread, after the others are started.
+    """
+
+    def __init__(
+        self, runnables: List[Runnable], main: Optional[Runnable] = None
+    ) -> None:
+        super().__init__(runnables)
+        self.main = main
+
+        for thread, runnable in zip(self.threads, runnables):
+            thread.name = getattr(runnable, "name", thread.name)
+            thread.daemon = True
+
+    def run(self) -> None:
+        for thread in self.threads:
+            thread.start()
+
+        if self.main is not None:
+            self.main.run()
+
+        for thread in self.threads:
+            thread.join()
+
+
+def create_runtime(
+    runtime: Runtime,
+    runnables: List[Runnable],
+    main: Optional[Runnable] = None,
+    services: Optional[List[Service]] = None,
+) -> Runnable:
+    """Runs the pipelines of an experiment, `main` being one of them that has to
+    run in the main thread if they all run in a single process. The experiment
+    ends with its pipelines, which stops its `services`."""
+    pipelines: Runnable
+
+    if runtime == "processes":
+        pipelines = MultiProcess(runnables)
+    elif runtime == "threads":
+        pipelines = SingleProcess(
+            [runnable for runnable in runnables if runnable is not main], main=main
+        )
+    else:
+        raise ValueError(f"Unknown runtime '{runtime}'")
+
+    if not services:
+        return pipelines
+
+    return WithServices(pipelines, services, runtime)
@@ -1,16 +1,20 @@
+import threading
 from abc import ABC
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from math import pi, sin
 from random import randint
-from time import sleep
-from typing import Iterator, List
+from time import monotonic, sleep
+from typing import Iterator, List, Optional, Tuple
 
+import numpy as np
 from modupipe.extractor import Extractor
 from serial import Serial
 from serial.serialutil import PARITY_NONE, PARITY_ODD
 
 from src.pipeline.data import SerialData
+from src.pipeline.replay import ReplaySource, holds_saved_channels, open_session
+from src.utils.lists import ByteRing
 from src.utils.loggers import ConsoleLogger, Logger
 
 # TODO add tests
@@ -49,6 +53,7 @@ class RandomSerialSource(Extractor[SerialData[bytes]]):
             length=self.__data_length,
             message_length=self.__message_length,
             nb_channels=self.__nb_channels,
+            ingress=monotonic(),
         )
 
         self.__start = end
@@ -100,6 +105,7 @@ class FrequencySource(Extractor[SerialData[bytes]]):
             length=self.__data_length,
             message_length=self.__message_length,
             nb_channels=self.__nb_channels,
+            ingress=monotonic(),
         )
 
         self.__start = end
@@ -108,6 +114,58 @@ class FrequencySource(Extractor[SerialData[bytes]]):
         sleep((self.__sleep_dt - delay).total_seconds())
 
 
+class SyntheticSource(Extractor[SerialData[bytes]]):
+    """Generates packets like the acquisition board, as fast as they are consumed.
+
+    Timestamps follow `sample_rate` from a fixed start, and values are drawn from a
+    generator seeded with `seed`, so runs are reproducible. Unlike the other
+    generated sources, it never sleeps. It stops after `nb_packets` packets, if set.
+    """
+
+    START = datetime(2020, 1, 1)
+
+    def __init__(
+        self,
+        seed: int = 0,
+        nb_channels: int = 2,
+        data_length: int = 256,
+        sample_rate: float = 2500,
+        nb_packets: Optional[int] = None,
+    ):
+        self.__nb_channels = nb_channels
+        self.__data_length = data_length
+        self.__message_length = 2
+        self.__nb_packets = nb_packets
+
+        nb_messages = data_length // self.__message_length
+        self.__nb_messages = nb_messages
+        self.__packet_dt = timedelta(seconds=nb_messages / nb_channels / sample_rate)
+        self.__sample_dt = timedelta(seconds=1 / sample_rate)
+
+        self.__random = np.random.default_rng(seed)
+        self.__start = self.START
+        self.__count = 0
+
+    def extract(self) -> Iterator[SerialData[bytes]]:
+        while self.__nb_packets is None or self.__count < self.__nb_packets:
+            values = self.__random.integers(-4000, 4000, self.__nb_messages)
+            start = self.__start
+
+            # Advanced before yielding, in case the packet is the last one read
+            self.__start += self.__packet_dt
+            self.__count += 1
+
+            yield SerialData(
+                value=values.astype(">i2").tobytes(),
+                start=start,
+                end=self.__start - self.__sample_dt,
+                length=self.__data_length,
+                message_length=self.__message_length,
+                nb_channels=self.__nb_channels,
+                ingress=monotonic(),
+            )
+
+
 class BaseSerialSource(Extractor[SerialData[bytes]]):
     def __init__(
         self,
@@ -147,6 +205,7 @@ class BaseSerialSource(Extractor[SerialData[bytes]]):
         check_byte = self.__serial.read(1)
 
         end = datetime.now()
+        ingress = monotonic()
 
         if self.__verbose:
             self.__logger.debug(
@@ -165,15 +224,222 @@ class BaseSerialSource(Extractor[SerialData[bytes]]):
             nb_channels=nb_channels,
             length=data_length,
             message_length=message_length,
+            ingress=ingress,
         )
 
 
+class FramedSerialSource(Extractor[SerialData[bytes]]):
+    """Reads everything the serial port received at once, and splits it into
+    packets (sync byte, 3 bytes of config, data, check byte).
+
+    If `ring_size` is set, the port is read by a background thread into a ring of
+    that many bytes, which is drained in batches when extracting. Reading the port
+    does not wait for the packets to be handled then, so slow stages downstream do
+    not overflow the port buffer. Bytes that do not fit in the ring are lost.
+
+    Packets read together share the time between the two reads. Packets with an
+    invalid config or check byte are dropped, and the next packet is searched from
+    the byte following their sync byte. Dropped packets, lost bytes and the
+    highest numbers of bytes waiting in the port and in the ring are reported
+    every `report_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        port: str,
+        baudrate: int,
+        sync_byte: bytes,
+        check_byte: bytes,
+        logger: Logger,
+        use_parity: bool = False,
+        report_interval: float = 1.0,
+        ring_size: Optional[int] = 2**20,
+    ):
+        parity = PARITY_ODD if use_parity else PARITY_NONE
+        serial = Serial(port=port, baudrate=baudrate, parity=parity)
+
+        serial.reset_input_buffer()
+        serial.reset_output_buffer()
+
+        self.__serial = serial
+        self.__sync_byte = sync_byte[0]
+        self.__check_byte = check_byte[0]
+        self.__logger = logger
+        self.__report_interval = report_interval
+
+        self.__buffer = bytearray()
+        self.__last_read = datetime.now()
+        self.__last_report = monotonic()
+        self.__reported_drops = 0
+        self.__reported_lost = 0
+
+        self.__ring = ByteRing(ring_size) if ring_size else None
+        self.__reader: Optional[threading.Thread] = None
+        self.__reader_error: Optional[BaseException] = None
+        self.__received = (datetime.now(), monotonic())
+
+        self.dropped_frames = 0
+        self.skipped_bytes = 0
+        self.port_high_water = 0
+
+    @property
+    def ring(self) -> Optional[ByteRing]:
+        return self.__ring
+
+    def extract(self) -> Iterator[SerialData[bytes]]:
+        if self.__ring is not None and self.__reader is None:
+            # Started here, so that it runs in the process reading the packets
+            self.__reader = threading.Thread(
+                target=self.__read_port, name="serial reader", daemon=True
+            )
+            self.__reader.start()
+
+        while True:
+            if self.__ring is None:
+                self.__buffer += self.__read()
+            else:
+                self.__buffer += self.__drain(self.__ring)
+
+            end, ingress = self.__received
+            start = self.__last_read
+            self.__last_read = end
+
+            frames = self.__split_frames()
+            duration = (end - start) / max(len(frames), 1)
+
+            for index, (nb_channels, message_length, data) in enumerate(frames):
+                yield SerialData(
+                    value=data,
+                    start=start + duration * index,
+                    end=start + duration * (index + 1),
+                    nb_channels=nb_channels,
+                    length=len(data),
+                    message_length=message_length,
+                    ingress=ingress,
+                )
+
+            self.__report()
+
+    def __read(self) -> bytes:
+        waiting = self.__serial.in_waiting
+        self.port_high_water = max(self.port_high_water, waiting)
+
+        data = self.__serial.read(waiting or 1)
+        self.__received = (datetime.now(), monotonic())
+
+        return data
+
+    def __read_port(self) -> None:
+        assert self.__ring is not None
+
+        try:
+            while True:
+                self.__ring.write(self.__read())
+        except BaseException as error:
+            self.__reader_error = error
+
+    def __drain(self, ring: ByteRing) -> bytes:
+        data = ring.read(timeout=self.__report_interval)
+
+        if not data and self.__reader_error is not None:
+            raise RuntimeError("Could not read the serial port") from (
+                self.__reader_error
+            )
+
+        return data
+
+    def __split_frames(self) -> List[Tuple[int, int, bytes]]:
+        buffer = self.__buffer
+        frames = []
+        position = 0
+
+        while True:
+            sync = buffer.find(self.__sync_byte, position)
+
+            if sync < 0:
+                self.skipped_bytes += len(buffer) - position
+                position = len(buffer)
+                break
+
+            self.skipped_bytes += sync - position
+            position = sync
+
+            if len(buffer) - sync < 4:
+                break
+
+            nb_channels, message_length, data_length = buffer[sync + 1 : sync + 4]
+            end = sync + 4 + data_length
+
+            if len(buffer) <= end:
+                break
+
+            if (
+                nb_channels == 0
+                or message_length == 0
+                or data_length % message_length != 0
+                or buffer[end] != self.__check_byte
+            ):
+                self.dropped_frames += 1
+                self.skipped_bytes += 1
+                position = sync + 1
+                continue
+
+            frames.append((nb_channels, message_length, bytes(buffer[sync + 4 : end])))
+            position = end + 1
+
+        del buffer[:position]
+
+        return frames
+
+    def __report(self) -> None:
+        now = monotonic()
+        if now - self.__last_report < self.__report_interval:
+            return
+
+        lost = self.__ring.dropped if self.__ring else 0
+
+        if self.dropped_frames != self.__reported_drops:
+            self.__logger.warning(
+                f"{self.dropped_frames - self.__reported_drops} corrupt packets "
+                f"dropped ({self.dropped_frames} in total, "
+                f"{self.skipped_bytes} bytes skipped)"
+            )
+
+        if lost != self.__reported_lost:
+            self.__logger.warning(
+                f"{lost - self.__reported_lost} bytes lost, the reading ring was "
+                f"full ({lost} in total)"
+            )
+
+        if self.__ring:
+            self.__logger.debug(
+                f"Buffers high-water : port {self.port_high_water} bytes, "
+                f"ring {self.__ring.high_water}/{self.__ring.capacity} bytes"
+            )
+            self.port_high_water = 0
+            self.__ring.high_water = 0
+
+        self.__last_report = now
+        self.__reported_drops = self.dropped_frames
+        self.__reported_lost = lost
+
+
 class SerialSourceFactory:
-    def create(self, port: str) -> SerialSource:
+    def create(self, port: str) -> Extractor[SerialData[bytes]]:
         logger = ConsoleLogger(name="serial")
 
         if port == "rand":
             return RandomSerialSource()
+        elif port.startswith("replay:") or port.startswith("replay-fast:"):
+            mode, path = port.split(":", 1)
+            return ReplaySource(
+                open_session(path),
+                speed=None if mode == "replay-fast" else 1.0,
+                filtered=holds_saved_channels(path),
+            )
+        elif port.startswith("synth"):
+            seed = int(port.split(":")[1]) if ":" in port else 0
+            return SyntheticSource(seed=seed)
         elif "freq" in port:
             try:
                 configs = []
@@ -192,11 +458,10 @@ class SerialSourceFactory:
                     "format should be 'freq:<amp1-freq1-offset1>_<amp2-freq2-offset2>_<...>'"
                 )
         else:
-            return SerialSource(
+            return FramedSerialSource(
                 port=port,
                 baudrate=115200,
                 sync_byte=b"\n",
                 check_byte=b"\xFF",
                 logger=logger,
-                # verbose=True
             )
@@ -0,0 +1,182 @@
+import json
+import multiprocessing
+from dataclasses import asdict, dataclass
+from os import makedirs, path
+from time import monotonic, time
+from typing import Any, Dict, Iterator, List, Optional
+
+from modupipe.mapper import Mapper
+
+from src.pipeline.data import RangeData
+from src.pipeline.queues import ExperimentQueue
+from src.pipeline.runtime import Service
+from src.utils.loggers import ConsoleLogger, Logger
+from src.utils.queues import MeteredQueue
+from src.utils.types import InputType
+
+
+class LatencyGauge:
+    """Accumulates latencies, in values shared between processes, until they are
+    sampled."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.__values = multiprocessing.Array("d", 3)
+
+    def add(self, latency: float) -> None:
+        with self.__values.get_lock():
+            self.__values[0] += 1
+            self.__values[1] += latency
+            self.__values[2] = max(self.__values[2], latency)
+
+    def sample(self) -> "LatencySample":
+        with self.__values.get_lock():
+            count, total, maximum = self.__values[:]
+            self.__values[:] = [0, 0, 0]
+
+        return LatencySample(
+            count=int(count),
+            mean=total / count if count else None,
+            max=maximum if count else None,
+        )
+
+
+@dataclass
+class LatencySample:
+    count: int
+    mean: Optional[float]
+    max: Optional[float]
+
+
+class MeasureLatency(Mapper[RangeData[InputType], RangeData[InputType]]):
+    """Measures the time elapsed since the ingress of each window, which is the
+    reception time of its newest sample."""
+
+    def __init__(self, gauge: LatencyGauge) -> None:
+        self.gauge = gauge
+
+    def map(
+        self, items: Iterator[RangeData[InputType]]
+    ) -> Iterator[RangeData[InputType]]:
+        for item in items:
+            self.gauge.add(monotonic() - item.ingress)
+            yield item
+
+
+@dataclass
+class QueueSample:
+    size: int
+    maxsize: int
+    put_rate: float
+    get_rate: float
+    dropped: int
+
+
+class Telemetry(Service):
+    """Periodically samples the depth and the rates of the queues between the
+    stages of an experiment (the rate at which a queue is emptied being the
+    throughput of the stage reading it) and the latencies of the gauges. Samples
+    are logged, and appended as JSON lines to `metrics_file` if it is set. A last
+    sample is taken when it is stopped."""
+
+    def __init__(
+        self,
+        queues: List[ExperimentQueue],
+        gauges: Optional[List[LatencyGauge]] = None,
+        interval: float = 1,
+        metrics_file: Optional[str] = None,
+        logger: Optional[Logger] = None,
+    ) -> None:
+        self.queues = queues
+        self.gauges = gauges or []
+        self.interval = interval
+        self.metrics_file = metrics_file
+        self.logger = logger or ConsoleLogger(name="telemetry")
+
+        if not all(isinstance(queue.queue, MeteredQueue) for queue in queues):
+            raise ValueError("The queues must be metered to report their usage")
+
+        self.__counts = self.__count_items()
+        self.__start = monotonic()
+        self.__stopped = multiprocessing.Event()
+
+        if metrics_file and path.dirname(metrics_file):
+            makedirs(path.dirname(metrics_file), exist_ok=True)
+
+    def run(self) -> None:
+        while not self.__stopped.wait(self.interval):
+            self.report()
+
+        self.report()
+
+    def stop(self) -> None:
+        self.__stopped.set()
+
+    def report(self) -> None:
+        """Logs and saves the usage since the previous report (or since the
+        telemetry was created)."""
+        now = monotonic()
+        counts = self.__count_items()
+        elapsed = now - self.__start
+
+        queues = {
+            queue.name: QueueSample(
+                size=len(queue.queue),
+                maxsize=queue.maxsize,
+                put_rate=(counts[queue.name][0] - self.__counts[queue.name][0])
+                / elapsed,
+                get_rate=(counts[queue.name][1] - self.__counts[queue.name][1])
+                / elapsed,
+                dropped=queue.dropped,
+            )
+            for queue in self.queues
+        }
+        latencies = {gauge.name: gauge.sample() for gauge in self.gauges}
+        self.__counts, self.__start = counts, now
+
+        self.__log(queues, latencies)
+        self.__save(queues, latencies)
+
+    def __count_items(self) -> Dict[str, List[int]]:
+        counts = {}
+
+        for queue in self.queues:
+            assert isinstance(queue.queue, MeteredQueue)
+            counts[queue.name] = [queue.queue.nb_put.value, queue.queue.nb_got.value]
+
+        return counts
+
+    def __log(
+        self, queues: Dict[str, QueueSample], latencies: Dict[str, LatencySample]
+    ) -> None:
+        for name, queue in queues.items():
+            self.logger.debug(
+                f"{name} : {queue.size}/{queue.maxsize} queued, "
+                f"in {queue.put_rate:.1f}/s, out {queue.get_rate:.1f}/s, "
+                f"{queue.dropped} dropped"
+            )
+
+        for name, latency in latencies.items():
+            if latency.mean is None or latency.max is None:
+                self.logger.debug(f"{name} : no items")
+            else:
+                self.logger.debug(
+                    f"{name} : {latency.count} items, "
+                    f"mean {latency.mean * 1000:.1f} ms, "
+                    f"max {latency.max * 1000:.1f} ms"
+                )
+
+    def __save(
+        self, queues: Dict[str, QueueSample], latencies: Dict[str, LatencySample]
+    ) -> None:
+        if not self.metrics_file:
+            return
+
+        metrics: Dict[str, Any] = {
+            "time": time(),
+            "queues": {name: asdict(queue) for name, queue in queues.items()},
+            "latencies": {name: asdict(latency) for name, latency in latencies.items()},
+        }
+
+        with open(self.metrics_file, "a") as metrics_output:
+            metrics_output.write(json.dumps(metrics) + "\n")
@@ -0,0 +1,162 @@
+import json
+import os
+from multiprocessing.util import Finalize
+from time import monotonic
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+from modupipe.mapper import Mapper
+
+from src.pipeline.data import ProcessedBlock, ProcessedData, RangeData
+from src.utils.loggers import ConsoleLogger, Logger
+
+Traced = Union[ProcessedData[Any], ProcessedBlock, RangeData[Any]]
+
+
+class LatencyHistogram:
+    """Counts latencies in log-spaced bins, from 1 µs to 100 s, with
+    `BINS_PER_DECADE` bins per decade. Latencies are staged and binned in bulk."""
+
+    BINS_PER_DECADE = 20
+    EDGES = np.logspace(-6, 2, 8 * BINS_PER_DECADE + 1)
+
+    def __init__(self, batch_size: int = 4096) -> None:
+        self.counts = np.zeros(len(self.EDGES) + 1, dtype=np.int64)
+        self.total = 0.0
+        self.max = 0.0
+        self.__batch_size = batch_size
+        self.__pending: List[float] = []
+
+    def add(self, latency: float) -> None:
+        self.__pending.append(latency)
+
+        if len(self.__pending) >= self.__batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.__pending:
+            return
+
+        latencies = np.array(self.__pending)
+        self.__pending = []
+
+        bins = np.searchsorted(self.EDGES, latencies, side="right")
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+        self.total += float(latencies.sum())
+        self.max = max(self.max, float(latencies.max()))
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    def percentile(self, q: float) -> float:
+        """Returns the upper edge of the bin holding the `q`th percentile, so
+        latencies are overestimated by at most a bin width."""
+        self.flush()
+        rank = q / 100 * self.count
+        index = int(np.searchsorted(np.cumsum(self.counts), rank, side="left"))
+
+        if index >= len(self.EDGES):
+            return self.max
+
+        return min(float(self.EDGES[index]), self.max)
+
+    def summary(self) -> Dict[str, float]:
+        self.flush()
+
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class LatencyTracer:
+    """Records, for each stage, the latency between the ingress of the items and
+    their output by the stage.
+
+    Stages running in their own processes record in their own copy of the tracer,
+    while stages running as threads share it. When a process exits, its histograms
+    are logged and, if `directory` is set, dumped to `latency-<stage>.json` files
+    (see `load_latency_report`).
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        logger: Optional[Logger] = None,
+    ) -> None:
+        self.directory = directory
+        self.logger = logger or ConsoleLogger(name="latency")
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    def histogram(self, stage: str) -> LatencyHistogram:
+        if stage not in self.histograms:
+            if not self.histograms:
+                Finalize(self, self.dump, exitpriority=10)
+
+            self.histograms[stage] = LatencyHistogram()
+
+        return self.histograms[stage]
+
+    def dump(self) -> None:
+        for stage, histogram in self.histograms.items():
+            summary = histogram.summary()
+
+            self.logger.info(
+                f"{stage} : {summary['count']} items, "
+                + ", ".join(
+                    f"{name} {summary[name] * 1000:.2f} ms"
+                    for name in ["p50", "p95", "p99", "max"]
+                )
+            )
+
+            if self.directory is None:
+                continue
+
+            os.makedirs(self.directory, exist_ok=True)
+            file = os.path.join(self.directory, f"latency-{stage}.json")
+
+            with open(file, "w") as output:
+                json.dump(
+                    {
+                        "stage": stage,
+                        **summary,
+                        "edges": LatencyHistogram.EDGES.tolist(),
+                        "counts": histogram.counts.tolist(),
+                    },
+                    output,
+                )
+
+
+def load_latency_report(directory: str) -> List[Dict[str, Any]]:
+    """Loads the latencies dumped by the stages of a run, ordered by median."""
+    report = []
+
+    for file in os.listdir(directory):
+        if file.startswith("latency-") and file.endswith(".json"):
+            with open(os.path.join(directory, file)) as latency_input:
+                report.append(json.load(latency_input))
+
+    return sorted(report, key=lambda stage: stage["p50"])
+
+
+class TraceLatency(Mapper[Traced, Traced]):
+    """Records the latency of the items going through, as the time elapsed since
+    their ingress. Items without ingress time are ignored."""
+
+    def __init__(self, tracer: LatencyTracer, stage: str) -> None:
+        self.tracer = tracer
+        self.stage = stage
+
+    def map(self, items: Iterator[Traced]) -> Iterator[Traced]:
+        histogram = self.tracer.histogram(self.stage)
+
+        for item in items:
+            if item.ingress:
+                histogram.add(monotonic() - item.ingress)
+
+            yield item
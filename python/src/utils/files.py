@@ -0,0 +1,242 @@
+import queue
+import signal
+import threading
+from dataclasses import dataclass
+from multiprocessing.util import Finalize
+from os import path
+from time import perf_counter
+from typing import IO, Any, Callable, List, Optional, Tuple
+
+from src.utils.loggers import Logger
+
+
+@dataclass
+class WriteStats:
+    rows_written: int = 0
+    batches_written: int = 0
+    last_flush_latency: float = 0.0
+    max_flush_latency: float = 0.0
+    rows_dropped: int = 0
+
+
+def exit_on_termination() -> None:
+    """Turns SIGTERM into a `SystemExit`, so that the process unwinds and runs its
+    exit handlers (which flush the files) instead of dying on the spot."""
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    if signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, _raise_system_exit)
+
+
+def _raise_system_exit(signum, frame) -> None:
+    raise SystemExit(128 + signum)
+
+
+class WriteBehindFile:
+    """Append-only file kept open and written by a background thread.
+
+    Rows are batched in the caller's thread and handed to the writing thread
+    through a bounded queue, so the caller only blocks when the disk falls more
+    than `max_pending_batches` batches behind. If `flush_interval` is set, the
+    writing thread also takes the pending rows once it got no batch for that many
+    seconds. The thread and the file are
+    created on the first row, in the process that writes (and not in the one that
+    built the pipeline), and are flushed and closed when the process exits. Rows
+    appended afterwards, by threads still running at exit, are dropped.
+
+    If `max_file_size` is set, `file` is formatted with the `index` of the file,
+    and a new file is started once a batch makes the current one reach the size.
+    Files are numbered from the first one that does not exist yet, and
+    `start_file` is called on each of them before any row is written."""
+
+    def __init__(
+        self,
+        file: str,
+        write: Callable[[IO, List[Any]], None],
+        batch_size: int,
+        flush_interval: Optional[float] = None,
+        max_pending_batches: int = 64,
+        mode: str = "a",
+        newline: Optional[str] = None,
+        logger: Optional[Logger] = None,
+        stall_time: float = 0.1,
+        max_file_size: Optional[int] = None,
+        start_file: Optional[Callable[[IO], None]] = None,
+    ) -> None:
+        if flush_interval is not None and flush_interval <= 0:
+            raise ValueError("The flush interval must be positive")
+
+        self.__file = file
+        self.__write = write
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__max_pending_batches = max_pending_batches
+        self.__mode = mode
+        self.__newline = newline
+        self.__logger = logger
+        self.__stall_time = stall_time
+        self.__max_file_size = max_file_size
+        self.__start_file = start_file
+
+        self.__rows: List[Any] = []
+        # Pending rows are taken and handed to the writing thread at once, so that
+        # the rows it takes itself are written after the ones handed to it
+        self.__rows_lock = threading.Lock()
+        self.__queue: Optional[queue.Queue] = None
+        self.__thread: Optional[threading.Thread] = None
+        self.__closed = False
+        self.__opened: List[str] = []
+
+        self.stats = WriteStats()
+
+    def append(self, row: Any) -> None:
+        if self.__closed:
+            self.stats.rows_dropped += 1
+            return
+
+        if self.__queue is None:
+            self.__start()
+
+        with self.__rows_lock:
+            self.__rows.append(row)
+            nb_rows = len(self.__rows)
+
+        if nb_rows >= self.__batch_size:
+            self.flush()
+
+    def append_batch(self, rows: Any, nb_rows: int) -> None:
+        """Writes an already batched group of rows, after the pending ones."""
+        self.flush()
+        self.__put(rows, nb_rows)
+
+    def flush(self) -> None:
+        with self.__rows_lock:
+            if not self.__rows:
+                return
+
+            rows = self.__rows
+            self.__rows = []
+            self.__put(rows, len(rows))
+
+    def close(self) -> None:
+        if self.__closed:
+            return
+
+        self.flush()
+        self.__closed = True
+
+        if self.__queue is None or self.__thread is None:
+            return
+
+        self.__queue.put(None)
+        self.__thread.join()
+
+        if self.__logger:
+            files = self.__opened[0]
+            if len(self.__opened) > 1:
+                files += f" to {path.basename(self.__opened[-1])}"
+
+            self.__logger.info(
+                f"{files} : {self.stats.rows_written} rows written, "
+                f"max flush latency {self.stats.max_flush_latency * 1000:.1f} ms"
+            )
+
+    def __put(self, rows: Any, nb_rows: int) -> None:
+        if self.__closed:
+            self.stats.rows_dropped += nb_rows
+            return
+
+        if self.__queue is None:
+            self.__start()
+
+        assert self.__queue is not None
+        self.__queue.put((rows, nb_rows))
+
+    def __start(self) -> None:
+        self.__queue = queue.Queue(maxsize=self.__max_pending_batches)
+        self.__thread = threading.Thread(
+            target=self.__run, name=f"writer {self.__file}", daemon=True
+        )
+        self.__thread.start()
+
+        Finalize(self, self.close, exitpriority=10)
+        exit_on_termination()
+
+    def __run(self) -> None:
+        assert self.__queue is not None
+        index = 0
+        output = self.__open(index)
+
+        try:
+            while True:
+                try:
+                    batch = self.__queue.get(timeout=self.__flush_interval)
+                except queue.Empty:
+                    batch = self.__take_pending_rows()
+
+                    if batch is None:
+                        continue
+
+                if batch is None:
+                    return
+
+                rows, nb_rows = batch
+                output, index = self.__write_batch(output, index, rows, nb_rows)
+        finally:
+            output.close()
+
+    def __take_pending_rows(self) -> Optional[Tuple[List[Any], int]]:
+        assert self.__queue is not None
+
+        with self.__rows_lock:
+            # Rows handed over meanwhile must be written first
+            if not self.__rows or not self.__queue.empty():
+                return None
+
+            rows = self.__rows
+            self.__rows = []
+            return rows, len(rows)
+
+    def __write_batch(
+        self, output: IO, index: int, rows: Any, nb_rows: int
+    ) -> Tuple[IO, int]:
+        start = perf_counter()
+        self.__write(output, rows)
+        output.flush()
+
+        if self.__max_file_size is not None and output.tell() >= self.__max_file_size:
+            output.close()
+            index += 1
+            output = self.__open(index)
+
+        latency = perf_counter() - start
+
+        self.stats.rows_written += nb_rows
+        self.stats.batches_written += 1
+        self.stats.last_flush_latency = latency
+        self.stats.max_flush_latency = max(self.stats.max_flush_latency, latency)
+
+        if self.__logger and latency > self.__stall_time:
+            self.__logger.warning(
+                f"{output.name} : flushing {nb_rows} rows took "
+                f"{latency * 1000:.1f} ms"
+            )
+
+        return output, index
+
+    def __open(self, index: int) -> IO:
+        file = self.__file
+
+        if self.__max_file_size is not None:
+            while path.exists(self.__file.format(index=index)):
+                index += 1
+            file = self.__file.format(index=index)
+
+        output = open(file, self.__mode, newline=self.__newline)
+        self.__opened.append(file)
+
+        if self.__start_file:
+            self.__start_file(output)
+
+        return output
@@ -1,29 +1,128 @@
-from typing import Generic, Iterator, List, TypeVar
+import threading
+from typing import Iterator, List, Optional, Tuple, TypeVar
+
+import numpy as np
 
 ListItem = TypeVar("ListItem")
 
 
-class SizedFifo(Generic[ListItem]):
-    def __init__(self, size: int, null_value: ListItem):
+class RingBuffer:
+    """Fixed-size FIFO of numbers backed by a preallocated NumPy array.
+
+    Every item is written twice, `size` positions apart, so the items from
+    oldest to newest are always a contiguous slice of the buffer and can be
+    returned as a view instead of a copy. Items can also be arrays of a fixed
+    `shape`, in which case they are stacked along the last axis.
+
+    Returned arrays are views on the buffer, valid until the next update.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        dtype: type = float,
+        null_value=0,
+        shape: Tuple[int, ...] = (),
+    ):
         self.__size = size
-        self.__list = [null_value] * size
+        self.__data: np.ndarray = np.full((*shape, 2 * size), null_value, dtype=dtype)
+        self.__index = 0
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def append(self, item) -> None:
+        self.__data[..., self.__index] = item
+        self.__data[..., self.__index + self.__size] = item
+        self.__index = (self.__index + 1) % self.__size
+
+    def add_all(self, items: np.ndarray) -> None:
+        items = np.asarray(items)[..., -self.__size :]
+        start, size = self.__index, self.__size
+        end = start + items.shape[-1]
+
+        self.__data[..., start:end] = items
+
+        if end <= size:
+            self.__data[..., start + size : end + size] = items
+        else:
+            split = size - start
+            self.__data[..., start + size :] = items[..., :split]
+            self.__data[..., : end - size] = items[..., split:]
+
+        self.__index = end % size
+
+    def oldest(self, count: int = 1) -> np.ndarray:
+        return self.__data[..., self.__index : self.__index + count]
+
+    def newest(self, count: int = 1) -> np.ndarray:
+        end = self.__index + self.__size
+        return self.__data[..., end - count : end]
+
+    def to_array(self) -> np.ndarray:
+        return self.__data[..., self.__index : self.__index + self.__size]
+
+
+class ByteRing:
+    """Fixed-size FIFO of bytes between a single writing thread and a single
+    reading thread of the same process.
+
+    Each side only updates its own counter, and relies on the GIL for the other
+    side to see its updates : the event only wakes the reader up. It must not be
+    used by more threads, nor shared between processes. Bytes that do not fit
+    when writing are dropped and counted, so the writer never waits for the
+    reader. The highest number of bytes held is kept in `high_water`.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.__data = bytearray(capacity)
+        self.__written = 0
+        self.__read = 0
+        self.__available = threading.Event()
+
+        self.high_water = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self.__written - self.__read
+
+    def write(self, data: bytes) -> int:
+        """Writes as much of `data` as fits, and returns the number of bytes
+        written."""
+        written = self.__written
+        count = min(len(data), self.capacity - (written - self.__read))
+        start = written % self.capacity
+        split = min(count, self.capacity - start)
+
+        self.__data[start : start + split] = data[:split]
+        self.__data[: count - split] = data[split:count]
+
+        self.__written = written + count
+        self.high_water = max(self.high_water, self.__written - self.__read)
+        self.dropped += len(data) - count
+        self.__available.set()
 
-    def append(self, item: ListItem):
-        self.__list.append(item)
-        del self.__list[0]
+        return count
 
-    def add_all(self, items: List[ListItem]):
-        self.__list.extend(items)
-        self.__list = self.__list[-self.__size :]
+    def read(self, timeout: Optional[float] = None) -> bytes:
+        """Waits for bytes, and returns all the available ones (nothing if the
+        timeout expired first)."""
+        while self.__written == self.__read:
+            if not self.__available.wait(timeout):
+                return b""
+            self.__available.clear()
 
-    def to_list(self) -> List[ListItem]:
-        return self.__list
+        read, count = self.__read, self.__written - self.__read
+        start = read % self.capacity
+        split = min(count, self.capacity - start)
 
-    def oldest(self):
-        return self.__list[0]
+        data = bytes(self.__data[start : start + split]) + bytes(
+            self.__data[: count - split]
+        )
+        self.__read = read + count
 
-    def newest(self):
-        return self.__list[-1]
+        return data
 
 
 def iter_groups(list: List[ListItem], group_size: int) -> Iterator[List[ListItem]]:
@@ -1,11 +1,11 @@
 from abc import ABC, abstractmethod
-from datetime import datetime
+from time import perf_counter
 from typing import Any, List, Tuple, Union
 
 import numpy as np
 from matplotlib import pyplot as plt
 
-from src.utils.lists import SizedFifo
+from src.utils.lists import RingBuffer
 
 
 class RefreshingPlot:
@@ -67,42 +67,182 @@ class RefreshingPlot:
         self.__ax.set_ylim(y[0], y[1])
 
 
+class BlittingPlot:
+    """Figure with one subplot per channel, refreshed with blitting : the static
+    parts of the figure are cached, and only the lines are drawn again on each
+    refresh. The whole figure is only redrawn when an axis needs rescaling.
+
+    Lines are decimated to their minimum and maximum values over each pair of
+    horizontal pixels, so no more points are drawn than can be displayed.
+    """
+
+    def __init__(
+        self,
+        channels: List[int],
+        series: List[str],
+        title: str = "",
+        x_label: str = "",
+        y_label: str = "",
+    ):
+        self.__channels = channels
+        self.__series = series
+        self.__title = title
+        self.__x_label = x_label
+        self.__y_label = y_label
+        self.__init = False
+        self.__background = None
+        self.__needs_redraw = True
+
+    def __init_plot(self):
+        if self.__init:
+            return
+
+        self.__init = True
+
+        plt.ion()
+        fig, axes = plt.subplots(
+            len(self.__channels), 1, sharex=True, squeeze=False, figsize=(10, 8)
+        )
+
+        self.__fig = fig
+        self.__axes = {}
+        self.__lines = {}
+
+        for ax, channel in zip(axes[:, 0], self.__channels):
+            ax.ticklabel_format(useOffset=False, style="plain")
+            ax.set_ylabel(f"ch.{channel} {self.__y_label}")
+            ax.set_xlim([0, 1])
+            ax.set_ylim([0, 1])
+
+            self.__axes[channel] = ax
+            self.__lines[channel] = [
+                ax.plot([], [], label=serie, animated=True, antialiased=False)[0]
+                for serie in self.__series
+            ]
+
+        fig.suptitle(self.__title)
+        axes[-1, 0].set_xlabel(self.__x_label)
+        axes[-1, 0].legend(
+            loc="upper center", bbox_to_anchor=(0.5, -0.2), ncol=len(self.__series)
+        )
+
+        fig.canvas.mpl_connect("draw_event", self.__on_draw)
+        fig.show()
+        plt.pause(0.1)
+
+    def set_data(self, channel: int, X: np.ndarray, Ys: np.ndarray):
+        if not self.__init:
+            self.__init_plot()
+
+        ax = self.__axes[channel]
+        X, Ys = decimate_min_max(X, Ys, nb_bins=max(int(ax.bbox.width) // 2, 1))
+
+        for line, Y in zip(self.__lines[channel], Ys):
+            line.set_data(X, Y)
+
+        self.__rescale(ax, X, Ys)
+
+    def refresh(self):
+        if not self.__init:
+            self.__init_plot()
+
+        canvas = self.__fig.canvas
+
+        if self.__needs_redraw or self.__background is None:
+            self.__needs_redraw = False
+            canvas.draw()
+        else:
+            canvas.restore_region(self.__background)
+            self.__draw_lines()
+            canvas.blit(self.__fig.bbox)
+
+        canvas.flush_events()
+
+    def __on_draw(self, event):
+        self.__background = self.__fig.canvas.copy_from_bbox(self.__fig.bbox)
+        self.__draw_lines()
+        self.__fig.canvas.blit(self.__fig.bbox)
+
+    def __draw_lines(self):
+        for channel, lines in self.__lines.items():
+            for line in lines:
+                self.__axes[channel].draw_artist(line)
+
+    def __rescale(self, ax, X: np.ndarray, Ys: np.ndarray):
+        if len(X) == 0:
+            return
+
+        x_limits = (X[0], X[-1])
+        min_Y, max_Y = np.min(Ys), np.max(Ys)
+        low, high = ax.get_ylim()
+
+        if x_limits != ax.get_xlim() and X[0] != X[-1]:
+            ax.set_xlim(*x_limits)
+            self.__needs_redraw = True
+
+        # Only rescale when data goes out of range or uses less than half of it,
+        # as every rescale needs a full redraw
+        if min_Y < low or max_Y > high or (max_Y - min_Y) < (high - low) / 2:
+            margin = max(np.max(np.std(Ys, axis=1)), 1)
+            ax.set_ylim(min_Y - margin, max_Y + margin)
+            self.__needs_redraw = True
+
+
+def decimate_min_max(
+    X: np.ndarray, Ys: np.ndarray, nb_bins: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduces each of the series Ys (series x points) to the minimum and maximum
+    of `nb_bins` consecutive groups of points, which draws the same envelope
+    with at most `2 * nb_bins` points."""
+    if len(X) <= 2 * nb_bins:
+        return X, Ys
+
+    starts = np.arange(0, len(X), int(np.ceil(len(X) / nb_bins)))
+
+    decimated_X = np.repeat(X[starts], 2)
+    decimated_Ys = np.empty((len(Ys), 2 * len(starts)))
+    decimated_Ys[:, 0::2] = np.minimum.reduceat(Ys, starts, axis=1)
+    decimated_Ys[:, 1::2] = np.maximum.reduceat(Ys, starts, axis=1)
+
+    return decimated_X, decimated_Ys
+
+
 class PlottingStrategy(ABC):
     @abstractmethod
     def update_plot(self, x: Any, ys: List[Any]):
         raise NotImplementedError()
 
+    @abstractmethod
+    def update_plot_block(self, xs: np.ndarray, ys: List[np.ndarray]):
+        raise NotImplementedError()
+
 
 class BatchPlotUpdate(PlottingStrategy):
     def __init__(
         self, plot: RefreshingPlot, window_size: int, batch_size: int, n_ys: int
     ):
         self.__batch_size = batch_size
-        self.__x_history = SizedFifo(size=window_size, null_value=0)
-        self.__y_histories = [
-            SizedFifo(size=window_size, null_value=0) for _ in range(n_ys)
-        ]
-        self.__count = 0
+        self.__history = PlotHistory(window_size=window_size, n_ys=n_ys)
         self.__plot = plot
 
     def update_plot(self, x: Any, ys: List[Any]):
-        self.__x_history.append(x)
-        for y, y_history in zip(ys, self.__y_histories):
-            y_history.append(y)
-        self.__count += 1
+        self.__history.append(x, ys)
+        self.__update()
 
-        if self.__count >= self.__batch_size:
-            self.__count = 0
+    def update_plot_block(self, xs: np.ndarray, ys: List[np.ndarray]):
+        self.__history.extend(xs, ys)
+        self.__update()
 
-            X = self.__x_history.to_list()
-            Ys = [y_history.to_list() for y_history in self.__y_histories]
+    def __update(self):
+        if self.__history.nb_pending() >= self.__batch_size:
+            X, Ys = self.__history.to_arrays()
 
-            std_Y: float = max((np.std(Y) for Y in Ys))
-            min_Y: float = min((np.min(Y) for Y in Ys))
-            max_Y: float = max((np.max(Y) for Y in Ys))
+            std_Y = np.max(np.std(Ys, axis=1))
+            min_Y = np.min(Ys)
+            max_Y = np.max(Ys)
 
             self.__plot.resize((np.min(X), np.max(X)), (min_Y - std_Y, max_Y + std_Y))
-            self.__plot.set_data(X, Ys)
+            self.__plot.set_data(X, list(Ys))
 
 
 class TimedPlotUpdate(PlottingStrategy):
@@ -114,36 +254,125 @@ class TimedPlotUpdate(PlottingStrategy):
         update_time: float = 1,
         plot_time: bool = False,
     ):
-        self.__x_history = SizedFifo(size=window_size, null_value=0)
-        self.__y_histories = [
-            SizedFifo(size=window_size, null_value=0) for _ in range(n_ys)
-        ]
+        self.__history = PlotHistory(window_size=window_size, n_ys=n_ys)
+        self.__indexes = np.arange(window_size)
         self.__plot = plot
         self.__update_time = update_time
         self.__plot_time = plot_time
 
-        self.__start = datetime.now()
+        self.__start = perf_counter()
 
     def update_plot(self, x: Any, ys: List[Any]):
-        self.__x_history.append(x)
-        for y, y_history in zip(ys, self.__y_histories):
-            y_history.append(y)
+        self.__history.append(x, ys)
+        self.__update()
+
+    def update_plot_block(self, xs: np.ndarray, ys: List[np.ndarray]):
+        self.__history.extend(xs, ys)
+        self.__update()
+
+    def __update(self):
+        now = perf_counter()
+
+        if now - self.__start >= self.__update_time:
+            self.__start = now
+
+            X, Ys = self.__history.to_arrays()
+            if not self.__plot_time:
+                X = self.__indexes
+
+            std_Y = np.max(np.std(Ys, axis=1))
+            min_Y = np.min(Ys)
+            max_Y = np.max(Ys)
+
+            self.__plot.resize((np.min(X), np.max(X)), (min_Y - std_Y, max_Y + std_Y))
+            self.__plot.set_data(X, list(Ys))
+
+
+class PlotHistory:
+    """Last `window_size` points of a plot.
+
+    Points are staged in lists, which are cheap to append to, and moved to ring
+    buffers in bulk when the history is read. Blocks of points are moved to the
+    ring buffers right away.
+    """
+
+    def __init__(self, window_size: int, n_ys: int):
+        self.__xs = RingBuffer(size=window_size)
+        self.__ys = RingBuffer(size=window_size, shape=(n_ys,))
+        self.__pending_xs: List[Any] = []
+        self.__pending_ys: List[List[Any]] = []
+        self.__nb_pending = 0
+
+    def append(self, x: Any, ys: List[Any]):
+        self.__pending_xs.append(x)
+        self.__pending_ys.append(ys)
+        self.__nb_pending += 1
+
+    def extend(self, xs: np.ndarray, ys: List[np.ndarray]):
+        self.__move_pending()
+        self.__xs.add_all(xs)
+        self.__ys.add_all(np.stack(ys))
+        self.__nb_pending += len(xs)
+
+    def nb_pending(self) -> int:
+        return self.__nb_pending
+
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        self.__move_pending()
+        self.__nb_pending = 0
+
+        return self.__xs.to_array(), self.__ys.to_array()
+
+    def __move_pending(self):
+        if len(self.__pending_xs) != 0:
+            self.__xs.add_all(np.array(self.__pending_xs))
+            self.__ys.add_all(np.array(self.__pending_ys).T)
+            self.__pending_xs, self.__pending_ys = [], []
+
+
+class ChannelsPlotUpdate:
+    """Keeps the last points of every channel and refreshes `plot` at most `fps`
+    times per second."""
+
+    def __init__(
+        self,
+        plot: BlittingPlot,
+        channels: List[int],
+        window_size: int,
+        n_ys: int,
+        fps: float = 20,
+        plot_time: bool = False,
+    ):
+        self.__histories = {
+            channel: PlotHistory(window_size=window_size, n_ys=n_ys)
+            for channel in channels
+        }
+        self.__indexes = np.arange(window_size)
+        self.__plot = plot
+        self.__update_time = 1 / fps
+        self.__plot_time = plot_time
+
+        self.__start = perf_counter()
+
+    def update_plot(self, channel: int, x: Any, ys: List[Any]):
+        self.__histories[channel].append(x, ys)
+        self.__update()
+
+    def update_plot_block(self, channel: int, xs: np.ndarray, ys: List[np.ndarray]):
+        self.__histories[channel].extend(xs, ys)
+        self.__update()
 
-        deltatime = datetime.now() - self.__start
+    def __update(self):
+        now = perf_counter()
 
-        if deltatime.total_seconds() >= self.__update_time:
-            self.__start = datetime.now()
+        if now - self.__start >= self.__update_time:
+            self.__start = now
 
-            Ys = [y_history.to_list() for y_history in self.__y_histories]
-            X = (
-                self.__x_history.to_list()
-                if self.__plot_time
-                else list(range(len(Ys[0])))
-            )
+            for channel, history in self.__histories.items():
+                X, Ys = history.to_arrays()
+                if not self.__plot_time:
+                    X = self.__indexes
 
-            std_Y = max((np.std(Y) for Y in Ys))
-            min_Y = min((np.min(Y) for Y in Ys))
-            max_Y = max((np.max(Y) for Y in Ys))
+                self.__plot.set_data(channel, X, Ys)
 
-            self.__plot.resize([np.min(X), np.max(X)], [min_Y - std_Y, max_Y + std_Y])
-            self.__plot.set_data(X, Ys)
+            self.__plot.refresh()
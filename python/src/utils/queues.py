@@ -1,57 +1,229 @@
 import multiprocessing
-import queue
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Any, Generic, Union
+from multiprocessing import shared_memory
+from multiprocessing.util import Finalize
+from queue import Empty, Full
+from typing import Any, Generic, Optional, Tuple, TypeVar
+
+import numpy as np
+from modupipe.queue import Queue, QueuePutStrategy
 
-from src.utils.loggers import Logger
 from src.utils.types import OutputType
 
+T = TypeVar("T")
 
-@dataclass
-class NamedQueue:
-    name: str
-    queue: Union[multiprocessing.Queue, queue.Queue]
-    maxsize: int = None
 
-    def print_usage(self, logger: Logger):
-        size = self.queue.qsize()
+class MeteredQueue(Queue[T]):
+    """Counts the items put in, got from and discarded from the queue, in values
+    shared between processes. Each count takes a lock shared between processes,
+    so queues should only be metered when their usage is reported.
 
-        if self.maxsize:
-            total = self.maxsize
-            logger.debug(f"{self.name} : {size}/{total} ({round(size/total*100, 2)}%)")
-        else:
-            logger.debug(f"{self.name} : {size}")
+    Items discarded by producers (see `DroppingPut`) are not counted as got, so
+    that the rate of got items stays the throughput of the consumer.
+    """
+
+    def __init__(self, queue: Any, name: str) -> None:
+        super().__init__(queue, name=name)
+        self.nb_put = multiprocessing.Value("Q", 0)
+        self.nb_got = multiprocessing.Value("Q", 0)
+        self.nb_dropped = multiprocessing.Value("Q", 0)
+
+    def get(self, *args, **kwargs) -> T:
+        item = super().get(*args, **kwargs)
+
+        with self.nb_got.get_lock():
+            self.nb_got.value += 1
+
+        return item
+
+    def put(self, item: T, *args, **kwargs) -> None:
+        super().put(item, *args, **kwargs)
 
+        with self.nb_put.get_lock():
+            self.nb_put.value += 1
 
-class QueuePuttingStrategy(ABC):
+    def discard(self) -> None:
+        """Removes the oldest item without waiting (raising `queue.Empty`)."""
+        self.queue.get(block=False)
+
+        with self.nb_dropped.get_lock():
+            self.nb_dropped.value += 1
+
+
+class RecordCodec(ABC, Generic[OutputType]):
+    """Converts items to and from fixed-size records of a NumPy structured dtype."""
+
+    @property
     @abstractmethod
-    def put(self, queue: NamedQueue, data: Any):
+    def dtype(self) -> np.dtype:
         raise NotImplementedError()
 
+    @abstractmethod
+    def encode(self, item: OutputType) -> Tuple:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def decode(self, record: Tuple) -> OutputType:
+        raise NotImplementedError()
+
+
+class SharedMemoryQueue(Generic[OutputType]):
+    """Single-producer/single-consumer queue backed by a ring of fixed-size records
+    in shared memory, so that items cross process boundaries without being pickled.
+
+    It has the `get`/`put`/`qsize` interface of `multiprocessing.Queue` and can be
+    wrapped in a `modupipe` `Queue`. Only one process may put items. Getting is
+    locked so that the producer can also discard items when the queue is full.
+    Putting blocks (or raises `queue.Full`) when `capacity` items are waiting.
+    """
+
+    def __init__(self, codec: RecordCodec[OutputType], capacity: int = 2**16):
+        self.__codec = codec
+        self.__capacity = capacity
+        self.__memory = shared_memory.SharedMemory(
+            create=True, size=capacity * codec.dtype.itemsize
+        )
+        self.__records = self.__map_records()
+
+        self.__available_items = multiprocessing.Semaphore(0)
+        self.__available_slots = multiprocessing.Semaphore(capacity)
+        self.__get_lock = multiprocessing.Lock()
+        self.__nb_put = multiprocessing.RawValue("Q", 0)
+        self.__nb_got = multiprocessing.RawValue("Q", 0)
+
+        Finalize(self, _unlink_memory, args=(self.__memory,), exitpriority=0)
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    def put(
+        self, item: OutputType, block: bool = True, timeout: Optional[float] = None
+    ) -> None:
+        if not self.__available_slots.acquire(block, timeout):
+            raise Full()
+
+        self.__records[self.__nb_put.value % self.__capacity] = self.__codec.encode(
+            item
+        )
+        self.__nb_put.value += 1
+        self.__available_items.release()
 
-class NonBlockingPut(QueuePuttingStrategy):
-    def put(self, queue: NamedQueue, data: Any):
-        queue.queue.put_nowait(data)
+    def put_nowait(self, item: OutputType) -> None:
+        self.put(item, block=False)
 
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> OutputType:
+        if not self.__available_items.acquire(block, timeout):
+            raise Empty()
 
-class BlockingPut(QueuePuttingStrategy):
-    def __init__(self, timeout: float = None):
-        self.__timeout = timeout
+        with self.__get_lock:
+            record = self.__records[self.__nb_got.value % self.__capacity].item()
+            self.__nb_got.value += 1
 
-    def put(self, queue: NamedQueue, data: Any):
-        queue.queue.put(data, block=True, timeout=self.__timeout)
+        self.__available_slots.release()
 
+        return self.__codec.decode(record)
+
+    def get_nowait(self) -> OutputType:
+        return self.get(block=False)
+
+    def qsize(self) -> int:
+        return self.__nb_put.value - self.__nb_got.value
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def full(self) -> bool:
+        return self.qsize() >= self.__capacity
+
+    def __map_records(self) -> np.ndarray:
+        return np.ndarray(
+            self.__capacity, dtype=self.__codec.dtype, buffer=self.__memory.buf
+        )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state[f"_{SharedMemoryQueue.__name__}__records"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__records = self.__map_records()
+
+
+def _unlink_memory(memory: shared_memory.SharedMemory) -> None:
+    # The records still map the memory, which is released with the process
+    memory.unlink()
+
+
+class DroppingPut(QueuePutStrategy[T]):
+    """Puts without blocking, and handles full queues by dropping items. The number
+    of dropped items is shared between processes."""
+
+    def __init__(self) -> None:
+        self.__dropped = multiprocessing.Value("Q", 0)
+
+    @property
+    def dropped(self) -> int:
+        return self.__dropped.value
+
+    def put(self, queue: Queue[T], item: T):
+        try:
+            queue.put(item, block=False)
+        except Full:
+            self._on_full(queue, item)
+
+    def _count_drops(self, nb_items: int = 1) -> None:
+        with self.__dropped.get_lock():
+            self.__dropped.value += nb_items
+
+    def _discard(self, queue: Queue[T]) -> None:
+        if isinstance(queue, MeteredQueue):
+            queue.discard()
+        else:
+            queue.get(block=False)
+
+        self._count_drops()
 
-class QueueFetchingStrategy(ABC, Generic[OutputType]):
     @abstractmethod
-    def get(self, queue: NamedQueue) -> OutputType:
+    def _on_full(self, queue: Queue[T], item: T) -> None:
         raise NotImplementedError()
 
 
-class BlockingFetch(QueueFetchingStrategy[OutputType]):
-    def __init__(self, timeout: int = None):
-        self.__timeout = timeout
+class PutDropNewest(DroppingPut[T]):
+    def _on_full(self, queue: Queue[T], item: T) -> None:
+        self._count_drops()
+
+
+class PutDropOldest(DroppingPut[T]):
+    def _on_full(self, queue: Queue[T], item: T) -> None:
+        while True:
+            try:
+                self._discard(queue)
+            except Empty:
+                pass
+
+            try:
+                queue.put(item, block=False)
+                return
+            except Full:
+                continue
+
+
+class PutCoalesce(DroppingPut[T]):
+    """Keeps only the newest item when the queue is full, for consumers that only
+    care about the latest value (such as the latest window to predict)."""
+
+    def _on_full(self, queue: Queue[T], item: T) -> None:
+        while True:
+            try:
+                while True:
+                    self._discard(queue)
+            except Empty:
+                pass
 
-    def get(self, queue: NamedQueue) -> OutputType:
-        return queue.queue.get(block=True, timeout=self.__timeout)
+            try:
+                queue.put(item, block=False)
+                return
+            except Full:
+                continue
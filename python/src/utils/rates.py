@@ -0,0 +1,61 @@
+from time import perf_counter_ns
+from typing import Optional
+
+CHECKS_PER_INTERVAL = 20
+
+
+class RateMeter:
+    """Measures a rate of items with `time.perf_counter_ns`.
+
+    Items are counted by the caller, who only calls `update` every `check_every`
+    items so that the clock is rarely read. `check_every` adapts to the measured
+    rate, to check the clock about `CHECKS_PER_INTERVAL` times per `interval`.
+    Rates are measured over at least `interval` seconds, and smoothed with an
+    exponentially weighted moving average of factor `smoothing`.
+    """
+
+    def __init__(
+        self, interval: float = 1, smoothing: float = 0.3, max_check_every: int = 1024
+    ) -> None:
+        self.interval = interval
+        self.smoothing = smoothing
+        self.max_check_every = max_check_every
+
+        self.check_every = 1
+        self.rate: Optional[float] = None
+        self.smoothed_rate: Optional[float] = None
+        self.total = 0
+
+        self.__interval_ns = int(interval * 1e9)
+        self.__count = 0
+        self.__start = perf_counter_ns()
+
+    def update(self, nb_items: int) -> bool:
+        """Counts `nb_items` more items, and returns whether a new rate was
+        measured."""
+        self.__count += nb_items
+        now = perf_counter_ns()
+        elapsed = now - self.__start
+
+        if elapsed < self.__interval_ns:
+            return False
+
+        self.rate = self.__count * 1e9 / elapsed
+
+        if self.smoothed_rate is None:
+            self.smoothed_rate = self.rate
+        else:
+            self.smoothed_rate += self.smoothing * (self.rate - self.smoothed_rate)
+
+        self.check_every = max(
+            1,
+            min(
+                self.max_check_every,
+                int(self.rate * self.interval / CHECKS_PER_INTERVAL),
+            ),
+        )
+        self.total += self.__count
+        self.__count = 0
+        self.__start = now
+
+        return True
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.pipeline.binary import BinaryWriter, read_binary
+from src.pipeline.data import ProcessedBlock, ProcessedData
+
+
+class BinaryWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.directory.name, "acq", "emg-2.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_written_samples_and_blocks_are_read_back(self):
+        writer = BinaryWriter(file=self.file, batch_size=4, channel=2, sample_rate=2500)
+        times = np.arange(20) / 2500
+        values = np.arange(20) * 1.5
+
+        for time, value in zip(times[:10], values[:10]):
+            writer.load(ProcessedData(time=time, channel=2, original=0, filtered=value))
+        writer.load(
+            ProcessedBlock(time=times[10:], channel=2, original=0, filtered=values[10:])
+        )
+        writer.close()
+
+        recording = read_binary(self.file)
+
+        np.testing.assert_array_equal(recording.timestamp, times)
+        np.testing.assert_array_equal(recording.value, values)
+        self.assertEqual(recording.metadata["channel"], 2)
+        self.assertEqual(recording.metadata["sample_rate"], 2500)
+
+    def test_incomplete_last_record_is_ignored(self):
+        writer = BinaryWriter(
+            file=self.file, batch_size=1, channel=0, sample_rate=2500, value_dtype="i2"
+        )
+        writer.load(ProcessedData(time=1.0, channel=0, original=0, filtered=-3))
+        writer.close()
+
+        with open(self.file, "ab") as file:
+            file.write(b"\x00\x01")
+
+        recording = read_binary(self.file)
+
+        self.assertEqual(len(recording), 1)
+        self.assertEqual(recording.value[0], -3)
+
+    def test_integer_values_are_rounded_and_clipped(self):
+        writer = BinaryWriter(
+            file=self.file, batch_size=2, channel=0, sample_rate=2500, value_dtype="i2"
+        )
+        values = np.array([-40000.0, -2.6, 2.5, 3.4, 40000.0])
+
+        for time, value in enumerate(values[:3]):
+            writer.load(ProcessedData(time=time, channel=0, original=0, filtered=value))
+        writer.load(
+            ProcessedBlock(
+                time=np.arange(3.0, 5.0), channel=0, original=0, filtered=values[3:]
+            )
+        )
+        writer.close()
+
+        np.testing.assert_array_equal(
+            read_binary(self.file).value, [-32768, -3, 2, 3, 32767]
+        )
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+from src.pipeline.capture import CaptureWriter, capture_files, read_capture
+from src.pipeline.replay import open_session
+from src.pipeline.serial import SyntheticSource
+
+
+class CaptureWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.packets = list(SyntheticSource(seed=3, nb_packets=50).extract())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def capture(self, packets, **kwargs):
+        writer = CaptureWriter(self.directory.name, batch_size=4, **kwargs)
+        for packet in packets:
+            writer.load(packet)
+        writer.close()
+
+        return writer
+
+    def test_captures_rotate_by_size(self):
+        writer = self.capture(self.packets, max_file_size=2000)
+        files = capture_files(self.directory.name)
+
+        self.assertEqual(writer.stats.rows_written, 50)
+        self.assertGreater(len(files), 1)
+        for file in files[:-1]:
+            self.assertGreaterEqual(os.path.getsize(file), 2000)
+            self.assertLess(os.path.getsize(file), 2000 + 4 * 300)
+
+        replayed = list(open_session(self.directory.name))
+        self.assertEqual(
+            [packet.value for packet in replayed],
+            [packet.value for packet in self.packets],
+        )
+        self.assertEqual(
+            [packet.end for packet in replayed], [packet.end for packet in self.packets]
+        )
+
+    def test_existing_captures_are_kept(self):
+        self.capture(self.packets[:10])
+        self.capture(self.packets[10:])
+
+        files = capture_files(self.directory.name)
+
+        self.assertEqual(len(files), 2)
+        self.assertEqual(len(list(read_capture(files[0]))), 10)
+        self.assertEqual(len(list(read_capture(files[1]))), 40)
@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from src.pipeline.csv import CSVWriter, WithoutChannel
+from src.pipeline.data import ProcessedBlock, ProcessedData
+
+
+def write_then_wait(file: str, nb_rows: int, ready) -> None:
+    writer: CSVWriter = CSVWriter(file, batch_size=1000, strategy=WithoutChannel())
+
+    for i in range(nb_rows):
+        writer.load(ProcessedData(time=i, channel=0, original=0, filtered=2 * i))
+
+    ready.set()
+
+    # Short sleeps, as a signal received just before a long one is only handled
+    # once it is over
+    for _ in range(1000):
+        time.sleep(0.01)
+
+
+class CSVWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.directory.name, "acq", "emg-0.csv")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read_lines(self):
+        with open(self.file) as file:
+            return file.read().splitlines()
+
+    def test_rows_are_written_after_the_header(self):
+        writer = CSVWriter(self.file, batch_size=3, strategy=WithoutChannel())
+
+        for i in range(7):
+            writer.load(ProcessedData(time=i, channel=0, original=0, filtered=2 * i))
+        writer.close()
+
+        expected = ["timestamp;value"] + [f"{i};{2 * i}" for i in range(7)]
+        self.assertEqual(self.read_lines(), expected)
+        self.assertEqual(writer.stats.rows_written, 7)
+        self.assertEqual(writer.stats.batches_written, 3)
+
+    def test_blocks_are_written_as_rows(self):
+        writer = CSVWriter(self.file, batch_size=3, strategy=WithoutChannel())
+
+        writer.load(ProcessedData(time=0.0, channel=0, original=0, filtered=0.0))
+        writer.load(
+            ProcessedBlock(
+                time=np.arange(1.0, 5.0),
+                channel=0,
+                original=np.arange(1, 5),
+                filtered=np.arange(2.0, 10.0, 2.0),
+            )
+        )
+        writer.close()
+
+        expected = ["timestamp;value"] + [f"{i:.1f};{2.0 * i}" for i in range(5)]
+        self.assertEqual(self.read_lines(), expected)
+        self.assertEqual(writer.stats.rows_written, 5)
+        self.assertEqual(writer.stats.batches_written, 2)
+
+    def test_pending_rows_are_flushed_after_the_interval(self):
+        writer = CSVWriter(
+            self.file, batch_size=1000, strategy=WithoutChannel(), flush_interval=0.05
+        )
+
+        writer.load(ProcessedData(time=0, channel=0, original=0, filtered=1))
+        time.sleep(0.01)
+        self.assertEqual(writer.stats.batches_written, 0)
+
+        time.sleep(0.2)
+        self.assertEqual(writer.stats.batches_written, 1)
+        self.assertEqual(self.read_lines(), ["timestamp;value", "0;1"])
+
+        writer.close()
+        self.assertEqual(writer.stats.rows_written, 1)
+
+    def test_rows_loaded_after_closing_are_dropped(self):
+        writer = CSVWriter(self.file, batch_size=3, strategy=WithoutChannel())
+
+        writer.load(ProcessedData(time=0, channel=0, original=0, filtered=0))
+        writer.close()
+        writer.load(ProcessedData(time=1, channel=0, original=0, filtered=2))
+
+        self.assertEqual(self.read_lines(), ["timestamp;value", "0;0"])
+        self.assertEqual(writer.stats.rows_dropped, 1)
+
+    def test_tail_rows_are_flushed_when_the_process_is_terminated(self):
+        context = multiprocessing.get_context("fork")
+        ready = context.Event()
+        process = context.Process(target=write_then_wait, args=(self.file, 10, ready))
+        process.start()
+
+        self.assertTrue(ready.wait(timeout=5))
+        process.terminate()
+        process.join(timeout=5)
+
+        self.assertEqual(len(self.read_lines()), 11)
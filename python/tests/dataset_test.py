@@ -0,0 +1,124 @@
+import math
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.ai.dataset import time_range, windowed_features
+from src.ai.transform_unique import (
+    FeaturesTransformAngle,
+    FeaturesTransformEMG,
+    WindowsTransformer,
+)
+from src.pipeline.binary import BinaryWriter
+from src.pipeline.data import ProcessedBlock
+from src.pipeline.recording import BinaryRecordingReader, CSVRecordingReader
+
+
+class WindowedFeaturesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        random = np.random.default_rng(3)
+
+        self.emg_times = np.arange(5003) / 500
+        self.emg_values = random.integers(-500, 500, len(self.emg_times))
+        self.emg_file = os.path.join(self.directory.name, "emg-0.csv")
+        pd.DataFrame({"timestamp": self.emg_times, "value": self.emg_values}).to_csv(
+            self.emg_file, sep=";", index=False
+        )
+
+        angle_times = np.linspace(0.7, 8.9, 83)
+        self.angles_file = os.path.join(self.directory.name, "angles.csv")
+        pd.DataFrame(
+            {
+                "timestamp": angle_times,
+                "a": random.normal(size=len(angle_times)),
+                "b": random.normal(size=len(angle_times)),
+            }
+        ).to_csv(self.angles_file, index=False)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def reference(self):
+        data_emg = pd.read_csv(self.emg_file, delimiter=";")
+        data_hand_angle = pd.read_csv(self.angles_file, delimiter=",")
+
+        start = data_hand_angle.timestamp.min()
+        end = data_hand_angle.timestamp.max()
+        emg_crop = data_emg.loc[
+            (data_emg.timestamp > start) & (data_emg.timestamp < end)
+        ]
+        emg_data = emg_crop.reset_index(drop=True).drop(columns=["timestamp"]).values
+        angles_data = (
+            data_hand_angle.reset_index(drop=True).drop(columns=["timestamp"]).values
+        )
+
+        windows_transformer = WindowsTransformer(math.floor(end - start))
+
+        return (
+            FeaturesTransformEMG().transform(windows_transformer.transform(emg_data)),
+            FeaturesTransformAngle().transform(
+                windows_transformer.transform(angles_data)
+            ),
+        )
+
+    def test_features_match_the_whole_recording_transform(self):
+        expected_emg, expected_angles = self.reference()
+
+        for chunk_size in [7, 1000, 100000]:
+            with self.subTest(chunk_size=chunk_size):
+                emg = CSVRecordingReader(self.emg_file, chunk_size=chunk_size)
+                angles = CSVRecordingReader(
+                    self.angles_file, delimiter=",", chunk_size=chunk_size
+                )
+                start, end = time_range(angles)
+                windows_number = math.floor(end - start)
+
+                trainset = windowed_features(
+                    emg,
+                    windows_number,
+                    FeaturesTransformEMG().transform,
+                    start=start,
+                    end=end,
+                )
+                target = windowed_features(
+                    angles, windows_number, FeaturesTransformAngle().transform
+                )
+
+                np.testing.assert_allclose(trainset, expected_emg)
+                np.testing.assert_allclose(target, expected_angles)
+
+    def test_binary_recording_gives_the_same_windows(self):
+        binary_file = os.path.join(self.directory.name, "emg-0.bin")
+        writer = BinaryWriter(
+            binary_file, batch_size=100, channel=0, sample_rate=500, value_dtype="i4"
+        )
+        writer.load(
+            ProcessedBlock(
+                time=self.emg_times,
+                channel=0,
+                original=self.emg_values,
+                filtered=self.emg_values,
+            )
+        )
+        writer.close()
+
+        csv = windowed_features(
+            CSVRecordingReader(self.emg_file, chunk_size=300),
+            5,
+            FeaturesTransformEMG().transform,
+            start=1.0,
+            end=9.0,
+        )
+        binary = windowed_features(
+            BinaryRecordingReader(binary_file, chunk_size=300),
+            5,
+            FeaturesTransformEMG().transform,
+            start=1.0,
+            end=9.0,
+        )
+
+        np.testing.assert_allclose(binary, csv)
@@ -0,0 +1,54 @@
+import unittest
+from typing import Iterator, List
+
+from modupipe.extractor import Extractor
+
+from src.pipeline.data import RangeData
+from src.pipeline.extractors import AlignWindows
+
+
+class Windows(Extractor[RangeData[int]]):
+    def __init__(self, ends: List[float]) -> None:
+        self.ends = ends
+
+    def extract(self) -> Iterator[RangeData[int]]:
+        for index, end in enumerate(self.ends):
+            yield RangeData(start=end - 0.1, end=end, value=index)
+
+
+def aligned_ends(align: AlignWindows) -> List[List[float]]:
+    return [[window.end for window in windows] for windows in align.extract()]
+
+
+class AlignWindowsTest(unittest.TestCase):
+    def test_windows_within_the_tolerance_are_paired(self):
+        align = AlignWindows(
+            [Windows([0.1, 0.2, 0.3]), Windows([0.101, 0.202, 0.299])],
+            skew_tolerance=0.05,
+        )
+
+        self.assertEqual(
+            aligned_ends(align), [[0.1, 0.101], [0.2, 0.202], [0.3, 0.299]]
+        )
+        self.assertEqual(align.nb_dropped, 0)
+
+    def test_channels_resynchronize_after_a_lost_window(self):
+        align = AlignWindows(
+            [
+                Windows([0.1, 0.2, 0.3, 0.4]),
+                Windows([0.1, 0.3, 0.4]),
+                Windows([0.1, 0.2, 0.3, 0.4]),
+            ],
+            skew_tolerance=0.05,
+        )
+
+        self.assertEqual(
+            aligned_ends(align),
+            [[0.1, 0.1, 0.1], [0.3, 0.3, 0.3], [0.4, 0.4, 0.4]],
+        )
+        self.assertEqual(align.nb_dropped, 2)
+
+    def test_alignment_stops_with_the_shortest_input(self):
+        align = AlignWindows([Windows([0.1, 0.2]), Windows([0.1])], skew_tolerance=0.05)
+
+        self.assertEqual(aligned_ends(align), [[0.1, 0.1]])
@@ -0,0 +1,155 @@
+import unittest
+
+import numpy as np
+
+from src.ai.transform_unique import FeaturesTransformEMG, SlidingFeaturesEMG
+from src.ai.utilities import getFeatures, getMAV, getRMS, getSD, getSSC, getVar, getZC
+
+
+def reference_MAV(x):
+    return np.mean(np.abs(x))
+
+
+def reference_RMS(x):
+    return np.sqrt(np.mean(x**2))
+
+
+def reference_Var(x):
+    N = np.size(x)
+    return (1 / (N - 1)) * np.sum(x**2)
+
+
+def reference_SD(x):
+    N = np.size(x)
+    xx = np.mean(x)
+    return np.sqrt(1 / (N - 1) * np.sum((x - xx) ** 2))
+
+
+def reference_ZC(x, threshold=0):
+    N = np.size(x)
+    ZC = 0
+    for i in range(N - 1):
+        if (x[i] * x[i + 1] < 0) and (np.abs(x[i] - x[i + 1]) >= threshold):
+            ZC += 1
+    return ZC
+
+
+def reference_SSC(x, threshold=0):
+    N = np.size(x)
+    SSC = 0
+    for i in range(1, N - 1):
+        if (
+            ((x[i] > x[i - 1]) and (x[i] > x[i + 1]))
+            or ((x[i] < x[i - 1]) and (x[i] < x[i + 1]))
+        ) and (
+            (np.abs(x[i] - x[i + 1]) >= threshold)
+            or (np.abs(x[i] - x[i - 1]) >= threshold)
+        ):
+            SSC += 1
+    return SSC
+
+
+REFERENCES = [
+    (getMAV, reference_MAV),
+    (getVar, reference_Var),
+    (getSD, reference_SD),
+    (getSSC, reference_SSC),
+    (getZC, reference_ZC),
+    (getRMS, reference_RMS),
+]
+
+
+def create_windows():
+    rng = np.random.default_rng(0)
+
+    return {
+        "float": rng.normal(0, 500, (20, 250)),
+        "int": rng.integers(-4000, 4000, (20, 250)),
+        "plateaus": rng.integers(-3, 3, (20, 250)).astype(float),
+        "short": rng.normal(0, 500, (5, 3)),
+    }
+
+
+class FeaturesParityTest(unittest.TestCase):
+    def test_each_feature_matches_reference_on_single_window(self):
+        for name, windows in create_windows().items():
+            for feature, reference in REFERENCES:
+                with self.subTest(data=name, feature=feature.__name__):
+                    for window in windows:
+                        self.assertEqual(feature(window), reference(window))
+
+    def test_each_feature_matches_reference_on_all_windows(self):
+        for name, windows in create_windows().items():
+            for feature, reference in REFERENCES:
+                with self.subTest(data=name, feature=feature.__name__):
+                    expected = [reference(window) for window in windows]
+                    np.testing.assert_array_equal(feature(windows), expected)
+
+    def test_thresholds_match_reference(self):
+        windows = create_windows()["float"]
+
+        for threshold in [10, 500, 2000]:
+            with self.subTest(threshold=threshold):
+                np.testing.assert_array_equal(
+                    getZC(windows, threshold),
+                    [reference_ZC(window, threshold) for window in windows],
+                )
+                np.testing.assert_array_equal(
+                    getSSC(windows, threshold),
+                    [reference_SSC(window, threshold) for window in windows],
+                )
+
+    def test_all_features_match_references(self):
+        for name, windows in create_windows().items():
+            with self.subTest(data=name):
+                expected = [
+                    [reference(window) for _, reference in REFERENCES]
+                    for window in windows
+                ]
+                np.testing.assert_array_equal(getFeatures(windows), expected)
+
+    def test_transform_accepts_single_column_windows(self):
+        windows = create_windows()["float"]
+        expected = [
+            [reference(window) for _, reference in REFERENCES] for window in windows
+        ]
+
+        features = FeaturesTransformEMG().transform(windows[:, :, np.newaxis])
+
+        np.testing.assert_array_equal(features, expected)
+
+
+class SlidingFeaturesTest(unittest.TestCase):
+    def setUp(self):
+        self.signal = np.random.default_rng(0).normal(0, 500, 3000).round()
+
+    def assert_features_equal(self, actual, window):
+        expected = getFeatures(window[np.newaxis, :])
+        np.testing.assert_allclose(actual, expected, rtol=1e-9)
+        np.testing.assert_array_equal(actual[:, 3:5], expected[:, 3:5])
+
+    def test_matches_features_of_each_window(self):
+        for window_size, hop_size in [(250, 25), (250, 50), (100, 100), (50, 120)]:
+            with self.subTest(window_size=window_size, hop_size=hop_size):
+                extractor = SlidingFeaturesEMG(window_size=window_size)
+
+                for end in range(hop_size, len(self.signal), hop_size):
+                    extractor.update(self.signal[end - hop_size : end])
+
+                    if end >= window_size:
+                        self.assertTrue(extractor.is_full())
+                        window = self.signal[end - window_size : end]
+                        self.assert_features_equal(extractor.extract(), window)
+                    else:
+                        self.assertFalse(extractor.is_full())
+
+    def test_matches_features_with_threshold(self):
+        extractor = SlidingFeaturesEMG(window_size=200, threshold=300)
+
+        for end in range(10, len(self.signal), 10):
+            extractor.update(self.signal[end - 10 : end])
+
+            if end >= 200:
+                window = self.signal[end - 200 : end]
+                expected = [getSSC(window, 300), getZC(window, 300)]
+                np.testing.assert_array_equal(extractor.extract()[0, 3:5], expected)
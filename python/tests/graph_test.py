@@ -0,0 +1,196 @@
+import multiprocessing
+import threading
+import time
+import unittest
+from typing import Any, Iterator, List
+
+from modupipe.base import Condition
+from modupipe.extractor import Extractor
+from modupipe.loader import Loader
+from modupipe.mapper import Mapper
+from modupipe.runnable import Runnable
+
+from src.pipeline.graph import Stage, StageGraph, compile_graph
+from src.pipeline.queues import QueueFactory
+from src.pipeline.runtime import create_runtime
+
+
+class ListSource(Extractor[int]):
+    def __init__(self, items: List[int]) -> None:
+        self.items = items
+
+    def extract(self) -> Iterator[int]:
+        yield from self.items
+
+
+class Double(Mapper[int, int]):
+    def map(self, items: Iterator[int]) -> Iterator[int]:
+        for item in items:
+            yield 2 * item
+
+
+class Record(Loader[Any, None]):
+    def __init__(self) -> None:
+        self.items: List[Any] = []
+
+    def load(self, item: Any) -> None:
+        self.items.append(item)
+
+
+class IsEven(Condition[int]):
+    def check(self, item: int) -> bool:
+        return item % 2 == 0
+
+
+def create_chain(sink: Record, isolated: bool = False) -> StageGraph:
+    graph = StageGraph()
+    source = graph.add(Stage("source", source=ListSource([1, 2, 3]), isolated=isolated))
+    double = graph.add(Stage("double", mapper=Double()))
+    saving = graph.add(Stage("saving", sink=sink))
+    graph.connect(source, double)
+    graph.connect(double, saving)
+
+    return graph
+
+
+class Count(Loader[Any, None]):
+    """Counts the items loaded, in a value shared between processes."""
+
+    def __init__(self) -> None:
+        self.count = multiprocessing.Value("i", 0)
+
+    def load(self, item: Any) -> None:
+        with self.count.get_lock():
+            self.count.value += 1
+
+
+def run_until_ended(test: unittest.TestCase, runtime: Runnable) -> None:
+    thread = threading.Thread(target=runtime.run, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+
+    test.assertFalse(thread.is_alive())
+
+
+class CompileGraphTest(unittest.TestCase):
+    def test_linear_stages_are_fused_into_a_single_partition(self):
+        sink = Record()
+
+        compiled = compile_graph(
+            create_chain(sink), QueueFactory(10, runtime="threads")
+        )
+
+        self.assertEqual(len(compiled.partitions), 1)
+        self.assertEqual(compiled.queues, [])
+        compiled.runnables[0].run()
+        self.assertEqual(sink.items, [2, 4, 6])
+
+    def test_each_stage_has_a_partition_without_fusing(self):
+        sink = Record()
+
+        compiled = compile_graph(
+            create_chain(sink), QueueFactory(10, runtime="threads"), fuse=False
+        )
+
+        self.assertEqual(
+            [partition.name for partition in compiled.partitions],
+            ["source", "double", "saving"],
+        )
+        self.assertEqual(
+            [queue.name for queue, _ in compiled.queues], ["double", "saving"]
+        )
+        compiled.runnables[0].run()
+        queue = compiled.queues[0][0].queue
+        self.assertEqual([queue.get() for _ in range(3)], [1, 2, 3])
+
+    def test_isolated_stages_keep_their_partition(self):
+        compiled = compile_graph(
+            create_chain(Record(), isolated=True), QueueFactory(10, runtime="threads")
+        )
+
+        self.assertEqual(
+            [partition.name for partition in compiled.partitions],
+            ["source", "double + saving"],
+        )
+
+    def test_branches_of_a_fan_out_run_in_parallel_and_sinks_are_fused(self):
+        graph = StageGraph()
+        evens, all_items = Record(), Record()
+        source = graph.add(Stage("source", source=ListSource([1, 2, 3, 4])))
+        left = graph.add(Stage("left", mapper=Double()))
+        right = graph.add(Stage("right", mapper=Double()))
+        saving = graph.add(Stage("saving", sink=evens))
+        logging = graph.add(Stage("logging", sink=all_items))
+        graph.connect(source, left)
+        graph.connect(source, right)
+        graph.connect(source, saving, condition=IsEven())
+        graph.connect(source, logging)
+
+        compiled = compile_graph(graph, QueueFactory(10, runtime="threads"))
+
+        self.assertEqual(
+            [partition.name for partition in compiled.partitions],
+            ["source + saving + logging", "left", "right"],
+        )
+        compiled.runnables[0].run()
+        self.assertEqual(evens.items, [2, 4])
+        self.assertEqual(all_items.items, [1, 2, 3, 4])
+
+    def test_zipped_inputs_give_tuples(self):
+        graph = StageGraph()
+        sink = Record()
+        first = graph.add(Stage("first", source=ListSource([1, 2])))
+        second = graph.add(Stage("second", source=ListSource([3, 4])))
+        both = graph.add(Stage("both", sink=sink, merge="zip"))
+        graph.connect(first, both)
+        graph.connect(second, both)
+
+        compiled = compile_graph(graph, QueueFactory(10, runtime="threads"))
+        for runnable in compiled.runnables:
+            threading.Thread(target=runnable.run, daemon=True).start()
+
+        deadline = time.monotonic() + 5
+        while len(sink.items) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(sink.items, [(1, 3), (2, 4)])
+
+    def test_partitions_end_once_their_inputs_are_drained(self):
+        sink = Record()
+        queues = QueueFactory(10, runtime="threads")
+        compiled = compile_graph(create_chain(sink), queues, fuse=False)
+
+        run_until_ended(self, create_runtime("threads", compiled.runnables))
+
+        self.assertEqual(sink.items, [2, 4, 6])
+        self.assertTrue(all(queue.ended for queue in queues.queues))
+
+    def test_partitions_in_processes_end_once_their_inputs_are_drained(self):
+        graph = StageGraph()
+        sink = Count()
+        source = graph.add(Stage("source", source=ListSource(list(range(1000)))))
+        left = graph.add(Stage("left", mapper=Double()))
+        right = graph.add(Stage("right", mapper=Double()))
+        saving = graph.add(Stage("saving", sink=sink, merge="interleave"))
+        graph.connect(source, left)
+        graph.connect(source, right)
+        graph.connect(left, saving)
+        graph.connect(right, saving)
+
+        compiled = compile_graph(graph, QueueFactory(10))
+        run_until_ended(self, create_runtime("processes", compiled.runnables))
+
+        self.assertEqual(sink.count.value, 2000)
+
+    def test_describe_lists_partitions_and_queues(self):
+        compiled = compile_graph(
+            create_chain(Record(), isolated=True), QueueFactory(10, runtime="threads")
+        )
+
+        self.assertEqual(
+            compiled.describe(),
+            "2 partitions :\n"
+            "  1. source\n"
+            "  2. double ─⏵ [saving]\n"
+            "1 queues :\n"
+            "  double : source ─⏵ double",
+        )
@@ -0,0 +1,89 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from src.utils.lists import ByteRing, RingBuffer
+
+
+class RingBufferTest(unittest.TestCase):
+    def test_keeps_last_items_in_order(self):
+        buffer = RingBuffer(size=5)
+        expected = [0] * 5
+        rng = np.random.default_rng(0)
+
+        for index in range(200):
+            if rng.random() < 0.5:
+                buffer.append(index)
+                expected = (expected + [index])[-5:]
+            else:
+                items = list(range(1000 * index, 1000 * index + rng.integers(0, 8)))
+                buffer.add_all(np.array(items))
+                expected = (expected + items)[-5:]
+
+            self.assertEqual(list(buffer.to_array()), expected)
+            self.assertEqual(list(buffer.oldest(2)), expected[:2])
+            self.assertEqual(list(buffer.newest(3)), expected[-3:])
+
+    def test_stacks_shaped_items_on_last_axis(self):
+        buffer = RingBuffer(size=3, shape=(2,))
+
+        buffer.append([1, 10])
+        buffer.add_all(np.array([[2, 3, 4], [20, 30, 40]]))
+
+        np.testing.assert_array_equal(buffer.to_array(), [[2, 3, 4], [20, 30, 40]])
+
+    def test_returns_views_on_the_buffer(self):
+        buffer = RingBuffer(size=4)
+        buffer.add_all(np.arange(6))
+
+        self.assertIsNotNone(buffer.to_array().base)
+
+
+class ByteRingTest(unittest.TestCase):
+    def test_bytes_are_read_in_order_across_the_end(self):
+        ring = ByteRing(capacity=10)
+        rng = np.random.default_rng(1)
+        written = bytearray()
+        read = bytearray()
+
+        for index in range(100):
+            data = bytes(rng.integers(0, 256, rng.integers(0, 8)).tolist())
+            self.assertEqual(ring.write(data), len(data))
+            written += data
+            read += ring.read(timeout=0)
+
+        self.assertEqual(read, written)
+        self.assertEqual(ring.dropped, 0)
+
+    def test_bytes_that_do_not_fit_are_dropped(self):
+        ring = ByteRing(capacity=4)
+
+        self.assertEqual(ring.write(b"abc"), 3)
+        self.assertEqual(ring.write(b"def"), 1)
+
+        self.assertEqual(ring.high_water, 4)
+        self.assertEqual(ring.dropped, 2)
+        self.assertEqual(ring.read(), b"abcd")
+        self.assertEqual(ring.read(timeout=0.01), b"")
+
+    def test_reader_waits_for_the_writer_thread(self):
+        ring = ByteRing(capacity=64)
+        chunks = [bytes([index]) * 5 for index in range(200)]
+
+        def write():
+            for chunk in chunks:
+                while len(ring) > ring.capacity - len(chunk):
+                    time.sleep(0.001)
+                ring.write(chunk)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+
+        read = bytearray()
+        while len(read) < 1000:
+            read += ring.read(timeout=1)
+        writer.join()
+
+        self.assertEqual(read, b"".join(chunks))
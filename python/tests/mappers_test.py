@@ -0,0 +1,254 @@
+import time
+import unittest
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Iterator, List
+
+import numpy as np
+
+from src.ai.transform_unique import SlidingFeaturesEMG
+from src.pipeline.base import PredictionModel
+from src.pipeline.data import ProcessedBlock, ProcessedData, RangeData, SerialData
+from src.pipeline.mappers import (
+    ConcatenateRows,
+    ExtractSlidingCharacteristics,
+    NotchDC,
+    NotchFrequencyOnline,
+    Predict,
+    ProcessFromSerial,
+    TimedBuffer,
+    ToInt,
+)
+
+
+def create_serial_data(nb_channels: int, nb_messages: int) -> SerialData[bytes]:
+    values = np.random.default_rng(0).integers(-4000, 4000, nb_messages)
+    start = datetime.now()
+
+    return SerialData(
+        value=values.astype(">i2").tobytes(),
+        start=start,
+        end=start + timedelta(milliseconds=25),
+        nb_channels=nb_channels,
+        length=2 * nb_messages,
+        message_length=2,
+    )
+
+
+class ProcessFromSerialTest(unittest.TestCase):
+    def test_batched_mode_gives_same_samples_per_channel(self):
+        packets = [create_serial_data(nb_channels=3, nb_messages=128)]
+
+        samples = list((ProcessFromSerial() + ToInt()).map(iter(packets)))
+        blocks = list((ProcessFromSerial(batched=True) + ToInt()).map(iter(packets)))
+
+        self.assertEqual(len(blocks), 3)
+        for block in blocks:
+            self.assertIsInstance(block, ProcessedBlock)
+            expected = [sample for sample in samples if sample.channel == block.channel]
+            self.assertEqual(list(block.time), [sample.time for sample in expected])
+            self.assertEqual(
+                list(block.filtered), [sample.filtered for sample in expected]
+            )
+
+    def test_batched_mode_decodes_messages_of_any_width(self):
+        values = [-(2**23), -1, 0, 1, 2**23 - 1, 12345]
+        start = datetime.now()
+        packet = SerialData(
+            value=b"".join(v.to_bytes(3, "big", signed=True) for v in values),
+            start=start,
+            end=start + timedelta(milliseconds=25),
+            nb_channels=2,
+            length=3 * len(values),
+            message_length=3,
+        )
+
+        samples = list((ProcessFromSerial() + ToInt()).map(iter([packet])))
+        blocks = list((ProcessFromSerial(batched=True) + ToInt()).map(iter([packet])))
+
+        self.assertEqual([sample.filtered for sample in samples], values)
+        self.assertEqual(list(blocks[0].filtered), values[0::2])
+        self.assertEqual(list(blocks[1].filtered), values[1::2])
+
+
+class TimedBufferTest(unittest.TestCase):
+    def test_blocks_give_same_windows_as_samples(self):
+        packets = [create_serial_data(nb_channels=1, nb_messages=64) for _ in range(8)]
+        for index, packet in enumerate(packets):
+            packet.start += timedelta(milliseconds=30 * index)
+            packet.end += timedelta(milliseconds=30 * index)
+
+        samples = ProcessFromSerial() + ToInt() + TimedBuffer(time_in_seconds=0.05)
+        blocks = (
+            ProcessFromSerial(batched=True)
+            + ToInt()
+            + TimedBuffer(time_in_seconds=0.05)
+        )
+
+        sample_windows = list(samples.map(iter(packets)))
+        block_windows = list(blocks.map(iter(packets)))
+
+        self.assertEqual(len(block_windows), len(sample_windows))
+        for block_window, sample_window in zip(block_windows, sample_windows):
+            self.assertEqual(block_window.start, sample_window.start)
+            self.assertEqual(block_window.end, sample_window.end)
+            self.assertEqual(list(block_window.value), sample_window.value)
+
+
+class FiltersTest(unittest.TestCase):
+    def setUp(self):
+        self.values = np.random.default_rng(0).integers(-4000, 4000, 1000)
+        self.times = np.arange(len(self.values)) / 2500
+
+    def create_filters(self):
+        return NotchDC(R=0.99) + NotchFrequencyOnline(
+            frequency=60, sampling_frequency=2500
+        )
+
+    def test_blocks_give_bit_identical_output_to_samples(self):
+        samples = [
+            ProcessedData(time=time, channel=0, original=value, filtered=value)
+            for time, value in zip(self.times, self.values.tolist())
+        ]
+        blocks = [
+            ProcessedBlock(
+                time=self.times[index : index + 64],
+                channel=0,
+                original=self.values[index : index + 64],
+                filtered=self.values[index : index + 64],
+            )
+            for index in range(0, len(self.values), 64)
+        ]
+
+        filtered_samples = [
+            sample.filtered for sample in self.create_filters().map(iter(samples))
+        ]
+        filtered_blocks = np.concatenate(
+            [block.filtered for block in self.create_filters().map(iter(blocks))]
+        )
+
+        np.testing.assert_array_equal(filtered_blocks, filtered_samples)
+
+
+class ExtractSlidingCharacteristicsTest(unittest.TestCase):
+    def test_blocks_give_same_windows_as_samples(self):
+        values = np.random.default_rng(0).normal(0, 500, 2000)
+        times = np.arange(len(values)) / 2500
+        samples = [
+            ProcessedData(time=time, channel=0, original=value, filtered=value)
+            for time, value in zip(times.tolist(), values.tolist())
+        ]
+        blocks = [
+            ProcessedBlock(
+                time=times[index : index + 64],
+                channel=0,
+                original=values[index : index + 64],
+                filtered=values[index : index + 64],
+            )
+            for index in range(0, len(values), 64)
+        ]
+
+        def create_mapper():
+            extractor = SlidingFeaturesEMG(window_size=250)
+            return ExtractSlidingCharacteristics(extractor=extractor, hop_size=50)
+
+        sample_windows = list(create_mapper().map(iter(samples)))
+        block_windows = list(create_mapper().map(iter(blocks)))
+
+        self.assertEqual(len(sample_windows), (len(values) - 250) // 50 + 1)
+        self.assertEqual(len(block_windows), len(sample_windows))
+        for block_window, sample_window in zip(block_windows, sample_windows):
+            self.assertEqual(block_window.start, sample_window.start)
+            self.assertEqual(block_window.end, sample_window.end)
+            self.assertAlmostEqual(block_window.end - block_window.start, 249 / 2500)
+            np.testing.assert_array_equal(block_window.value, sample_window.value)
+
+
+class SumModel(PredictionModel):
+    def __init__(self) -> None:
+        self.batch_sizes: List[int] = []
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        self.batch_sizes.append(len(X))
+        return X.sum(axis=1, keepdims=True)
+
+
+def create_windows(nb_windows: int) -> List[RangeData[np.ndarray]]:
+    return [
+        RangeData(start=i, end=i + 1, value=np.full((1, 3), i), ingress=i)
+        for i in range(nb_windows)
+    ]
+
+
+class PredictTest(unittest.TestCase):
+    def test_batched_windows_get_their_own_predictions(self):
+        model = SumModel()
+
+        predictions = list(Predict(model, batch_size=4).map(iter(create_windows(10))))
+
+        # The first window is predicted alone, until the time between windows is known
+        self.assertEqual(model.batch_sizes, [1, 4, 4, 1])
+        self.assertEqual(len(predictions), 10)
+        for i, prediction in enumerate(predictions):
+            self.assertEqual((prediction.start, prediction.ingress), (i, i))
+            np.testing.assert_array_equal(prediction.value, [[3 * i]])
+
+    def test_single_mode_predicts_each_window(self):
+        model = SumModel()
+
+        list(Predict(model).map(iter(create_windows(3))))
+
+        self.assertEqual(model.batch_sizes, [1, 1, 1])
+
+    def test_slow_windows_are_not_kept_pending_beyond_the_latency(self):
+        model = SumModel()
+
+        def slow_windows() -> Iterator[RangeData[np.ndarray]]:
+            for window in create_windows(4):
+                yield window
+                time.sleep(0.02)
+
+        predictions = Predict(model, batch_size=4, max_latency=0.01).map(slow_windows())
+
+        self.assertEqual(len(list(predictions)), 4)
+        self.assertEqual(model.batch_sizes, [1, 1, 1, 1])
+
+    def test_pending_windows_are_predicted_without_waiting_for_late_ones(self):
+        model = SumModel()
+        windows = create_windows(4)
+
+        def late_windows() -> Iterator[RangeData[np.ndarray]]:
+            yield from windows[:3]
+            time.sleep(0.5)
+            yield windows[3]
+
+        predictions = Predict(model, batch_size=8, max_latency=0.05).map(late_windows())
+        start = time.monotonic()
+        list(islice(predictions, 3))
+
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(model.batch_sizes, [1, 2])
+        self.assertEqual(len(list(predictions)), 1)
+
+    def test_errors_of_the_windows_are_raised(self):
+        def failing_windows() -> Iterator[RangeData[np.ndarray]]:
+            yield from create_windows(2)
+            raise ValueError("No more windows")
+
+        predictions = Predict(SumModel(), batch_size=4).map(failing_windows())
+
+        with self.assertRaisesRegex(ValueError, "No more windows"):
+            list(predictions)
+
+
+class ConcatenateRowsTest(unittest.TestCase):
+    def test_rows_of_each_channel_are_kept_apart(self):
+        window = RangeData(
+            start=0, end=1, value=[np.ones((1, 6)), np.zeros((1, 6))], ingress=2
+        )
+
+        (rows,) = ConcatenateRows().map(iter([window]))
+
+        self.assertEqual(rows.value.shape, (2, 6))
+        np.testing.assert_array_equal(rows.value[:, 0], [1, 0])
+        self.assertEqual(rows.ingress, 2)
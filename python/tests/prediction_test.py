@@ -0,0 +1,82 @@
+import unittest
+from typing import List, Tuple
+from unittest.mock import patch
+
+import numpy as np
+
+from src.pipeline.base import PredictionModel
+from src.pipeline.data import RangeData
+from src.pipeline.experiment.pipelines import ExtractionStageFactory
+from src.pipeline.experiment.prediction import PredictionExperimentFactory
+from src.pipeline.graph import Stage
+
+
+class FittedModel(PredictionModel):
+    def __init__(self, nb_features: int) -> None:
+        self.n_features_in_ = nb_features
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return X[:, :1]
+
+
+def create_experiment(nb_features: int, nb_channels: int):
+    with patch(
+        "src.pipeline.experiment.prediction.load_model",
+        return_value=FittedModel(nb_features),
+    ):
+        return PredictionExperimentFactory().create(
+            serial_port="synth",
+            model_name="model",
+            predicting_channels=list(range(nb_channels)),
+            runtime="threads",
+        )
+
+
+def create_extraction(nb_features: int, nb_channels: int) -> Tuple[bool, Stage]:
+    """Gives the extraction stage of the experiment, and whether it extracts the
+    features of each channel separately."""
+    stages: List[Tuple[bool, Stage]] = []
+    create = ExtractionStageFactory.create
+
+    def record(factory: ExtractionStageFactory, **kwargs) -> Stage:
+        stage = create(factory, **kwargs)
+        stages.append((kwargs["per_channel"], stage))
+        return stage
+
+    with patch.object(ExtractionStageFactory, "create", record):
+        create_experiment(nb_features, nb_channels)
+
+    (extraction,) = stages
+    return extraction
+
+
+def extract_rows(extraction: Stage, nb_channels: int) -> np.ndarray:
+    window = [
+        RangeData(
+            start=0, end=1, value=np.random.default_rng(channel).normal(0, 1, 250)
+        )
+        for channel in range(nb_channels)
+    ]
+
+    assert extraction.mapper is not None
+    (features,) = extraction.mapper.map(iter([window]))
+    return np.atleast_2d(features.value)
+
+
+class PredictionExperimentFactoryTest(unittest.TestCase):
+    def test_models_take_the_features_of_every_channel_or_of_one(self):
+        for nb_features, nb_channels, per_channel, shape in [
+            (12, 2, False, (1, 12)),
+            (6, 3, True, (3, 6)),
+        ]:
+            with self.subTest(nb_features=nb_features, nb_channels=nb_channels):
+                predicts_per_channel, extraction = create_extraction(
+                    nb_features, nb_channels
+                )
+
+                self.assertEqual(predicts_per_channel, per_channel)
+                self.assertEqual(extract_rows(extraction, nb_channels).shape, shape)
+
+    def test_models_expecting_other_features_are_rejected(self):
+        with self.assertRaisesRegex(ValueError, "expects 12 features"):
+            create_experiment(nb_features=12, nb_channels=3)
@@ -0,0 +1,213 @@
+import multiprocessing
+import queue
+import threading
+import time
+import unittest
+
+import numpy as np
+from modupipe.queue import Queue
+
+from src.pipeline.data import ProcessedBlock, ProcessedData
+from src.pipeline.queues import ProcessedDataCodec, QueueFactory
+from src.utils.queues import (
+    MeteredQueue,
+    PutCoalesce,
+    PutDropNewest,
+    PutDropOldest,
+    SharedMemoryQueue,
+)
+
+
+def produce(samples_queue: SharedMemoryQueue, nb_items: int) -> None:
+    for i in range(nb_items):
+        samples_queue.put(
+            ProcessedData(time=i / 10, channel=3, original=i, filtered=-i)
+        )
+
+
+class SharedMemoryQueueTest(unittest.TestCase):
+    def test_items_keep_their_order_and_types(self):
+        samples_queue = SharedMemoryQueue(ProcessedDataCodec(), capacity=4)
+
+        for i in range(10):
+            samples_queue.put(
+                ProcessedData(time=i / 10, channel=1, original=i, filtered=i + 0.5)
+            )
+            item = samples_queue.get()
+
+            self.assertEqual(
+                item,
+                ProcessedData(time=i / 10, channel=1, original=i, filtered=i + 0.5),
+            )
+            self.assertIsInstance(item.original, int)
+
+    def test_full_and_empty_queues_raise_when_not_blocking(self):
+        samples_queue = SharedMemoryQueue(ProcessedDataCodec(), capacity=2)
+
+        with self.assertRaises(queue.Empty):
+            samples_queue.get(block=False)
+
+        samples_queue.put(ProcessedData(time=0, channel=0, original=0, filtered=0))
+        samples_queue.put(ProcessedData(time=1, channel=0, original=0, filtered=0))
+
+        self.assertEqual(samples_queue.qsize(), 2)
+        with self.assertRaises(queue.Full):
+            samples_queue.put(
+                ProcessedData(time=2, channel=0, original=0, filtered=0), block=False
+            )
+
+    def test_items_cross_process_boundaries(self):
+        nb_items = 1000
+        samples_queue = SharedMemoryQueue(
+            ProcessedDataCodec(filtered_dtype="i8"), capacity=16
+        )
+
+        producer = multiprocessing.Process(
+            target=produce, args=(samples_queue, nb_items)
+        )
+        producer.start()
+
+        items = [samples_queue.get(timeout=10) for _ in range(nb_items)]
+        producer.join()
+
+        self.assertEqual([item.original for item in items], list(range(nb_items)))
+        self.assertEqual([item.filtered for item in items[:3]], [0, -1, -2])
+        self.assertEqual(items[-1].channel, 3)
+
+
+class OverflowPolicyTest(unittest.TestCase):
+    def create_queues(self):
+        def sample(i):
+            return ProcessedData(time=i, channel=0, original=i, filtered=0.0)
+
+        return [
+            (Queue(queue.Queue(maxsize=3)), lambda i: i),
+            (Queue(SharedMemoryQueue(ProcessedDataCodec(), capacity=3)), sample),
+        ]
+
+    def put_all(self, strategy, nb_items=5):
+        for items_queue, create_item in self.create_queues():
+            for i in range(nb_items):
+                strategy.put(items_queue, create_item(i))
+
+            items = []
+            while len(items_queue):
+                item = items_queue.get(block=False)
+                items.append(item if isinstance(item, int) else item.original)
+
+            yield items
+
+    def test_drop_newest_keeps_the_first_items(self):
+        strategy = PutDropNewest()
+
+        for items in self.put_all(strategy):
+            self.assertEqual(items, [0, 1, 2])
+        self.assertEqual(strategy.dropped, 4)
+
+    def test_drop_oldest_keeps_the_last_items(self):
+        strategy = PutDropOldest()
+
+        for items in self.put_all(strategy):
+            self.assertEqual(items, [2, 3, 4])
+        self.assertEqual(strategy.dropped, 4)
+
+    def test_coalesce_keeps_the_latest_item_when_full(self):
+        strategy = PutCoalesce()
+
+        for items in self.put_all(strategy):
+            self.assertEqual(items, [3, 4])
+        self.assertEqual(strategy.dropped, 6)
+
+    def test_dropped_items_are_not_counted_as_got(self):
+        items_queue = MeteredQueue(queue.Queue(maxsize=3), name="q")
+        strategy = PutDropOldest()
+
+        for i in range(5):
+            strategy.put(items_queue, i)
+        items_queue.get()
+
+        self.assertEqual(items_queue.nb_put.value, 5)
+        self.assertEqual(items_queue.nb_got.value, 1)
+        self.assertEqual(items_queue.nb_dropped.value, 2)
+        self.assertEqual(strategy.dropped, 2)
+
+    def test_queues_are_only_metered_on_demand(self):
+        self.assertNotIsInstance(
+            QueueFactory().create("plotting", kind="plotting").queue, MeteredQueue
+        )
+        self.assertIsInstance(
+            QueueFactory(metered=True).create("plotting", kind="plotting").queue,
+            MeteredQueue,
+        )
+
+    def test_factory_uses_the_default_policy_of_each_kind(self):
+        queues = QueueFactory(maxsize=10)
+
+        plotting = queues.create("plotting", kind="plotting")
+        saving = queues.create_samples("saving ch.1", kind="saving")
+
+        self.assertIsInstance(plotting.strategy, PutDropOldest)
+        self.assertEqual(saving.queue.name, "saving ch.1")
+        self.assertEqual(saving.dropped, 0)
+        self.assertEqual(len(queues.queues), 2)
+
+        self.assertIsInstance(
+            QueueFactory(overflow="drop-newest")
+            .create("plotting", kind="plotting")
+            .strategy,
+            PutDropNewest,
+        )
+
+    def test_factory_uses_the_default_size_of_each_kind(self):
+        queues = QueueFactory(runtime="threads")
+
+        self.assertEqual(queues.create("prediction", kind="prediction").maxsize, 2)
+        self.assertEqual(queues.create("plotting", kind="plotting").maxsize, 8)
+        self.assertEqual(queues.create("serial", kind="serial").maxsize, 10000)
+        self.assertEqual(
+            QueueFactory(maxsize=10).create("plotting", kind="plotting").maxsize, 10
+        )
+
+    def test_slow_consumers_of_predictions_see_a_bounded_backlog(self):
+        windows = QueueFactory(metered=True).create("prediction", kind="prediction")
+        backlogs = []
+
+        def produce() -> None:
+            for i in range(200):
+                windows.strategy.put(windows.queue, i)
+                time.sleep(0.001)
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+
+        received = []
+        while producer.is_alive() or len(windows.queue) != 0:
+            try:
+                received.append(windows.queue.get(timeout=0.1))
+            except queue.Empty:
+                continue
+
+            backlogs.append(len(windows.queue))
+            time.sleep(0.01)
+        producer.join()
+
+        self.assertLessEqual(max(backlogs), 2)
+        self.assertGreater(windows.dropped, 0)
+        self.assertEqual(received[-1], 199)
+
+    def test_blocks_go_through_a_standard_queue(self):
+        queues = QueueFactory(maxsize=10)
+        blocks = queues.create_samples("saving ch.1", kind="saving", blocks=True)
+        block = ProcessedBlock(
+            time=np.arange(3.0),
+            channel=1,
+            original=np.arange(3),
+            filtered=np.arange(3.0),
+        )
+
+        blocks.queue.put(block)
+        received = blocks.queue.get(timeout=5)
+
+        self.assertNotIsInstance(blocks.queue.queue, SharedMemoryQueue)
+        self.assertEqual(received.channel, 1)
+        np.testing.assert_array_equal(received.filtered, block.filtered)
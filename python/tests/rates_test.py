@@ -0,0 +1,106 @@
+import unittest
+from typing import List
+from unittest.mock import patch
+
+import numpy as np
+
+from src.pipeline.data import ProcessedBlock
+from src.pipeline.loaders import LogRate
+from src.utils.loggers import Logger
+from src.utils.rates import CHECKS_PER_INTERVAL, RateMeter
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0
+
+    def __call__(self) -> int:
+        return self.now
+
+
+class ListLogger(Logger):
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def debug(self, text: str) -> None:
+        self.lines.append(text)
+
+    def info(self, text: str) -> None:
+        self.lines.append(text)
+
+    def warning(self, text: str) -> None:
+        self.lines.append(text)
+
+    def error(self, text: str) -> None:
+        self.lines.append(text)
+
+
+class RateMeterTest(unittest.TestCase):
+    def test_rates_are_exact_and_smoothed(self):
+        clock = Clock()
+
+        with patch("src.utils.rates.perf_counter_ns", clock):
+            meter = RateMeter(interval=1, smoothing=0.5)
+
+            clock.now = 500_000_000
+            self.assertFalse(meter.update(300))
+
+            clock.now = 1_500_000_000
+            self.assertTrue(meter.update(300))
+            self.assertEqual(meter.rate, 400)
+            self.assertEqual(meter.smoothed_rate, 400)
+
+            clock.now = 2_500_000_000
+            self.assertTrue(meter.update(200))
+            self.assertEqual(meter.rate, 200)
+            self.assertEqual(meter.smoothed_rate, 300)
+            self.assertEqual(meter.total, 800)
+
+    def test_clock_is_checked_less_often_at_high_rates(self):
+        clock = Clock()
+
+        with patch("src.utils.rates.perf_counter_ns", clock):
+            meter = RateMeter(interval=1, max_check_every=1000)
+            clock.now = 1_000_000_000
+            meter.update(200 * CHECKS_PER_INTERVAL)
+
+            self.assertEqual(meter.check_every, 200)
+
+            clock.now = 2_000_000_000
+            meter.update(10**9)
+
+            self.assertEqual(meter.check_every, 1000)
+
+
+class LogRateTest(unittest.TestCase):
+    def test_rate_is_logged_once_per_timeout(self):
+        clock = Clock()
+        logger = ListLogger()
+
+        with patch("src.utils.rates.perf_counter_ns", clock):
+            loader = LogRate(logger, timeout=1)
+
+            for i in range(10):
+                clock.now = i * 200_000_000
+                self.assertEqual(loader.load(i), i)
+
+        self.assertEqual(logger.lines, ["Rate : 6.00 / s (smoothed : 6.00 / s)"])
+
+    def test_blocks_count_as_their_samples(self):
+        clock = Clock()
+        logger = ListLogger()
+        block = ProcessedBlock(
+            time=np.arange(100.0),
+            channel=0,
+            original=np.zeros(100, dtype=int),
+            filtered=np.zeros(100),
+        )
+
+        with patch("src.utils.rates.perf_counter_ns", clock):
+            loader = LogRate(logger, timeout=1)
+
+            for i in range(10):
+                clock.now = i * 200_000_000
+                loader.load(block)
+
+        self.assertEqual(logger.lines, ["Rate : 600.00 / s (smoothed : 600.00 / s)"])
@@ -0,0 +1,137 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from time import monotonic
+
+import pandas as pd
+
+from src.pipeline.capture import MAGIC, encode_packet, read_capture
+from src.pipeline.data import SerialData
+from src.pipeline.experiment.pipelines import (
+    FilteringStageFactory,
+    SourceStageFactory,
+    gives_filtered_samples,
+)
+from src.pipeline.mappers import ProcessFromSerial, ToInt
+from src.pipeline.replay import ReplaySource, holds_saved_channels, open_session
+from src.pipeline.serial import SyntheticSource
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.packets = list(SyntheticSource(seed=2, nb_packets=20).extract())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_capture(self, name: str, packets, truncate: int = 0) -> str:
+        file = os.path.join(self.directory.name, name)
+        data = MAGIC + b"".join(encode_packet(packet) for packet in packets)
+
+        with open(file, "wb") as capture:
+            capture.write(data[: len(data) - truncate])
+
+        return file
+
+    def assertSamePackets(self, packets, expected):
+        self.assertEqual(len(packets), len(expected))
+        for packet, expected_packet in zip(packets, expected):
+            self.assertEqual(packet.value, expected_packet.value)
+            self.assertEqual(packet.nb_channels, expected_packet.nb_channels)
+            self.assertEqual(packet.message_length, expected_packet.message_length)
+            self.assertAlmostEqual(
+                packet.start.timestamp(), expected_packet.start.timestamp(), places=5
+            )
+
+    def test_capture_gives_back_the_packets(self):
+        file = self.write_capture("serial-00000.cap", self.packets)
+
+        self.assertSamePackets(list(read_capture(file)), self.packets)
+
+    def test_incomplete_last_packet_is_ignored(self):
+        file = self.write_capture("serial-00000.cap", self.packets, truncate=10)
+
+        self.assertSamePackets(list(read_capture(file)), self.packets[:-1])
+
+    def test_directory_captures_are_read_in_order(self):
+        self.write_capture("serial-00001.cap", self.packets[10:])
+        self.write_capture("serial-00000.cap", self.packets[:10])
+
+        self.assertSamePackets(list(open_session(self.directory.name)), self.packets)
+
+    def write_channels(self, samples) -> None:
+        for channel in [0, 1]:
+            channel_samples = [
+                sample for sample in samples if sample.channel == channel
+            ]
+            pd.DataFrame(
+                {
+                    "timestamp": [sample.time for sample in channel_samples],
+                    "value": [float(sample.filtered) for sample in channel_samples],
+                }
+            ).to_csv(
+                os.path.join(self.directory.name, f"emg-{channel}.csv"),
+                sep=";",
+                index=False,
+            )
+
+    def test_saved_channels_give_the_same_samples(self):
+        samples = list((ProcessFromSerial() + ToInt()).map(iter(self.packets)))
+        self.write_channels(samples)
+
+        packets = list(open_session(self.directory.name))
+        replayed = list((ProcessFromSerial() + ToInt()).map(iter(packets)))
+
+        self.assertEqual(
+            [(sample.channel, sample.original) for sample in replayed],
+            [(sample.channel, sample.original) for sample in samples],
+        )
+
+    def test_saved_channels_are_not_filtered_again(self):
+        self.write_channels(
+            list((ProcessFromSerial() + ToInt()).map(iter(self.packets)))
+        )
+        os.makedirs(os.path.join(self.directory.name, "capture"))
+        capture = self.write_capture("capture/serial-00000.cap", self.packets)
+
+        for path, saved in [
+            (self.directory.name, True),
+            (os.path.join(self.directory.name, "emg-1.csv"), True),
+            (os.path.dirname(capture), False),
+            (capture, False),
+        ]:
+            with self.subTest(path=path):
+                source = SourceStageFactory().create(f"replay-fast:{path}")
+                filtering = FilteringStageFactory().create(
+                    channel=0, filtered=gives_filtered_samples(source)
+                )
+
+                self.assertEqual(holds_saved_channels(path), saved)
+                self.assertEqual(filtering.mapper is None, saved)
+
+    def test_replay_follows_the_recorded_pace(self):
+        start = datetime(2020, 1, 1)
+        packets = [
+            SerialData(
+                value=b"\x00\x01",
+                start=start + timedelta(seconds=index),
+                end=start + timedelta(seconds=index),
+                nb_channels=1,
+                length=2,
+                message_length=2,
+            )
+            for index in range(4)
+        ]
+
+        for speed, expected in [(20, 3 / 20), (None, 0)]:
+            with self.subTest(speed=speed):
+                source = ReplaySource(packets, speed=speed)
+                before = monotonic()
+                replayed = list(source.extract())
+
+                self.assertEqual(len(replayed), 4)
+                self.assertAlmostEqual(monotonic() - before, expected, delta=0.05)
+                self.assertTrue(all(packet.ingress >= before for packet in replayed))
+                self.assertEqual(list(source.extract()), [])
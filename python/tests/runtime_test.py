@@ -0,0 +1,103 @@
+import queue
+import threading
+import unittest
+
+from modupipe.runnable import MultiProcess, NamedRunnable, Runnable
+
+from src.pipeline.queues import QueueFactory
+from src.pipeline.runtime import (
+    RetryOnError,
+    Service,
+    SingleProcess,
+    WithServices,
+    create_runtime,
+)
+
+
+class RecordThread(Runnable):
+    def __init__(self, threads: "queue.Queue[threading.Thread]") -> None:
+        self.threads = threads
+
+    def run(self) -> None:
+        self.threads.put(threading.current_thread())
+
+
+class FailTwice(Runnable):
+    def __init__(self) -> None:
+        self.nb_runs = 0
+
+    def run(self) -> None:
+        self.nb_runs += 1
+
+        if self.nb_runs <= 2:
+            raise ValueError("Failed")
+
+
+class WaitUntilStopped(Service):
+    def __init__(self) -> None:
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        self.stopped.wait()
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+
+class RuntimeTest(unittest.TestCase):
+    def test_pipelines_run_in_threads_and_main_in_the_calling_thread(self):
+        threads = queue.Queue()
+        main = RecordThread(threads)
+        runtime = create_runtime(
+            "threads",
+            [NamedRunnable("Other pipeline", RecordThread(threads)), main],
+            main=main,
+        )
+
+        assert isinstance(runtime, SingleProcess)
+        runtime.run()
+
+        other_thread = threads.get(timeout=5)
+        main_thread = threads.get(timeout=5)
+        if other_thread is threading.current_thread():
+            other_thread, main_thread = main_thread, other_thread
+
+        self.assertIs(main_thread, threading.current_thread())
+        self.assertEqual(other_thread.name, "Other pipeline")
+        self.assertTrue(other_thread.daemon)
+
+    def test_processes_run_every_pipeline_in_a_process(self):
+        runtime = create_runtime("processes", [RecordThread(queue.Queue())] * 2)
+
+        assert isinstance(runtime, MultiProcess)
+        self.assertEqual(len(runtime.processes), 2)
+
+    def test_queues_between_threads_are_standard_queues(self):
+        queues = QueueFactory(maxsize=10, runtime="threads")
+
+        samples = queues.create_samples("saving ch.1", kind="saving")
+
+        self.assertIsInstance(samples.queue.queue, queue.Queue)
+
+    def test_pipelines_are_run_again_on_errors_until_they_end(self):
+        pipeline = FailTwice()
+
+        RetryOnError(pipeline, nb_times=2).run()
+
+        self.assertEqual(pipeline.nb_runs, 3)
+
+    def test_errors_are_raised_once_retried_enough(self):
+        with self.assertRaisesRegex(ValueError, "Failed"):
+            RetryOnError(FailTwice(), nb_times=1).run()
+
+    def test_services_are_stopped_once_the_pipelines_ended(self):
+        service = WaitUntilStopped()
+        runtime = create_runtime(
+            "threads", [RecordThread(queue.Queue())], services=[service]
+        )
+
+        assert isinstance(runtime, WithServices)
+        runtime.run()
+
+        self.assertTrue(service.stopped.is_set())
+        self.assertFalse(runtime.workers[0].is_alive())
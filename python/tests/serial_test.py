@@ -0,0 +1,120 @@
+import os
+import unittest
+from datetime import timedelta
+from itertools import islice
+from typing import Optional
+
+from src.pipeline.serial import FramedSerialSource, SerialSourceFactory, SyntheticSource
+from src.utils.loggers import ConsoleLogger
+
+
+def frame(data: bytes, nb_channels: int = 2, check: bytes = b"\xff") -> bytes:
+    return b"\n" + bytes([nb_channels, 2, len(data)]) + data + check
+
+
+class SyntheticSourceTest(unittest.TestCase):
+    def test_same_seed_gives_same_packets(self):
+        first = list(SyntheticSource(seed=4, nb_packets=5).extract())
+        second = list(SyntheticSource(seed=4, nb_packets=5).extract())
+        other = list(SyntheticSource(seed=5, nb_packets=5).extract())
+
+        self.assertEqual(
+            [packet.value for packet in first], [packet.value for packet in second]
+        )
+        self.assertNotEqual(
+            [packet.value for packet in first], [packet.value for packet in other]
+        )
+
+    def test_packets_follow_the_sample_rate(self):
+        packets = list(
+            SyntheticSource(
+                nb_channels=2, data_length=8, sample_rate=1000, nb_packets=3
+            ).extract()
+        )
+
+        self.assertEqual([len(packet.value) for packet in packets], [8, 8, 8])
+        for previous, packet in zip(packets, packets[1:]):
+            self.assertEqual(packet.start - previous.start, timedelta(milliseconds=2))
+            self.assertEqual(packet.end - packet.start, timedelta(milliseconds=1))
+
+    def test_continues_across_extractions(self):
+        source = SyntheticSource(seed=1, nb_packets=4)
+        packets = list(SyntheticSource(seed=1, nb_packets=4).extract())
+
+        first = next(source.extract())
+        rest = list(source.extract())
+
+        self.assertEqual(
+            [packet.value for packet in [first] + rest],
+            [packet.value for packet in packets],
+        )
+
+    def test_factory_parses_the_seed(self):
+        source = SerialSourceFactory().create("synth:7")
+        expected = SyntheticSource(seed=7)
+
+        self.assertIsInstance(source, SyntheticSource)
+        self.assertEqual(next(source.extract()).value, next(expected.extract()).value)
+
+
+class FramedSerialSourceTest(unittest.TestCase):
+    ring_size: Optional[int] = None
+
+    def setUp(self):
+        self.master, slave = os.openpty()
+        self.source = FramedSerialSource(
+            port=os.ttyname(slave),
+            baudrate=115200,
+            sync_byte=b"\n",
+            check_byte=b"\xff",
+            logger=ConsoleLogger(name="serial"),
+            ring_size=self.ring_size,
+        )
+        os.close(slave)
+
+    def tearDown(self):
+        os.close(self.master)
+
+    def test_frames_are_split_from_bulk_reads(self):
+        datas = [bytes(range(index, index + 8)) for index in range(20, 60, 4)]
+        os.write(self.master, b"".join(frame(data) for data in datas))
+
+        packets = list(islice(self.source.extract(), len(datas)))
+
+        self.assertEqual([packet.value for packet in packets], datas)
+        self.assertTrue(all(packet.nb_channels == 2 for packet in packets))
+        self.assertTrue(all(packet.length == 8 for packet in packets))
+        for previous, packet in zip(packets, packets[1:]):
+            self.assertLessEqual(previous.end, packet.start)
+        self.assertEqual(self.source.dropped_frames, 0)
+
+    def test_corrupt_frames_are_dropped_without_losing_the_next_ones(self):
+        good = [b"\x01\x02\x03\x04", b"\x05\x06\x07\x08", b"\x09\x00\x0b\x0c"]
+        os.write(
+            self.master,
+            b"\x33\x34"
+            + frame(good[0])
+            + frame(b"\x11\x12\x13\x14", check=b"\x00")
+            + frame(good[1])
+            + b"\x44"
+            + frame(good[2]),
+        )
+
+        packets = list(islice(self.source.extract(), 3))
+
+        self.assertEqual([packet.value for packet in packets], good)
+        self.assertEqual(self.source.dropped_frames, 1)
+        self.assertEqual(self.source.skipped_bytes, 2 + 9 + 1)
+
+
+class ThreadedFramedSerialSourceTest(FramedSerialSourceTest):
+    ring_size = 1024
+
+    def test_ring_reports_its_high_water(self):
+        os.write(self.master, frame(b"\x01\x02\x03\x04") * 10)
+
+        list(islice(self.source.extract(), 10))
+
+        assert self.source.ring is not None
+        self.assertGreater(self.source.ring.high_water, 0)
+        self.assertEqual(self.source.ring.dropped, 0)
@@ -0,0 +1,101 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from time import monotonic
+from typing import List
+
+from src.pipeline.data import ProcessedData, RangeData
+from src.pipeline.queues import QueueFactory
+from src.pipeline.telemetry import LatencyGauge, MeasureLatency, Telemetry
+from src.utils.loggers import Logger
+
+
+class SilentLogger(Logger):
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def debug(self, text: str) -> None:
+        self.lines.append(text)
+
+    def info(self, text: str) -> None:
+        self.lines.append(text)
+
+    def warning(self, text: str) -> None:
+        self.lines.append(text)
+
+    def error(self, text: str) -> None:
+        self.lines.append(text)
+
+
+class TelemetryTest(unittest.TestCase):
+    def test_latency_gauge_is_reset_when_sampled(self):
+        gauge = LatencyGauge("latency")
+        items = [
+            RangeData(start=0, end=0, value=None, ingress=monotonic() - latency)
+            for latency in [0.2, 0.4]
+        ]
+
+        list(MeasureLatency(gauge).map(iter(items)))
+        sample = gauge.sample()
+
+        self.assertEqual(sample.count, 2)
+        self.assertAlmostEqual(sample.mean, 0.3, places=2)
+        self.assertAlmostEqual(sample.max, 0.4, places=2)
+        self.assertIsNone(gauge.sample().mean)
+
+    def test_reports_are_logged_and_saved(self):
+        queues = QueueFactory(maxsize=4, overflow="drop-newest", metered=True)
+        experiment_queue = queues.create_samples("saving ch.1", kind="saving")
+        logger = SilentLogger()
+
+        with tempfile.TemporaryDirectory() as directory:
+            metrics_file = os.path.join(directory, "metrics", "run.jsonl")
+            telemetry = Telemetry(
+                queues=queues.queues,
+                gauges=[LatencyGauge("latency")],
+                metrics_file=metrics_file,
+                logger=logger,
+            )
+
+            for i in range(6):
+                experiment_queue.strategy.put(
+                    experiment_queue.queue,
+                    ProcessedData(time=i, channel=1, original=i, filtered=0.0),
+                )
+            experiment_queue.queue.get()
+
+            telemetry.report()
+
+            with open(metrics_file) as metrics_input:
+                metrics = json.loads(metrics_input.readline())
+
+        saving = metrics["queues"]["saving ch.1"]
+        self.assertEqual(saving["size"], 3)
+        self.assertEqual(saving["maxsize"], 4)
+        self.assertEqual(saving["dropped"], 2)
+        self.assertGreater(saving["put_rate"], saving["get_rate"])
+        self.assertIsNone(metrics["latencies"]["latency"]["mean"])
+        self.assertIn("saving ch.1 : 3/4 queued", logger.lines[0])
+
+    def test_queues_must_be_metered(self):
+        queues = QueueFactory(maxsize=4)
+        queues.create("plotting", kind="plotting")
+
+        with self.assertRaises(ValueError):
+            Telemetry(queues=queues.queues, logger=SilentLogger())
+
+    def test_a_last_report_is_logged_when_stopped(self):
+        queues = QueueFactory(maxsize=4, metered=True)
+        queues.create_samples("saving ch.1", kind="saving")
+        logger = SilentLogger()
+        telemetry = Telemetry(queues=queues.queues, interval=60, logger=logger)
+
+        thread = threading.Thread(target=telemetry.run)
+        thread.start()
+        telemetry.stop()
+        thread.join(timeout=5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertIn("saving ch.1 : 0/4 queued", logger.lines[0])
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.pipeline.data import SerialData
+from src.pipeline.mappers import NotchDC, ProcessFromSerial, ToInt
+from src.pipeline.queues import ProcessedDataCodec
+from src.pipeline.tracing import (
+    LatencyHistogram,
+    LatencyTracer,
+    TraceLatency,
+    load_latency_report,
+)
+from src.utils.loggers import Logger
+
+
+class SilentLogger(Logger):
+    def debug(self, text: str) -> None:
+        pass
+
+    def info(self, text: str) -> None:
+        pass
+
+    def warning(self, text: str) -> None:
+        pass
+
+    def error(self, text: str) -> None:
+        pass
+
+
+class LatencyHistogramTest(unittest.TestCase):
+    def test_percentiles_are_within_a_bin_of_the_exact_ones(self):
+        latencies = np.random.default_rng(1).lognormal(np.log(0.002), 0.8, 10000)
+        histogram = LatencyHistogram(batch_size=1000)
+
+        for latency in latencies:
+            histogram.add(latency)
+
+        bin_ratio = 10 ** (1 / LatencyHistogram.BINS_PER_DECADE)
+
+        for q in [50, 95, 99]:
+            with self.subTest(q=q):
+                exact = np.percentile(latencies, q)
+                self.assertGreaterEqual(histogram.percentile(q), exact)
+                self.assertLessEqual(histogram.percentile(q), exact * bin_ratio)
+
+        self.assertEqual(histogram.summary()["count"], len(latencies))
+        self.assertEqual(histogram.summary()["max"], latencies.max())
+
+
+class LatencyTracingTest(unittest.TestCase):
+    def test_ingress_is_carried_from_the_serial_packet(self):
+        start = datetime.now()
+        packet = SerialData(
+            value=bytes(range(8)),
+            start=start,
+            end=start + timedelta(milliseconds=1),
+            nb_channels=2,
+            length=8,
+            message_length=2,
+            ingress=123.5,
+        )
+        codec = ProcessedDataCodec()
+
+        for batched in [False, True]:
+            with self.subTest(batched=batched):
+                mapper = ProcessFromSerial(batched=batched) + ToInt() + NotchDC(0.99)
+
+                for item in mapper.map(iter([packet])):
+                    self.assertEqual(item.ingress, 123.5)
+
+                    if not batched:
+                        decoded = codec.decode(codec.encode(item))
+                        self.assertEqual(decoded.ingress, 123.5)
+
+    def test_stages_are_dumped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            tracer = LatencyTracer(directory=directory, logger=SilentLogger())
+            start = datetime.now()
+            packets = [
+                SerialData(
+                    value=bytes(4),
+                    start=start,
+                    end=start,
+                    nb_channels=1,
+                    length=4,
+                    message_length=2,
+                    ingress=ingress,
+                )
+                for ingress in [1.0, 2.0]
+            ]
+
+            list(
+                (ProcessFromSerial() + TraceLatency(tracer, "processing")).map(
+                    iter(packets)
+                )
+            )
+            tracer.dump()
+            report = load_latency_report(directory)
+
+            self.assertEqual(os.listdir(directory), ["latency-processing.json"])
+
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]["stage"], "processing")
+        self.assertEqual(report[0]["count"], 4)